@@ -15,6 +15,83 @@ class Settings(BaseSettings):
     # Adzuna Job API credentials
     ADZUNA_APP_ID: Optional[str] = None
     ADZUNA_APP_KEY: Optional[str] = None
+    # Search results are fresh for TTL seconds, then served stale (and refreshed) for STALE seconds
+    ADZUNA_CACHE_TTL_SECONDS: int = 3600
+    ADZUNA_CACHE_STALE_SECONDS: int = 6 * 3600
+    # Max Adzuna requests in flight per worker (shared keep-alive pool)
+    ADZUNA_MAX_CONCURRENCY: int = 4
+    # Adzuna call budget per worker (token buckets); bulk jobs leave ADZUNA_USER_RESERVE
+    # of each bucket (0-1) for live searches
+    ADZUNA_CALLS_PER_MINUTE: int = 20
+    ADZUNA_CALLS_PER_DAY: int = 240
+    ADZUNA_USER_RESERVE: float = 0.25
+    # Worker threads for ingestion and snapshots (kept below ADZUNA_MAX_CONCURRENCY)
+    ADZUNA_BULK_CONCURRENCY: int = 2
+    
+    # Local job index: roles/locations (comma separated) paged in from Adzuna on a schedule
+    # (defaults: 4 roles x 3 locations x 2 pages = 24 calls per run, 48 per day)
+    JOB_INGEST_ROLES: str = "Python developer,Full stack developer,Data analyst,DevOps engineer"
+    JOB_INGEST_LOCATIONS: str = "Chennai,Bangalore,Hyderabad"
+    JOB_INGEST_PAGES: int = 2
+    JOB_INGEST_INTERVAL_MINUTES: int = 720  # 0 disables scheduled ingestion
+    JOB_INDEX_MAX_AGE_DAYS: int = 30
+    JOB_INDEX_RELOAD_SECONDS: int = 300
+    # Job matching: how many ranked jobs to return and the minimum score (0-1) to include
+    JOB_MATCH_TOP_K: int = 20
+    JOB_MATCH_MIN_SCORE: float = 0.15
+    # Postings at least this similar (MinHash Jaccard estimate) are treated as one job
+    JOB_DEDUP_THRESHOLD: float = 0.8
+    # Job alerts: notify users about newly ingested postings matching their skills
+    JOB_ALERTS_ENABLED: bool = True
+    JOB_ALERT_MIN_SCORE: float = 0.3
+    JOB_ALERT_MAX_PER_USER: int = 3  # per ingestion run
+    JOB_ALERT_INDEX_RELOAD_SECONDS: int = 900
+    
+    # Skill demand snapshot: Adzuna posting counts per skill, country-wide and per location (comma separated)
+    SKILL_DEMAND_TAXONOMY: str = (
+        "Python,Java,JavaScript,TypeScript,Go,C++,C#,SQL,PostgreSQL,MongoDB,"
+        "React,Angular,Vue,Node.js,Django,Flask,FastAPI,Spring,HTML,CSS,"
+        "AWS,Azure,GCP,Docker,Kubernetes,Terraform,Linux,Git,CI/CD,REST APIs,"
+        "Machine Learning,Deep Learning,NLP,Data Analysis,Pandas,Spark,Tableau,Power BI,"
+        "Android,iOS,Flutter,Kotlin,Swift,Excel"
+    )
+    # (defaults: 44 skills x 3 locations = 132 calls per run, every 2 days; other cities
+    # fall back to country-wide counts)
+    SKILL_DEMAND_LOCATIONS: str = "Chennai,Bangalore"
+    SKILL_DEMAND_INTERVAL_MINUTES: int = 2880  # 0 disables scheduled snapshots
+    SKILL_DEMAND_RELOAD_SECONDS: int = 900
+    SKILL_DEMAND_HISTORY_DAYS: int = 90
+    
+    # Resource retrieval: blend Gemini embeddings with BM25 over the curated catalog
+    RAG_EMBEDDINGS_ENABLED: bool = False
+    RAG_EMBEDDING_MODEL: str = "models/text-embedding-004"
+    # Curated catalog snapshot (default data/resource_catalog.json) and how often workers check for changes
+    RESOURCE_CATALOG_PATH: Optional[str] = None
+    RESOURCE_CATALOG_RELOAD_SECONDS: int = 60
+    
+    # Leaderboard: pull other workers' point updates / full reload safety net
+    LEADERBOARD_SYNC_SECONDS: int = 30
+    LEADERBOARD_RELOAD_SECONDS: int = 3600
+    # Per-source point totals: rebuild from the ledger this often (0 disables), users per transaction
+    POINTS_RECONCILE_INTERVAL_MINUTES: int = 24 * 60
+    POINTS_RECONCILE_BATCH_SIZE: int = 500
+    
+    # Platform content: items fetched per content type per domain
+    CONTENT_FETCH_LIMIT: int = 20
+    # Per-domain content cache: version checks, safety-net TTL, domains warmed at startup
+    CONTENT_VERSION_CHECK_SECONDS: int = 30
+    CONTENT_CACHE_TTL_SECONDS: int = 6 * 3600
+    CONTENT_WARM_DOMAINS: int = 20
+    
+    # Learning paths: generate later modules only when they are reached
+    PEARL_LAZY_PATHS: bool = True
+    # Prefetch the next module once this many actions remain in the current one
+    PEARL_PREFETCH_REMAINING_ACTIONS: int = 1
+    
+    # Journey creation dedup: identical start requests within the window reuse one session
+    JOURNEY_DEDUP_WINDOW_MINUTES: int = 10
+    # How long a duplicate waits on generation running in another worker
+    JOURNEY_ATTACH_TIMEOUT_SECONDS: int = 30
     
     class Config:
         env_file = ".env"
@@ -3,31 +3,487 @@ Complete Database Helper with all schema support
 """
 from supabase import create_client, Client
 from config import get_settings
-from typing import Optional, Dict, List, Any
-from datetime import datetime, timedelta
+from row_models import UserProfileRow, UserSkillRow, ModuleProgressRow, TransactionRow, ContentEventRow
+from typing import Optional, Dict, List, Any, Iterable, Iterator, Callable
+from datetime import datetime, timedelta, date, timezone
 from functools import lru_cache
+import base64
 import json
 import uuid
 
 settings = get_settings()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 500
+
 
 @lru_cache()
 def get_supabase() -> Client:
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 
+def is_missing_function(error: Exception) -> bool:
+    """True when an RPC failed because its function is not deployed (PGRST202 / 42883), not on a timeout"""
+    code = getattr(error, 'code', None)
+    if code in ('PGRST202', '42883'):
+        return True
+    text = str(error)
+    return 'PGRST202' in text or '42883' in text or 'Could not find the function' in text
+
+
+# ========== KEYSET PAGINATION ==========
+
+def encode_cursor(row: Dict, order_column: str, id_column: str = 'id') -> Optional[str]:
+    """Encode the (order value, id) position of a row as an opaque cursor"""
+    if not row:
+        return None
+    payload = json.dumps([row.get(order_column), row.get(id_column)], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return [value, row_id]
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def fetch_keyset_page(client: Client, table: str, columns: str = '*',
+                      filters: Optional[Dict] = None, order_column: str = 'created_at',
+                      id_column: str = 'id', cursor: Optional[str] = None,
+                      limit: int = DEFAULT_PAGE_SIZE, desc: bool = True) -> Dict:
+    """
+    Fetch one page ordered by (order_column, id_column).
+    Seeks past the cursor position instead of using OFFSET, so every page
+    costs the same index range scan regardless of how deep the client is.
+    Rows with a NULL order value sort as Postgres sorts them (first when
+    descending, last when ascending) and are paged by id.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    
+    # The cursor is built from the sort keys, so they must be in the projection
+    if columns != '*':
+        selected = [c.strip() for c in columns.split(',')]
+        for key in (order_column, id_column):
+            if key not in selected:
+                columns += f', {key}'
+    
+    query = client.table(table).select(columns)
+    for column, value in (filters or {}).items():
+        query = query.eq(column, value)
+    
+    position = decode_cursor(cursor)
+    if position:
+        value, row_id = position
+        op = 'lt' if desc else 'gt'
+        if value is None:
+            # Inside the NULL run: the rest of it, then (descending) every non-NULL row
+            null_run = f'and({order_column}.is.null,{id_column}.{op}."{row_id}")'
+            query = query.or_(f'{null_run},{order_column}.not.is.null' if desc else null_run)
+        else:
+            # Past a value: smaller/larger values, then (ascending) the NULL run
+            query = query.or_(
+                f'{order_column}.{op}."{value}",'
+                f'and({order_column}.eq."{value}",{id_column}.{op}."{row_id}")'
+                + ('' if desc else f',{order_column}.is.null')
+            )
+    
+    response = query.order(order_column, desc=desc, nullsfirst=desc).order(
+        id_column, desc=desc
+    ).limit(limit + 1).execute()
+    
+    rows = response.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        'items': rows,
+        'next_cursor': encode_cursor(rows[-1], order_column, id_column) if has_more else None,
+        'has_more': has_more
+    }
+
+
+def iter_keyset_rows(client: Client, table: str, columns: str = '*',
+                     filters: Optional[Dict] = None, order_column: str = 'created_at',
+                     id_column: str = 'id', batch_size: int = EXPORT_BATCH_SIZE,
+                     desc: bool = True) -> Iterator[Dict]:
+    """Yield every matching row, fetching one keyset page at a time"""
+    cursor = None
+    while True:
+        page = fetch_keyset_page(
+            client, table, columns, filters, order_column, id_column,
+            cursor=cursor, limit=batch_size, desc=desc
+        )
+        for row in page['items']:
+            yield row
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+
+def stream_json_array(rows: Iterable[Dict]) -> Iterator[str]:
+    """Serialize rows as a JSON array one element at a time (for StreamingResponse)"""
+    yield '['
+    first = True
+    try:
+        for row in rows:
+            yield ('' if first else ',') + json.dumps(row, default=str)
+            first = False
+    except Exception as e:
+        # Headers are already sent; log and close the array so clients can parse it
+        print(f"[DB ERROR] Export stream interrupted: {e}")
+    yield ']'
+
+
+# ========== ACTION COMPLETION STATE ==========
+
+def mark_action_complete(client: Client, progress_id: str, action_index: int) -> Optional[Dict]:
+    """
+    Set one action's bit in ai_module_progress.completed_mask.
+    Only the mask, counter and next-action pointer are written; the
+    cached_completion_data blob (actions + generated questions) is left alone.
+    
+    Returns:
+        {'actions_completed', 'total_actions', 'next_action_index', 'newly_completed'}
+        or None if the module row does not exist
+    """
+    if not 0 <= action_index < ModuleProgressRow.MAX_ACTIONS:
+        raise ValueError("Invalid action index")
+    
+    try:
+        # Atomic bit-or in Postgres (migrations/002_action_completion_mask.sql)
+        result = client.rpc('complete_module_action', {
+            'p_progress_id': progress_id,
+            'p_action_index': action_index
+        }).execute()
+        return result.data or None
+    except Exception as rpc_error:
+        print(f"[DB] complete_module_action RPC unavailable, updating mask directly: {rpc_error}")
+    
+    # Compare-and-set on the old mask so concurrent completions are not lost
+    for _ in range(3):
+        response = client.table('ai_module_progress').select(
+            'completed_mask, total_actions'
+        ).eq('id', progress_id).single().execute()
+        module = ModuleProgressRow.from_row(response.data)
+        if not module:
+            return None
+        
+        new_mask = module.completed_mask | (1 << action_index)
+        state = {
+            'actions_completed': bin(new_mask).count('1'),
+            'total_actions': module.total_actions,
+            'next_action_index': ModuleProgressRow.first_incomplete(new_mask, module.total_actions),
+            'newly_completed': new_mask != module.completed_mask
+        }
+        if not state['newly_completed']:
+            return state
+        
+        updated = client.table('ai_module_progress').update({
+            'completed_mask': new_mask,
+            'actions_completed': state['actions_completed'],
+            'next_action_index': state['next_action_index'],
+            'last_cache_update': datetime.now().isoformat()
+        }).eq('id', progress_id).eq('completed_mask', module.completed_mask).execute()
+        
+        if updated.data:
+            return state
+    
+    raise RuntimeError("Action completion conflicted with concurrent updates")
+
+
+# ========== POINT ROLLUPS ==========
+
+ROLLUP_PERIODS = ('day', 'week', 'month')
+
+
+def rollup_bucket(period: str, day: date) -> date:
+    """First day of the period containing day (the day, its ISO week's Monday, the 1st)"""
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown leaderboard period: {period}")
+
+
+def record_points_rollup(client: Client, user_id: str, points: int,
+                         day: Optional[date] = None):
+    """Add an award to the user's day, week and month buckets in plaro_points_rollups"""
+    day = day or datetime.now(timezone.utc).date()
+    
+    try:
+        # Atomic increment in Postgres (migrations/012_points_rollups.sql)
+        client.rpc('record_points_rollup', {
+            'p_user_id': user_id,
+            'p_points': points,
+            'p_day': day.isoformat()
+        }).execute()
+        return
+    except Exception as rpc_error:
+        print(f"[DB] record_points_rollup RPC unavailable, updating buckets directly: {rpc_error}")
+    
+    try:
+        for period in ROLLUP_PERIODS:
+            bucket = rollup_bucket(period, day).isoformat()
+            # Compare-and-set on the old total so concurrent awards are not lost
+            for _ in range(3):
+                existing = client.table('plaro_points_rollups').select('points').eq(
+                    'user_id', user_id
+                ).eq('period', period).eq('bucket', bucket).limit(1).execute()
+                
+                if not existing.data:
+                    try:
+                        client.table('plaro_points_rollups').insert({
+                            'user_id': user_id, 'period': period, 'bucket': bucket, 'points': points
+                        }).execute()
+                        break
+                    except Exception:
+                        # Another award created the bucket first; add to it instead
+                        continue
+                
+                current = existing.data[0]['points']
+                updated = client.table('plaro_points_rollups').update({
+                    'points': current + points,
+                    'updated_at': datetime.now(timezone.utc).isoformat()
+                }).eq('user_id', user_id).eq('period', period).eq('bucket', bucket).eq(
+                    'points', current
+                ).execute()
+                if updated.data:
+                    break
+            else:
+                print(f"[DB] Points rollup for {user_id} ({period}) conflicted with concurrent updates")
+    except Exception as e:
+        print(f"[DB] Points rollup failed: {e}")
+
+
+# ========== POINTS BY SOURCE ==========
+
+POINTS_BY_SOURCE_TABLE = 'plaro_points_by_source'
+
+
+def ledger_points_breakdown(client: Client, user_id: str) -> Dict[str, int]:
+    """{source: points} summed from the user's whole plaro_transactions ledger"""
+    breakdown = {}
+    for row in iter_keyset_rows(
+        client, 'plaro_transactions', TransactionRow.LEDGER_COLUMNS,
+        filters={'user_id': user_id}, batch_size=1000
+    ):
+        txn = TransactionRow.from_row(row)
+        breakdown[txn.source] = breakdown.get(txn.source, 0) + txn.points
+    return breakdown
+
+
+def get_points_breakdown(client: Client, user_id: str) -> Dict[str, int]:
+    """
+    {source: points} for a user.
+    Reads the per-source totals the plaro_transactions trigger maintains
+    (migrations/015_points_by_source.sql), one row per source.
+    """
+    try:
+        response = client.table(POINTS_BY_SOURCE_TABLE).select('source, points').eq(
+            'user_id', user_id
+        ).execute()
+        return {row['source']: row['points'] for row in response.data or []}
+    except Exception as e:
+        print(f"[DB] Points by source unavailable, summing the ledger: {e}")
+    
+    return ledger_points_breakdown(client, user_id)
+
+
+def reconcile_points_by_source(client: Client, user_ids: List[str]) -> int:
+    """
+    Rebuild the users' per-source totals (and summary breakdowns) from the ledger
+    
+    Args:
+        client: Supabase client
+        user_ids: Users to reconcile in one transaction
+    
+    Returns:
+        Number of aggregate rows that were wrong (0 when the RPC is unavailable)
+    """
+    if not user_ids:
+        return 0
+    try:
+        fixed = client.rpc('reconcile_points_by_source', {
+            'p_user_ids': list(user_ids)
+        }).execute().data
+        return int(fixed or 0)
+    except Exception as e:
+        # Without the migration there are no aggregates to correct
+        print(f"[DB] Points reconciliation failed: {e}")
+        return 0
+
+
+# ========== GAMIFICATION SUMMARY ==========
+
+SUMMARY_TABLE = 'user_gamification_summary'
+SUMMARY_RECENT_TRANSACTIONS = 10
+DAILY_TASKS = ('complete_module', 'practice_skill', 'engage_content')
+
+
+def daily_task_for_event(event_type: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Daily challenge task a content event completes, if any"""
+    if event_type == 'complete' and content_type == 'module':
+        return 'complete_module'
+    if event_type == 'practice_submit':
+        return 'practice_skill'
+    if event_type in ('like', 'comment', 'share'):
+        return 'engage_content'
+    return None
+
+
+def invalidate_summary(client: Client, user_id: str):
+    """Drop a summary row an update could not be applied to; the next read rebuilds it"""
+    try:
+        client.table(SUMMARY_TABLE).delete().eq('user_id', user_id).execute()
+    except Exception as e:
+        print(f"[DB] Gamification summary for {user_id} could not be invalidated: {e}")
+
+
+def _update_summary(client: Client, user_id: str, change: Callable[[Dict], Dict]):
+    """Compare-and-set a summary row on its version (fallback when the RPCs are missing)"""
+    for _ in range(3):
+        response = client.table(SUMMARY_TABLE).select('*').eq('user_id', user_id).limit(1).execute()
+        if not response.data:
+            # Not materialized yet; the first read builds it from the source tables
+            return
+        
+        summary = response.data[0]
+        updated = client.table(SUMMARY_TABLE).update(dict(
+            change(summary),
+            version=summary['version'] + 1,
+            updated_at=datetime.now(timezone.utc).isoformat()
+        )).eq('user_id', user_id).eq('version', summary['version']).execute()
+        if updated.data:
+            return
+    
+    print(f"[DB] Gamification summary for {user_id} conflicted with concurrent updates, invalidating")
+    invalidate_summary(client, user_id)
+
+
+def record_summary_award(client: Client, user_id: str, transaction: Dict,
+                         rank_level: Optional[str] = None):
+    """Add a plaro_transactions row to the user's materialized summary"""
+    transaction = {column: transaction.get(column) for column in TransactionRow.__slots__}
+    
+    try:
+        try:
+            client.rpc('summary_record_award', {
+                'p_user_id': user_id,
+                'p_transaction': transaction,
+                'p_rank_level': rank_level
+            }).execute()
+            return
+        except Exception as rpc_error:
+            print(f"[DB] summary_record_award RPC unavailable, updating summary directly: {rpc_error}")
+        
+        def change(summary: Dict) -> Dict:
+            breakdown = dict(summary.get('breakdown') or {})
+            breakdown[transaction['source']] = breakdown.get(transaction['source'], 0) + transaction['points']
+            return {
+                'total_points': summary['total_points'] + transaction['points'],
+                'rank_level': rank_level or summary['rank_level'],
+                'breakdown': breakdown,
+                'recent_transactions': ([transaction] + (summary.get('recent_transactions') or []))[
+                    :SUMMARY_RECENT_TRANSACTIONS
+                ]
+            }
+        
+        _update_summary(client, user_id, change)
+    except Exception as e:
+        print(f"[DB] Gamification summary award update failed: {e}")
+        invalidate_summary(client, user_id)
+
+
+def record_summary_event(client: Client, user_id: str, event_type: Optional[str],
+                         content_type: Optional[str]):
+    """Mark the daily challenge task a content event completes"""
+    task = daily_task_for_event(event_type, content_type)
+    if not task:
+        return
+    today = datetime.now().date().isoformat()
+    
+    try:
+        try:
+            client.rpc('summary_record_task', {
+                'p_user_id': user_id,
+                'p_day': today,
+                'p_task': task
+            }).execute()
+            return
+        except Exception as rpc_error:
+            print(f"[DB] summary_record_task RPC unavailable, updating summary directly: {rpc_error}")
+        
+        def change(summary: Dict) -> Dict:
+            tasks = dict(summary.get('daily_tasks') or {}) if summary.get('daily_date') == today else {}
+            tasks[task] = True
+            return {'daily_date': today, 'daily_tasks': tasks}
+        
+        _update_summary(client, user_id, change)
+    except Exception as e:
+        print(f"[DB] Gamification summary event update failed: {e}")
+        invalidate_summary(client, user_id)
+
+
+def record_summary_streak(client: Client, user_id: str, streak: int):
+    """Copy a new streak count into the user's materialized summary"""
+    try:
+        client.table(SUMMARY_TABLE).update({
+            'streak': streak,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }).eq('user_id', user_id).execute()
+    except Exception as e:
+        print(f"[DB] Gamification summary streak update failed: {e}")
+        invalidate_summary(client, user_id)
+
+
 class EnhancedSupabaseHelper:
     """Complete database operations for all tables"""
     
     def __init__(self):
         self.client = get_supabase()
     
+    def fetch_page(self, table: str, columns: str = '*', filters: Optional[Dict] = None,
+                   order_column: str = 'created_at', id_column: str = 'id',
+                   cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                   desc: bool = True) -> Dict:
+        """Fetch one keyset page from any table"""
+        return fetch_keyset_page(
+            self.client, table, columns, filters, order_column, id_column,
+            cursor=cursor, limit=limit, desc=desc
+        )
+    
+    def iter_rows(self, table: str, columns: str = '*', filters: Optional[Dict] = None,
+                  order_column: str = 'created_at', id_column: str = 'id',
+                  batch_size: int = EXPORT_BATCH_SIZE, desc: bool = True) -> Iterator[Dict]:
+        """Iterate a table in keyset batches with flat memory use"""
+        return iter_keyset_rows(
+            self.client, table, columns, filters, order_column, id_column,
+            batch_size=batch_size, desc=desc
+        )
+    
     # ========== USERS & AUTH ==========
     
+    def _achievement_event(self, user_id: str, event_type: str, event: Dict):
+        """Hand an event to the achievement engine (rules for that event type only)"""
+        try:
+            # Imported here: the gamification service itself builds on this module
+            from services.gamification_service import gamification_service
+            gamification_service.handle_event(user_id, event_type, event)
+        except Exception as e:
+            print(f"[DB] Achievement check for {event_type} failed: {e}")
+    
     def get_user_profile(self, user_id: str) -> Optional[Dict]:
         """Get user profile with full details"""
         try:
+            # Full row on purpose: the profile is returned to the frontend as-is
             response = self.client.table('user_profiles').select('*').eq(
                 'user_id', user_id
             ).single().execute()
@@ -51,12 +507,15 @@ class EnhancedSupabaseHelper:
     def update_streak(self, user_id: str) -> bool:
         """Update user streak count"""
         try:
-            profile = self.get_user_profile(user_id)
+            response = self.client.table('user_profiles').select(
+                UserProfileRow.STREAK_COLUMNS
+            ).eq('user_id', user_id).single().execute()
+            profile = UserProfileRow.from_row(response.data)
             if not profile:
                 return False
             
-            last_updated = profile.get('updated_at')
-            current_streak = profile.get('streak_count', 0)
+            last_updated = profile.updated_at
+            current_streak = profile.streak_count
             
             if last_updated:
                 last_date = datetime.fromisoformat(last_updated.replace('Z', '+00:00')).date()
@@ -79,6 +538,10 @@ class EnhancedSupabaseHelper:
                 'updated_at': datetime.now().isoformat()
             }).eq('user_id', user_id).execute()
             
+            if new_streak != current_streak:
+                record_summary_streak(self.client, user_id, new_streak)
+                self._achievement_event(user_id, 'streak_updated', {'streak': new_streak})
+            
             return bool(response.data)
         except Exception as e:
             print(f"[DB ERROR] Update streak failed: {e}")
@@ -129,37 +592,42 @@ class EnhancedSupabaseHelper:
     
     # ========== SKILL MANAGEMENT ==========
     
-    def get_user_skills(self, user_id: str) -> List[Dict]:
-        """Get all user skills with confidence"""
+    def get_user_skill_rows(self, user_id: str,
+                            columns: str = UserSkillRow.COLUMNS) -> List[UserSkillRow]:
+        """Get user skills as typed rows, highest confidence first"""
         try:
-            response = self.client.table('user_skill_memory').select('*').eq(
+            response = self.client.table('user_skill_memory').select(columns).eq(
                 'user_id', user_id
             ).order('confidence_score', desc=True).execute()
-            return response.data if response.data else []
+            return UserSkillRow.from_rows(response.data)
         except Exception as e:
             print(f"[DB ERROR] Get skills failed: {e}")
             return []
     
+    def get_user_skills(self, user_id: str) -> List[Dict]:
+        """Get all user skills with confidence"""
+        return [row.to_dict() for row in self.get_user_skill_rows(user_id)]
+    
     def update_skill_confidence(self, user_id: str, skill_name: str, 
                                confidence_delta: float = 0.1) -> bool:
         """Update skill confidence"""
         try:
             # Get existing skill
-            response = self.client.table('user_skill_memory').select('*').eq(
-                'user_id', user_id
-            ).eq('skill_name', skill_name).execute()
+            response = self.client.table('user_skill_memory').select(
+                'id, confidence_score, practice_count'
+            ).eq('user_id', user_id).eq('skill_name', skill_name).execute()
             
             if response.data:
                 # Update existing
-                current_conf = float(response.data[0].get('confidence_score', 0.0))
-                new_conf = min(1.0, current_conf + confidence_delta)
+                existing = UserSkillRow.from_row(response.data[0])
+                new_conf = min(1.0, existing.confidence_score + confidence_delta)
                 
                 update_response = self.client.table('user_skill_memory').update({
                     'confidence_score': new_conf,
-                    'practice_count': response.data[0].get('practice_count', 0) + 1,
+                    'practice_count': existing.practice_count + 1,
                     'last_practiced_at': datetime.now().isoformat(),
                     'updated_at': datetime.now().isoformat()
-                }).eq('id', response.data[0]['id']).execute()
+                }).eq('id', existing.id).execute()
             else:
                 # Create new
                 update_response = self.client.table('user_skill_memory').insert({
@@ -170,6 +638,9 @@ class EnhancedSupabaseHelper:
                     'last_practiced_at': datetime.now().isoformat(),
                     'created_at': datetime.now().isoformat()
                 }).execute()
+                new_conf = min(1.0, confidence_delta)
+            
+            self._achievement_event(user_id, 'confidence_changed', {'skill': skill_name, 'confidence': new_conf})
             
             return bool(update_response.data)
         except Exception as e:
@@ -178,13 +649,13 @@ class EnhancedSupabaseHelper:
     
     def get_skill_progress_summary(self, user_id: str) -> Dict:
         """Get skill progress summary"""
-        skills = self.get_user_skills(user_id)
+        skills = self.get_user_skill_rows(user_id)
         
         summary = {
             'total_skills': len(skills),
-            'mastered_skills': len([s for s in skills if s.get('confidence_score', 0) >= 0.8]),
-            'intermediate_skills': len([s for s in skills if 0.5 <= s.get('confidence_score', 0) < 0.8]),
-            'beginner_skills': len([s for s in skills if s.get('confidence_score', 0) < 0.5]),
+            'mastered_skills': len([s for s in skills if s.confidence_score >= 0.8]),
+            'intermediate_skills': len([s for s in skills if 0.5 <= s.confidence_score < 0.8]),
+            'beginner_skills': len([s for s in skills if s.confidence_score < 0.5]),
             'recently_practiced': [],
             'skills_by_domain': {}
         }
@@ -193,18 +664,20 @@ class EnhancedSupabaseHelper:
         if skills:
             sorted_by_recency = sorted(
                 skills, 
-                key=lambda x: x.get('last_practiced_at', ''), 
+                key=lambda x: x.last_practiced_at or '', 
                 reverse=True
             )
-            summary['recently_practiced'] = sorted_by_recency[:5]
+            summary['recently_practiced'] = [s.to_dict() for s in sorted_by_recency[:5]]
         
         return summary
     
     # ========== SESSIONS & PROGRESS ==========
     
     def create_agent_session(self, user_id: str, jd_text: str, 
-                            onboarding_id: Optional[str] = None) -> Optional[Dict]:
-        """Create AI agent session"""
+                            onboarding_id: Optional[str] = None,
+                            idempotency_key: Optional[str] = None,
+                            request_fingerprint: Optional[str] = None) -> Optional[Dict]:
+        """Create AI agent session (insert fails if the idempotency key was already used)"""
         try:
             session_data = {
                 'user_id': user_id,
@@ -217,6 +690,10 @@ class EnhancedSupabaseHelper:
             
             if onboarding_id:
                 session_data['onboarding_id'] = onboarding_id
+            if idempotency_key:
+                session_data['idempotency_key'] = idempotency_key
+            if request_fingerprint:
+                session_data['request_fingerprint'] = request_fingerprint
             
             response = self.client.table('ai_agent_sessions').insert(
                 session_data
@@ -227,6 +704,63 @@ class EnhancedSupabaseHelper:
             print(f"[DB ERROR] Create session failed: {e}")
             return None
     
+    def find_recent_session(self, user_id: str, idempotency_key: Optional[str] = None,
+                            request_fingerprint: Optional[str] = None,
+                            since: Optional[datetime] = None) -> Optional[Dict]:
+        """Find the newest session created for the same idempotency key or request fingerprint"""
+        if not idempotency_key and not request_fingerprint:
+            return None
+        try:
+            query = self.client.table('ai_agent_sessions').select(
+                'id, jd_text, jd_parsed, status, created_at, updated_at'
+            ).eq('user_id', user_id)
+            
+            if idempotency_key:
+                query = query.eq('idempotency_key', idempotency_key)
+            else:
+                query = query.eq('request_fingerprint', request_fingerprint)
+            if since:
+                query = query.gte('created_at', since.isoformat())
+            
+            response = query.order('created_at', desc=True).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"[DB ERROR] Session lookup failed: {e}")
+            return None
+    
+    def find_inflight_session(self, user_id: str, request_fingerprint: str) -> Optional[Dict]:
+        """The session generating this request (the uq_ai_agent_sessions_inflight_fingerprint row)"""
+        try:
+            response = self.client.table('ai_agent_sessions').select(
+                'id, jd_text, jd_parsed, status, created_at, updated_at'
+            ).eq('user_id', user_id).eq('request_fingerprint', request_fingerprint).eq(
+                'status', 'active'
+            ).is_('jd_parsed', 'null').limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"[DB ERROR] Session lookup failed: {e}")
+            return None
+    
+    def take_over_session(self, session_id: str, stale_before: datetime) -> Optional[Dict]:
+        """
+        Reactivate a failed or abandoned session for a retry, keeping its created_at.
+        Returns None if another worker took it over first, or if reactivating it
+        would collide with an identical request already generating in another session.
+        """
+        cutoff = stale_before.isoformat()
+        try:
+            response = self.client.table('ai_agent_sessions').update({
+                'status': 'active',
+                'updated_at': datetime.now().isoformat()
+            }).eq('id', session_id).or_(
+                f'status.eq.failed,updated_at.lt."{cutoff}",'
+                f'and(updated_at.is.null,created_at.lt."{cutoff}")'
+            ).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"[DB] Session takeover failed: {e}")
+            return None
+    
     def get_active_sessions(self, user_id: str) -> List[Dict]:
         """Get active AI sessions for user"""
         try:
@@ -272,15 +806,21 @@ class EnhancedSupabaseHelper:
                 progress_data['completed_at'] = datetime.now().isoformat()
             
             if module_data:
+                actions = module_data.get('actions', [])
+                completed_mask = ModuleProgressRow.mask_from_actions(actions)
                 progress_data['module_name'] = module_data.get('name')
                 progress_data['cached_completion_data'] = {
-                    'actions': module_data.get('actions', []),
+                    'actions': actions,
                     'completed_at': datetime.now().isoformat()
                 }
+                progress_data['completed_mask'] = completed_mask
+                progress_data['next_action_index'] = ModuleProgressRow.first_incomplete(
+                    completed_mask, len(actions)
+                )
                 progress_data['last_cache_update'] = datetime.now().isoformat()
             
             # Check if exists
-            existing = self.client.table('ai_module_progress').select('*').eq(
+            existing = self.client.table('ai_module_progress').select('id').eq(
                 'session_id', session_id
             ).eq('skill', skill).eq('module_id', module_id).execute()
             
@@ -297,6 +837,9 @@ class EnhancedSupabaseHelper:
                 ).execute()
                 progress_id = response.data[0]['id'] if response.data else None
             
+            if status == 'completed':
+                self._achievement_event(user_id, 'module_completed', {'skill': skill})
+            
             return progress_id
         except Exception as e:
             print(f"[DB ERROR] Save module progress failed: {e}")
@@ -305,18 +848,35 @@ class EnhancedSupabaseHelper:
     def get_module_progress(self, session_id: str, skill: str, module_id: int) -> Optional[Dict]:
         """Get module progress"""
         try:
-            response = self.client.table('ai_module_progress').select('*').eq(
-                'session_id', session_id
-            ).eq('skill', skill).eq('module_id', module_id).single().execute()
-            return response.data
+            response = self.client.table('ai_module_progress').select(
+                ModuleProgressRow.COLUMNS
+            ).eq('session_id', session_id).eq('skill', skill).eq(
+                'module_id', module_id
+            ).single().execute()
+            
+            module = ModuleProgressRow.from_row(response.data)
+            if not module:
+                return None
+            
+            # Completion flags are derived from the mask for readers of the blob
+            for idx, action in enumerate(module.cached_completion_data.get('actions', [])):
+                action['completed'] = module.is_action_completed(idx)
+            return module.to_dict()
         except Exception as e:
             print(f"[DB] Module progress not found: {e}")
             return None
     
     def complete_action(self, module_progress_id: str, action_index: int, 
                        action_type: str, completion_data: Dict) -> bool:
-        """Mark action as complete"""
+        """Mark action as complete (repeat completions are a no-op)"""
         try:
+            # Flip the action's bit (also keeps actions_completed in sync)
+            state = mark_action_complete(self.client, module_progress_id, action_index)
+            if not state:
+                return False
+            if not state['newly_completed']:
+                return True
+            
             action_completion = {
                 'module_progress_id': module_progress_id,
                 'action_index': action_index,
@@ -329,17 +889,6 @@ class EnhancedSupabaseHelper:
                 action_completion
             ).execute()
             
-            # Update actions completed count
-            progress_response = self.client.table('ai_module_progress').select(
-                'actions_completed'
-            ).eq('id', module_progress_id).single().execute()
-            
-            if progress_response.data:
-                current_completed = progress_response.data.get('actions_completed', 0)
-                self.client.table('ai_module_progress').update({
-                    'actions_completed': current_completed + 1
-                }).eq('id', module_progress_id).execute()
-            
             return bool(response.data)
         except Exception as e:
             print(f"[DB ERROR] Complete action failed: {e}")
@@ -458,7 +1007,7 @@ class EnhancedSupabaseHelper:
             ).execute()
             
             # Update user's total points
-            rank_response = self.client.table('user_profile_rank').select('*').eq(
+            rank_response = self.client.table('user_profile_rank').select('total_points').eq(
                 'user_id', user_id
             ).execute()
             
@@ -476,32 +1025,42 @@ class EnhancedSupabaseHelper:
                     'last_updated': datetime.now().isoformat()
                 }).execute()
             
+            record_points_rollup(self.client, user_id, points)
+            record_summary_award(self.client, user_id, response.data[0] if response.data else transaction)
+            
             return bool(response.data)
         except Exception as e:
             print(f"[DB ERROR] Award points failed: {e}")
             return False
     
-    def get_user_plaro_points(self, user_id: str) -> Dict:
+    def get_user_plaro_points(self, user_id: str, cursor: Optional[str] = None,
+                              limit: int = 20) -> Dict:
         """Get user's Plaro points summary"""
         try:
             # Get total points
-            rank_response = self.client.table('user_profile_rank').select('*').eq(
-                'user_id', user_id
-            ).single().execute()
+            rank_response = self.client.table('user_profile_rank').select(
+                'total_points, rank_level'
+            ).eq('user_id', user_id).single().execute()
             
-            # Get recent transactions
-            transactions_response = self.client.table('plaro_transactions').select('*').eq(
-                'user_id', user_id
-            ).order('created_at', desc=True).limit(20).execute()
+            # Get recent transactions (one keyset page)
+            transactions_page = self.fetch_page(
+                'plaro_transactions', TransactionRow.COLUMNS, filters={'user_id': user_id},
+                order_column='created_at', cursor=cursor, limit=limit
+            )
             
             return {
                 'total_points': rank_response.data.get('total_points', 0) if rank_response.data else 0,
                 'rank_level': rank_response.data.get('rank_level', 'beginner') if rank_response.data else 'beginner',
-                'recent_transactions': transactions_response.data if transactions_response.data else []
+                'recent_transactions': transactions_page['items'],
+                'next_cursor': transactions_page['next_cursor'],
+                'breakdown': get_points_breakdown(self.client, user_id)
             }
+        except ValueError:
+            raise
         except Exception as e:
             print(f"[DB ERROR] Get points failed: {e}")
-            return {'total_points': 0, 'rank_level': 'beginner', 'recent_transactions': []}
+            return {'total_points': 0, 'rank_level': 'beginner', 'recent_transactions': [],
+                    'next_cursor': None, 'breakdown': {}}
     
     # ========== ANALYTICS ==========
     
@@ -536,6 +1095,8 @@ class EnhancedSupabaseHelper:
                 event
             ).execute()
             
+            record_summary_event(self.client, user_id, event_type, content_type)
+            
             return bool(response.data)
         except Exception as e:
             print(f"[DB ERROR] Log event failed: {e}")
@@ -546,7 +1107,7 @@ class EnhancedSupabaseHelper:
         try:
             # Get time spent
             events_response = self.client.table('user_content_events').select(
-                'event_type, created_at, metadata'
+                ContentEventRow.ACTIVITY_COLUMNS
             ).eq('user_id', user_id).gte(
                 'created_at', (datetime.now() - timedelta(days=30)).isoformat()
             ).execute()
@@ -555,39 +1116,35 @@ class EnhancedSupabaseHelper:
             total_seconds = 0
             content_interactions = {}
             
-            for event in events_response.data or []:
-                if event.get('event_type') == 'dwell':
-                    total_seconds += event.get('metadata', {}).get('dwell_time_seconds', 0)
+            for event in ContentEventRow.from_rows(events_response.data):
+                if event.event_type == 'dwell':
+                    total_seconds += event.metadata.get('dwell_time_seconds', 0)
                 
-                content_type = event.get('content_type')
-                if content_type:
-                    content_interactions[content_type] = content_interactions.get(content_type, 0) + 1
+                if event.content_type:
+                    content_interactions[event.content_type] = content_interactions.get(event.content_type, 0) + 1
             
             # Get completion stats
             progress_response = self.client.table('ai_module_progress').select(
                 'status'
             ).eq('user_id', user_id).execute()
             
-            total_modules = len(progress_response.data) if progress_response.data else 0
-            completed_modules = len([p for p in (progress_response.data or []) 
-                                   if p.get('status') == 'completed'])
+            progress_rows = ModuleProgressRow.from_rows(progress_response.data)
+            total_modules = len(progress_rows)
+            completed_modules = len([p for p in progress_rows if p.status == 'completed'])
             
             # Get skill growth
-            skills_response = self.client.table('user_skill_memory').select(
-                'skill_name, confidence_score, created_at'
-            ).eq('user_id', user_id).execute()
+            skills = self.get_user_skill_rows(user_id, 'skill_name, confidence_score, created_at')
             
             skill_growth = []
-            if skills_response.data:
-                for skill in skills_response.data:
-                    created_at = datetime.fromisoformat(skill['created_at'].replace('Z', '+00:00'))
-                    days_old = (datetime.now() - created_at).days
-                    skill_growth.append({
-                        'skill': skill['skill_name'],
-                        'confidence': float(skill['confidence_score']),
-                        'days_practicing': max(1, days_old),
-                        'growth_per_day': float(skill['confidence_score']) / max(1, days_old)
-                    })
+            for skill in skills:
+                created_at = datetime.fromisoformat(skill.created_at.replace('Z', '+00:00'))
+                days_old = (datetime.now() - created_at).days
+                skill_growth.append({
+                    'skill': skill.skill_name,
+                    'confidence': skill.confidence_score,
+                    'days_practicing': max(1, days_old),
+                    'growth_per_day': skill.confidence_score / max(1, days_old)
+                })
             
             return {
                 'total_learning_time_hours': round(total_seconds / 3600, 1),
@@ -159,6 +159,26 @@ except Exception as e:
     settings = None
 
 
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start periodic background work"""
+    if adzuna_service:
+        adzuna_service.start_ingestion_scheduler()
+        adzuna_service.start_market_snapshot_scheduler()
+    
+    try:
+        from services.content_provider_service import content_provider
+        content_provider.start_cache_warmup()
+    except Exception as e:
+        print(f"[WARNING] Content cache warm-up unavailable: {e}")
+    
+    try:
+        from services.gamification_service import gamification_service
+        gamification_service.start_points_reconcile_scheduler()
+    except Exception as e:
+        print(f"[WARNING] Points reconciliation unavailable: {e}")
+
+
 # ============================================
 # TESTING ENDPOINTS
 # ============================================
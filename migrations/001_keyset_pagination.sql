@@ -0,0 +1,25 @@
+-- Keyset pagination support for unbounded history endpoints
+-- Each index matches an (equality filter, order column, id) keyset used by
+-- database.fetch_keyset_page, so every page is a bounded index range scan.
+
+create index if not exists idx_user_feedback_user_submitted
+    on user_feedback (user_id, submitted_at desc, id desc);
+
+create index if not exists idx_user_feedback_submitted
+    on user_feedback (submitted_at desc, id desc);
+
+create index if not exists idx_plaro_transactions_user_created
+    on plaro_transactions (user_id, created_at desc, id desc);
+
+-- Tag popularity aggregated in Postgres (FeedbackService.get_popular_tags)
+create or replace function feedback_tag_counts(max_tags integer default 20)
+returns table (tag text, uses bigint)
+language sql stable
+as $$
+    select t.tag, count(*) as uses
+    from user_feedback f
+    cross join lateral unnest(f.tags) as t(tag)
+    group by t.tag
+    order by uses desc
+    limit max_tags;
+$$;
@@ -0,0 +1,78 @@
+-- Compact per-action completion state for ai_module_progress
+-- Bit i of completed_mask is set once action i is completed, and
+-- next_action_index points at the lowest unset bit (NULL when every action
+-- is done). Completing an action touches these two columns plus the counter;
+-- cached_completion_data (actions + generated questions) is never rewritten.
+
+alter table ai_module_progress
+    add column if not exists completed_mask bigint not null default 0,
+    add column if not exists next_action_index smallint default 0;
+
+-- Backfill from the legacy per-action 'completed' flags in the blob
+update ai_module_progress p
+set completed_mask = coalesce((
+    select sum(1::bigint << (a.ord - 1)::integer)
+    from jsonb_array_elements(coalesce(p.cached_completion_data->'actions', '[]'::jsonb))
+        with ordinality as a(action, ord)
+    where a.ord <= 63
+      and coalesce((a.action->>'completed')::boolean, false)
+), 0)::bigint;
+
+update ai_module_progress
+set next_action_index = (
+    select min(i)
+    from generate_series(0, greatest(coalesce(total_actions, 0), 0) - 1) as i
+    where completed_mask & (1::bigint << i) = 0
+);
+
+-- PEARLAgent.get_next_action: one active module per (user, session)
+create index if not exists idx_ai_module_progress_active
+    on ai_module_progress (user_id, session_id)
+    where status = 'active';
+
+-- Atomic completion (database.mark_action_complete)
+create or replace function complete_module_action(p_progress_id uuid, p_action_index integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_old bigint;
+    v_new bigint;
+    v_total integer;
+    v_done integer;
+    v_next smallint;
+begin
+    select completed_mask, coalesce(total_actions, 0)
+    into v_old, v_total
+    from ai_module_progress
+    where id = p_progress_id
+    for update;
+
+    if not found then
+        return null;
+    end if;
+
+    v_new := v_old | (1::bigint << p_action_index);
+    v_done := length(replace(v_new::bit(64)::text, '0', ''));
+
+    select min(i) into v_next
+    from generate_series(0, v_total - 1) as i
+    where v_new & (1::bigint << i) = 0;
+
+    if v_new <> v_old then
+        update ai_module_progress
+        set completed_mask = v_new,
+            actions_completed = v_done,
+            next_action_index = v_next,
+            last_cache_update = now()
+        where id = p_progress_id;
+    end if;
+
+    return jsonb_build_object(
+        'actions_completed', v_done,
+        'total_actions', v_total,
+        'next_action_index', v_next,
+        'newly_completed', v_new <> v_old
+    );
+end;
+$$;
@@ -0,0 +1,22 @@
+-- Idempotent journey creation (routes/pearl_routes.py start_career_journey)
+-- Repeated start requests are matched on an explicit Idempotency-Key or on a
+-- fingerprint of (user, goal, jd_text) and reuse the existing session.
+
+alter table ai_agent_sessions
+    add column if not exists idempotency_key text,
+    add column if not exists request_fingerprint text;
+
+-- One session per client-supplied key
+create unique index if not exists uq_ai_agent_sessions_idempotency_key
+    on ai_agent_sessions (user_id, idempotency_key)
+    where idempotency_key is not null;
+
+-- At most one in-flight generation per identical request across workers;
+-- the losing insert attaches to the winner's session
+create unique index if not exists uq_ai_agent_sessions_inflight_fingerprint
+    on ai_agent_sessions (user_id, request_fingerprint)
+    where request_fingerprint is not null and jd_parsed is null and status = 'active';
+
+-- Dedup-window lookups
+create index if not exists idx_ai_agent_sessions_fingerprint_created
+    on ai_agent_sessions (user_id, request_fingerprint, created_at desc);
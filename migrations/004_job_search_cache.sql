@@ -0,0 +1,13 @@
+-- Shared Adzuna search cache (services/job_retrieval_service.py JobSearchCache)
+-- One row per (query, location, page, results_per_page); every worker reads
+-- and refreshes the same entries, so repeated searches never hit Adzuna.
+
+create table if not exists job_search_cache (
+    cache_key text primary key,
+    payload jsonb not null default '[]'::jsonb,
+    fetched_at timestamptz not null default now()
+);
+
+-- Housekeeping: drop entries nobody has refreshed in a day
+create index if not exists idx_job_search_cache_fetched
+    on job_search_cache (fetched_at);
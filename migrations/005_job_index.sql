@@ -0,0 +1,34 @@
+-- Local job index (services/job_index_service.py)
+-- Adzuna postings ingested on a schedule, deduplicated on a fingerprint of
+-- (title, company, location). Workers load recent rows into in-memory
+-- inverted indexes for matching.
+
+create table if not exists job_postings (
+    fingerprint text primary key,
+    job_id text not null,
+    title text not null,
+    company text,
+    location text,
+    description text,
+    salary_min numeric,
+    salary_max numeric,
+    url text,
+    created timestamptz,
+    category text,
+    last_seen_at timestamptz not null default now()
+);
+
+-- Keyset loading and age-out
+create index if not exists idx_job_postings_last_seen
+    on job_postings (last_seen_at desc, fingerprint desc);
+
+create index if not exists idx_job_postings_job_id
+    on job_postings (job_id);
+
+-- Single-row lease so only one worker ingests per interval
+create table if not exists job_ingest_state (
+    id integer primary key,
+    last_run_at timestamptz not null default 'epoch'
+);
+
+insert into job_ingest_state (id) values (1) on conflict (id) do nothing;
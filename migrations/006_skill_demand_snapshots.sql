@@ -0,0 +1,29 @@
+-- Skill demand market snapshots (services/skill_demand_service.py)
+-- Each snapshot stores Adzuna's total posting count for every taxonomy skill,
+-- country-wide (location 'all') and per location, under one snapshot_at.
+-- Workers serve the newest snapshot from memory; older ones are kept for
+-- trends until SKILL_DEMAND_HISTORY_DAYS.
+
+create table if not exists skill_demand_snapshots (
+    snapshot_at timestamptz not null,
+    skill text not null,
+    location text not null,
+    job_count integer not null default 0,
+    primary key (snapshot_at, skill, location)
+);
+
+-- Latest snapshot lookup and age-out
+create index if not exists idx_skill_demand_snapshots_at
+    on skill_demand_snapshots (snapshot_at desc);
+
+-- Demand trend per skill
+create index if not exists idx_skill_demand_snapshots_skill
+    on skill_demand_snapshots (skill, location, snapshot_at desc);
+
+-- Single-row lease so only one worker snapshots per interval
+create table if not exists skill_demand_state (
+    id integer primary key,
+    last_run_at timestamptz not null default 'epoch'
+);
+
+insert into skill_demand_state (id) values (1) on conflict (id) do nothing;
@@ -0,0 +1,16 @@
+-- Batch job-match notifications (services/job_alert_service.py)
+-- New postings from each ingestion run are matched to users through an
+-- in-memory skill -> users index loaded from user_skill_memory, and the
+-- resulting job_match notifications are written with one bulk upsert.
+
+-- One notification per (user, posting): re-running a batch skips rows
+-- whose dedup_key already exists. NULL keys never conflict.
+alter table user_notifications
+    add column if not exists dedup_key text;
+
+create unique index if not exists idx_user_notifications_dedup_key
+    on user_notifications (dedup_key);
+
+-- Keyset loading of the skill index
+create index if not exists idx_user_skill_memory_keyset
+    on user_skill_memory (created_at desc, id desc);
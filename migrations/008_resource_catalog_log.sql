@@ -0,0 +1,15 @@
+-- Append log for the curated resource catalog (services/resource_catalog.py)
+-- The catalog itself is the versioned snapshot data/resource_catalog.json.
+-- Resources added at runtime are appended here; every worker replays the
+-- entries after the snapshot's log_offset in id order, so all workers
+-- converge on the same catalog. Compacting writes a new snapshot version
+-- whose log_offset skips the entries it folded in.
+
+create table if not exists resource_catalog_log (
+    id bigserial primary key,
+    catalog_version integer not null,
+    skill text not null,
+    resource_type text not null,
+    resource jsonb not null,
+    created_at timestamptz not null default now()
+);
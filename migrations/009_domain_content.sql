@@ -0,0 +1,93 @@
+-- Batched platform content fetch (ContentProviderService.fetch_domain_content)
+-- One call returns the best bytes, courses, taikens and posts for several
+-- domains at once, so a learning roadmap is a single round trip instead of
+-- one query per content type per skill.
+
+-- Every listing is a (domain, ranking column) range scan
+create index if not exists idx_bytes_domain_value
+    on bytes (domain, educational_value desc nulls last);
+
+create index if not exists idx_courses_domain_created
+    on courses (domain, created_at desc nulls last);
+
+create index if not exists idx_taikens_domain_rating
+    on taikens (domain, average_rating desc nulls last)
+    where is_published;
+
+create index if not exists idx_post_domain_value
+    on post (domain, educational_value desc nulls last)
+    where is_published and not is_hidden;
+
+-- Top p_limit items per (content type, domain), best first within each group.
+-- item carries the same columns the per-table queries select.
+create or replace function get_domain_content(
+    p_domains text[],
+    p_limit integer default 20,
+    p_difficulty text default null,
+    p_content_type text default null
+)
+returns table (content_type text, domain text, item jsonb)
+language sql stable
+as $$
+    select ranked.content_type, ranked.domain, ranked.item
+    from (
+        select 'video' as content_type, b.domain,
+               jsonb_build_object(
+                   'byte_id', b.byte_id, 'caption', b.caption, 'byte', b.byte,
+                   'domain', b.domain, 'difficulty', b.difficulty,
+                   'like_count', b.like_count, 'educational_value', b.educational_value,
+                   'user_id', b.user_id
+               ) as item,
+               row_number() over (partition by b.domain order by b.educational_value desc nulls last) as rn
+        from bytes b
+        where b.domain = any(p_domains)
+          and (p_difficulty is null or b.difficulty = p_difficulty)
+          and (p_content_type is null or p_content_type = 'video')
+
+        union all
+
+        select 'course', c.domain,
+               jsonb_build_object(
+                   'course_id', c.course_id, 'title', c.title, 'description', c.description,
+                   'domain', c.domain, 'category', c.category, 'difficulty', c.difficulty,
+                   'user_id', c.user_id, 'thumbnail_url', c.thumbnail_url,
+                   'created_at', c.created_at
+               ),
+               row_number() over (partition by c.domain order by c.created_at desc nulls last)
+        from courses c
+        where c.domain = any(p_domains)
+          and (p_difficulty is null or c.difficulty = p_difficulty)
+          and (p_content_type is null or p_content_type = 'course')
+
+        union all
+
+        select 'taiken', t.domain,
+               jsonb_build_object(
+                   'taiken_id', t.taiken_id, 'title', t.title, 'description', t.description,
+                   'domain', t.domain, 'difficulty', t.difficulty,
+                   'total_stages', t.total_stages, 'total_questions', t.total_questions,
+                   'average_rating', t.average_rating, 'play_count', t.play_count
+               ),
+               row_number() over (partition by t.domain order by t.average_rating desc nulls last)
+        from taikens t
+        where t.domain = any(p_domains) and t.is_published
+          and (p_difficulty is null or t.difficulty = p_difficulty)
+          and (p_content_type is null or p_content_type = 'taiken')
+
+        union all
+
+        select 'text', p.domain,
+               jsonb_build_object(
+                   'post_id', p.post_id, 'title', p.title, 'domain', p.domain,
+                   'difficulty', p.difficulty, 'tags', p.tags,
+                   'like_count', p.like_count, 'educational_value', p.educational_value
+               ),
+               row_number() over (partition by p.domain order by p.educational_value desc nulls last)
+        from post p
+        where p.domain = any(p_domains) and p.is_published and not p.is_hidden
+          and (p_difficulty is null or p.difficulty = p_difficulty)
+          and (p_content_type is null or p_content_type = 'text')
+    ) ranked
+    where ranked.rn <= p_limit
+    order by ranked.content_type, ranked.domain, ranked.rn;
+$$;
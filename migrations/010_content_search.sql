@@ -0,0 +1,95 @@
+-- Indexed full-text search over platform content (ContentProviderService.search_content)
+-- Replaces leading-wildcard ILIKE scans of four tables with GIN-indexed
+-- tsvector matches (plus trigram similarity on titles for typos), ranked
+-- across content types and paginated by (rank, key) keyset.
+
+create extension if not exists pg_trgm;
+
+-- Titles/captions weigh more than descriptions and bodies
+alter table bytes
+    add column if not exists search_vector tsvector
+    generated always as (setweight(to_tsvector('english', coalesce(caption, '')), 'A')) stored;
+
+alter table courses
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) stored;
+
+alter table taikens
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) stored;
+
+alter table post
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) stored;
+
+create index if not exists idx_bytes_search on bytes using gin (search_vector);
+create index if not exists idx_courses_search on courses using gin (search_vector);
+create index if not exists idx_taikens_search on taikens using gin (search_vector);
+create index if not exists idx_post_search on post using gin (search_vector);
+
+create index if not exists idx_bytes_caption_trgm on bytes using gin (caption gin_trgm_ops);
+create index if not exists idx_courses_title_trgm on courses using gin (title gin_trgm_ops);
+create index if not exists idx_taikens_title_trgm on taikens using gin (title gin_trgm_ops);
+create index if not exists idx_post_title_trgm on post using gin (title gin_trgm_ops);
+
+-- One ranked page of matches across all content types.
+-- Results are ordered by (rank desc, key desc); pass the last row's rank and
+-- key back as p_after_rank/p_after_key for the next page.
+create or replace function search_platform_content(
+    p_query text,
+    p_limit integer default 20,
+    p_after_rank double precision default null,
+    p_after_key text default null
+)
+returns table (type text, id text, key text, title text, url text, domain text, rank double precision)
+language sql stable
+as $$
+    with q as (
+        select websearch_to_tsquery('english', p_query) as ts
+    ),
+    matches as (
+        select 'byte' as type, b.byte_id::text as id, b.caption as title, b.byte as url, b.domain,
+               ts_rank_cd(b.search_vector, q.ts)::float8 + similarity(b.caption, p_query)::float8 * 0.5 as rank
+        from bytes b, q
+        where b.search_vector @@ q.ts or b.caption % p_query
+
+        union all
+
+        select 'course', c.course_id::text, c.title, '/courses/' || c.course_id, c.domain,
+               ts_rank_cd(c.search_vector, q.ts)::float8 + similarity(c.title, p_query)::float8 * 0.5
+        from courses c, q
+        where c.search_vector @@ q.ts or c.title % p_query
+
+        union all
+
+        select 'taiken', t.taiken_id::text, t.title, '/taikens/' || t.taiken_id, t.domain,
+               ts_rank_cd(t.search_vector, q.ts)::float8 + similarity(t.title, p_query)::float8 * 0.5
+        from taikens t, q
+        where t.is_published and (t.search_vector @@ q.ts or t.title % p_query)
+
+        union all
+
+        select 'post', p.post_id::text, p.title, '/posts/' || p.post_id, p.domain,
+               ts_rank_cd(p.search_vector, q.ts)::float8 + similarity(p.title, p_query)::float8 * 0.5
+        from post p, q
+        where p.is_published and not p.is_hidden and (p.search_vector @@ q.ts or p.title % p_query)
+    ),
+    keyed as (
+        select m.*, m.type || ':' || m.id as key from matches m
+    )
+    select k.type, k.id, k.key, k.title, k.url, k.domain, k.rank
+    from keyed k
+    where p_after_rank is null
+       or (k.rank, k.key) < (p_after_rank, p_after_key)
+    order by k.rank desc, k.key desc
+    limit p_limit;
+$$;
@@ -0,0 +1,78 @@
+-- Per-domain content cache (services/content_provider_service.py DomainContentCache)
+-- Content changes far less often than it is read. Every write to bytes,
+-- courses, taikens or post bumps its domain's version; workers poll the
+-- versions and keep serving cached listings until their domain's version moves.
+
+create table if not exists content_domain_versions (
+    domain text primary key,
+    version bigint not null default 1,
+    updated_at timestamptz not null default clock_timestamp()
+);
+
+-- Workers pull bumps incrementally by updated_at
+create index if not exists idx_content_domain_versions_updated
+    on content_domain_versions (updated_at);
+
+-- Listings shared between workers, tagged with the version they were built from
+create table if not exists content_domain_cache (
+    domain text primary key,
+    version bigint not null default 0,
+    payload jsonb not null default '{}'::jsonb,
+    cached_at timestamptz not null default now()
+);
+
+create or replace function bump_content_domain_version()
+returns trigger
+language plpgsql
+as $$
+declare
+    changed text;
+begin
+    for changed in
+        select distinct d from unnest(array[
+            case when tg_op <> 'INSERT' then old.domain end,
+            case when tg_op <> 'DELETE' then new.domain end
+        ]) as d
+        where d is not null
+    loop
+        insert into content_domain_versions (domain, version, updated_at)
+        values (changed, 1, clock_timestamp())
+        on conflict (domain) do update
+            set version = content_domain_versions.version + 1,
+                updated_at = clock_timestamp();
+    end loop;
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_bytes_content_version on bytes;
+create trigger trg_bytes_content_version
+    after insert or update or delete on bytes
+    for each row execute function bump_content_domain_version();
+
+drop trigger if exists trg_courses_content_version on courses;
+create trigger trg_courses_content_version
+    after insert or update or delete on courses
+    for each row execute function bump_content_domain_version();
+
+drop trigger if exists trg_taikens_content_version on taikens;
+create trigger trg_taikens_content_version
+    after insert or update or delete on taikens
+    for each row execute function bump_content_domain_version();
+
+drop trigger if exists trg_post_content_version on post;
+create trigger trg_post_content_version
+    after insert or update or delete on post
+    for each row execute function bump_content_domain_version();
+
+-- Warm-up: the skills the most learners are working on
+create or replace function popular_content_domains(p_limit integer default 20)
+returns table (domain text, learners bigint)
+language sql stable
+as $$
+    select s.skill_name as domain, count(distinct s.user_id) as learners
+    from user_skill_memory s
+    group by s.skill_name
+    order by learners desc
+    limit p_limit;
+$$;
@@ -0,0 +1,51 @@
+-- Time-windowed leaderboards (services/leaderboard_service.py PeriodLeaderboards)
+-- Points per user per day, ISO week and month, incremented with every award
+-- (database.record_points_rollup), so daily/weekly/monthly boards read one
+-- bucket instead of scanning plaro_transactions.
+
+create table if not exists plaro_points_rollups (
+    user_id uuid not null,
+    period text not null check (period in ('day', 'week', 'month')),
+    -- First day of the bucket (the day itself, the week's Monday, the 1st of the month)
+    bucket date not null,
+    points bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, period, bucket)
+);
+
+-- Board for one bucket, best first
+create index if not exists idx_plaro_points_rollups_board
+    on plaro_points_rollups (period, bucket, points desc, user_id);
+
+-- Atomic increment of all three buckets for one award
+create or replace function record_points_rollup(p_user_id uuid, p_points integer, p_day date default current_date)
+returns void
+language sql
+as $$
+    insert into plaro_points_rollups (user_id, period, bucket, points, updated_at)
+    values
+        (p_user_id, 'day', p_day, p_points, now()),
+        (p_user_id, 'week', date_trunc('week', p_day)::date, p_points, now()),
+        (p_user_id, 'month', date_trunc('month', p_day)::date, p_points, now())
+    on conflict (user_id, period, bucket) do update
+        set points = plaro_points_rollups.points + excluded.points,
+            updated_at = now();
+$$;
+
+-- Backfill from the ledger (safe to re-run: buckets are recomputed, not added to)
+insert into plaro_points_rollups (user_id, period, bucket, points)
+select user_id, period, bucket, sum(points)
+from (
+    select user_id, 'day' as period, (created_at at time zone 'utc')::date as bucket, points
+    from plaro_transactions
+    union all
+    select user_id, 'week', date_trunc('week', created_at at time zone 'utc')::date, points
+    from plaro_transactions
+    union all
+    select user_id, 'month', date_trunc('month', created_at at time zone 'utc')::date, points
+    from plaro_transactions
+) ledger
+group by user_id, period, bucket
+on conflict (user_id, period, bucket) do update
+    set points = excluded.points,
+        updated_at = now();
@@ -0,0 +1,64 @@
+-- Materialized gamification summary (GamificationService.get_user_gamification_summary)
+-- One row per user, built from the ledger/profile/events on first read and
+-- then kept current by point awards, content events and streak updates
+-- (database.record_summary_award / record_summary_event / record_summary_streak),
+-- so the home page summary is a single keyed read.
+
+create table if not exists user_gamification_summary (
+    user_id uuid primary key,
+    total_points bigint not null default 0,
+    rank_level text not null default 'beginner',
+    -- {source: points}
+    breakdown jsonb not null default '{}'::jsonb,
+    -- Newest first, at most 10 plaro_transactions rows
+    recent_transactions jsonb not null default '[]'::jsonb,
+    streak integer not null default 0,
+    -- Daily challenge flags ({task: true}) for daily_date only
+    daily_date date,
+    daily_tasks jsonb not null default '{}'::jsonb,
+    version bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+-- One award: total, per-source breakdown and the recent list in one statement
+create or replace function summary_record_award(p_user_id uuid, p_transaction jsonb, p_rank_level text default null)
+returns void
+language sql
+as $$
+    update user_gamification_summary s
+    set total_points = s.total_points + (p_transaction->>'points')::bigint,
+        rank_level = coalesce(p_rank_level, s.rank_level),
+        breakdown = jsonb_set(
+            s.breakdown,
+            array[p_transaction->>'source'],
+            to_jsonb(coalesce((s.breakdown->>(p_transaction->>'source'))::bigint, 0)
+                     + (p_transaction->>'points')::bigint)
+        ),
+        recent_transactions = (
+            select coalesce(jsonb_agg(t.txn order by t.pos), '[]'::jsonb)
+            from (
+                select txn, pos
+                from jsonb_array_elements(jsonb_build_array(p_transaction) || s.recent_transactions)
+                     with ordinality as e(txn, pos)
+                order by pos
+                limit 10
+            ) t
+        ),
+        version = s.version + 1,
+        updated_at = now()
+    where s.user_id = p_user_id;
+$$;
+
+-- One completed daily task; flags from an earlier day are dropped
+create or replace function summary_record_task(p_user_id uuid, p_day date, p_task text)
+returns void
+language sql
+as $$
+    update user_gamification_summary s
+    set daily_tasks = case when s.daily_date = p_day then s.daily_tasks else '{}'::jsonb end
+                      || jsonb_build_object(p_task, true),
+        daily_date = p_day,
+        version = s.version + 1,
+        updated_at = now()
+    where s.user_id = p_user_id;
+$$;
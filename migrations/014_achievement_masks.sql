@@ -0,0 +1,55 @@
+-- Event-driven achievements (services/achievement_engine.py)
+-- Each user's earned achievements are bits of one bigint (bit numbers in
+-- ACHIEVEMENT_BITS). Claiming sets a bit atomically, so an achievement is
+-- awarded exactly once without searching plaro_transactions by reason text.
+
+create table if not exists user_achievements (
+    user_id uuid primary key,
+    earned_mask bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+-- Test-and-set one bit: {"newly": true} only for the call that set it
+create or replace function claim_achievement(p_user_id uuid, p_bit integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_mask bigint;
+begin
+    insert into user_achievements (user_id, earned_mask)
+    values (p_user_id, 0)
+    on conflict (user_id) do nothing;
+
+    update user_achievements
+    set earned_mask = earned_mask | (1::bigint << p_bit),
+        updated_at = now()
+    where user_id = p_user_id
+      and earned_mask & (1::bigint << p_bit) = 0
+    returning earned_mask into v_mask;
+
+    if found then
+        return jsonb_build_object('newly', true, 'mask', v_mask);
+    end if;
+
+    select earned_mask into v_mask from user_achievements where user_id = p_user_id;
+    return jsonb_build_object('newly', false, 'mask', v_mask);
+end;
+$$;
+
+-- Backfill from achievements already awarded through the ledger
+insert into user_achievements (user_id, earned_mask)
+select user_id, bit_or(1::bigint << (array_position(array[
+           'first_module', 'week_streak', 'skill_master', 'first_post', 'taiken_creator',
+           'first_follower', 'community_helper', 'roadmap_complete', 'freelance_ready'
+       ], metadata->>'achievement_key') - 1))
+from plaro_transactions
+where source = 'achievement'
+  and metadata->>'achievement_key' in (
+      'first_module', 'week_streak', 'skill_master', 'first_post', 'taiken_creator',
+      'first_follower', 'community_helper', 'roadmap_complete', 'freelance_ready'
+  )
+group by user_id
+on conflict (user_id) do update
+    set earned_mask = user_achievements.earned_mask | excluded.earned_mask,
+        updated_at = now();
@@ -0,0 +1,143 @@
+-- Per-source point totals (GamificationService.get_user_plaro_points breakdown)
+-- One row per user and source, maintained by a trigger on plaro_transactions
+-- in the same transaction as the ledger write, so the breakdown is a read of
+-- a handful of rows instead of a scan of the user's whole ledger.
+-- reconcile_points_by_source rebuilds users' rows from the ledger
+-- (GamificationService.start_points_reconcile_scheduler runs it periodically).
+
+create table if not exists plaro_points_by_source (
+    user_id uuid not null,
+    source text not null,
+    points bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, source)
+);
+
+-- Single-row lease so only one worker reconciles per interval
+create table if not exists points_reconcile_state (
+    id integer primary key,
+    last_run_at timestamptz not null default 'epoch'
+);
+
+insert into points_reconcile_state (id) values (1) on conflict (id) do nothing;
+
+-- Ledger writes take a shared per-user lock that reconciliation takes exclusively,
+-- so a rebuild never overwrites an award committed while it was summing
+create or replace function points_by_source_lock_key(p_user_id uuid)
+returns bigint
+language sql
+immutable
+as $$
+    select hashtext('plaro_points_by_source:' || p_user_id::text)::bigint;
+$$;
+
+create or replace function apply_points_by_source()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op <> 'INSERT' then
+        perform pg_advisory_xact_lock_shared(points_by_source_lock_key(old.user_id));
+        update plaro_points_by_source
+        set points = points - old.points,
+            updated_at = now()
+        where user_id = old.user_id and source = old.source;
+    end if;
+
+    if tg_op <> 'DELETE' then
+        perform pg_advisory_xact_lock_shared(points_by_source_lock_key(new.user_id));
+        insert into plaro_points_by_source (user_id, source, points, updated_at)
+        values (new.user_id, new.source, new.points, now())
+        on conflict (user_id, source) do update
+            set points = plaro_points_by_source.points + excluded.points,
+                updated_at = now();
+    end if;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_plaro_points_by_source on plaro_transactions;
+create trigger trg_plaro_points_by_source
+    after insert or update or delete on plaro_transactions
+    for each row execute function apply_points_by_source();
+
+-- Rebuild the users' rows (and their summary breakdown) from the ledger;
+-- returns how many aggregate rows were wrong
+create or replace function reconcile_points_by_source(p_user_ids uuid[])
+returns integer
+language plpgsql
+as $$
+declare
+    v_user uuid;
+    v_fixed integer;
+begin
+    -- Sorted so concurrent reconciliations cannot deadlock
+    for v_user in select distinct u from unnest(p_user_ids) as u order by u loop
+        perform pg_advisory_xact_lock(points_by_source_lock_key(v_user));
+    end loop;
+
+    with ledger as (
+        select user_id, source, sum(points)::bigint as points
+        from plaro_transactions
+        where user_id = any(p_user_ids)
+        group by user_id, source
+    ),
+    stored as (
+        select user_id, source, points
+        from plaro_points_by_source
+        where user_id = any(p_user_ids)
+    ),
+    diff as (
+        select coalesce(l.user_id, s.user_id) as user_id,
+               coalesce(l.source, s.source) as source,
+               l.points,
+               l.user_id is null as orphaned
+        from ledger l
+        full join stored s on s.user_id = l.user_id and s.source = l.source
+        where l.points is distinct from s.points
+    ),
+    upserted as (
+        insert into plaro_points_by_source (user_id, source, points, updated_at)
+        select user_id, source, points, now() from diff where not orphaned
+        on conflict (user_id, source) do update
+            set points = excluded.points,
+                updated_at = now()
+        returning 1
+    ),
+    removed as (
+        delete from plaro_points_by_source p
+        using diff d
+        where d.orphaned and p.user_id = d.user_id and p.source = d.source
+        returning 1
+    )
+    select (select count(*) from upserted) + (select count(*) from removed) into v_fixed;
+
+    update user_gamification_summary g
+    set breakdown = b.breakdown,
+        version = g.version + 1,
+        updated_at = now()
+    from (
+        select u as user_id,
+               coalesce((
+                   select jsonb_object_agg(p.source, p.points)
+                   from plaro_points_by_source p
+                   where p.user_id = u
+               ), '{}'::jsonb) as breakdown
+        from (select distinct unnest(p_user_ids) as u) ids
+    ) b
+    where g.user_id = b.user_id
+      and g.breakdown is distinct from b.breakdown;
+
+    return v_fixed;
+end;
+$$;
+
+-- Backfill from the ledger (safe to re-run: totals are recomputed, not added to)
+insert into plaro_points_by_source (user_id, source, points)
+select user_id, source, sum(points)
+from plaro_transactions
+group by user_id, source
+on conflict (user_id, source) do update
+    set points = excluded.points,
+        updated_at = now();
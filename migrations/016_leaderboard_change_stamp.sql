@@ -0,0 +1,27 @@
+-- Leaderboard sync stamp (services/leaderboard_service.py Leaderboard.sync)
+-- last_updated is written from each worker's own clock, so it cannot order
+-- changes across workers. changed_at is stamped by the database on every
+-- write; workers pull rows changed since the newest stamp they have seen,
+-- re-reading a short overlap to catch transactions that committed late.
+
+alter table user_profile_rank
+    add column if not exists changed_at timestamptz not null default clock_timestamp();
+
+create or replace function stamp_user_profile_rank_change()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.changed_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_user_profile_rank_changed_at on user_profile_rank;
+create trigger trg_user_profile_rank_changed_at
+    before insert or update on user_profile_rank
+    for each row execute function stamp_user_profile_rank_change();
+
+-- Incremental sync pages on (changed_at, user_id)
+create index if not exists idx_user_profile_rank_changed
+    on user_profile_rank (changed_at, user_id);
@@ -0,0 +1,14 @@
+-- Give back an achievement claim whose points award failed
+-- (GamificationService.award_achievement via AchievementEngine.release), so the
+-- next event or backfill sweep can claim and award it again.
+
+create or replace function release_achievement(p_user_id uuid, p_bit integer)
+returns void
+language sql
+as $$
+    update user_achievements
+    set earned_mask = earned_mask & ~(1::bigint << p_bit),
+        updated_at = now()
+    where user_id = p_user_id
+      and earned_mask & (1::bigint << p_bit) <> 0;
+$$;
@@ -3,6 +3,7 @@ Enhanced Routes - Practice, RPG, Feedback, Notifications
 Adds: Practice Sets, RPG Mechanics, Feedback, Notifications
 """
 from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime
@@ -11,7 +12,7 @@ router = APIRouter()
 
 # Import all services
 try:
-    from database import EnhancedSupabaseHelper
+    from database import EnhancedSupabaseHelper, stream_json_array
     from services.practice_service import practice_service
     from services.rpg_progression_service import rpg_service
     from services.feedback_service import feedback_service
@@ -337,26 +338,65 @@ async def get_module_ratings(module_id: str):
 
 
 @router.get("/feedback/history")
-async def get_feedback_history(authorization: str = Header(None)):
-    """Get user feedback history"""
+async def get_feedback_history(
+    authorization: str = Header(None),
+    cursor: Optional[str] = None,
+    limit: int = 50
+):
+    """Get user feedback history (keyset paginated, pass next_cursor back as cursor)"""
     try:
         user = get_user_from_token(authorization)
         user_id = user.id
         
-        history = feedback_service.get_user_feedback_history(user_id)
+        page = feedback_service.get_user_feedback_history(user_id, cursor=cursor, limit=limit)
         
         return {
             "success": True,
-            "history": history
+            "history": page["history"],
+            "next_cursor": page["next_cursor"]
         }
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERROR] Feedback history failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/feedback/history/export")
+async def export_feedback_history(authorization: str = Header(None)):
+    """Stream the user's complete feedback history as a JSON array"""
+    try:
+        user = get_user_from_token(authorization)
+        
+        return StreamingResponse(
+            stream_json_array(feedback_service.iter_user_feedback_history(user.id)),
+            media_type="application/json"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[ERROR] Feedback export failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/feedback/tags/popular")
+async def get_popular_feedback_tags(limit: int = 20):
+    """Get most common feedback tags"""
+    try:
+        return {
+            "success": True,
+            **feedback_service.get_popular_tags(max_tags=max(1, min(limit, 100)))
+        }
+        
+    except Exception as e:
+        print(f"[ERROR] Popular tags failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==================== NOTIFICATIONS ====================
 
 @router.get("/notifications")
@@ -2,7 +2,7 @@
 Fixed New Routes with Comprehensive Error Handling
 """
 from fastapi import APIRouter, HTTPException, Depends, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -12,7 +12,7 @@ router = APIRouter()
 
 # Import services with error handling
 try:
-    from database import EnhancedSupabaseHelper
+    from database import EnhancedSupabaseHelper, stream_json_array
     db = EnhancedSupabaseHelper()
 except Exception as e:
     print(f"[ERROR] Failed to import database: {e}")
@@ -237,8 +237,8 @@ async def get_gamification_summary(authorization: str = Header(None)):
 
 
 @router.get("/gamification/leaderboard")
-async def get_leaderboard(limit: int = 20):
-    """Get leaderboard"""
+async def get_leaderboard(limit: int = 20, offset: int = 0, period: str = "all"):
+    """Get leaderboard (period: all, day, week or month)"""
     try:
         if not gamification_service:
             return {
@@ -247,13 +247,16 @@ async def get_leaderboard(limit: int = 20):
                 "error": "Gamification service unavailable"
             }
         
-        leaderboard = gamification_service.get_leaderboard(limit)
+        leaderboard = gamification_service.get_leaderboard(max(1, min(limit, 100)), max(0, offset), period)
         
         return {
             "success": True,
+            "period": period,
             "leaderboard": leaderboard
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERROR] Leaderboard error: {e}")
         traceback.print_exc()
@@ -264,6 +267,87 @@ async def get_leaderboard(limit: int = 20):
         }
 
 
+@router.get("/gamification/leaderboard/me")
+async def get_my_leaderboard_position(authorization: str = Header(None), radius: int = 5,
+                                      period: str = "all"):
+    """Get the user's rank and the users ranked around them (period: all, day, week or month)"""
+    try:
+        user = get_user_from_token(authorization)
+        
+        if not gamification_service:
+            raise HTTPException(status_code=503, detail="Gamification service unavailable")
+        
+        position = gamification_service.get_leaderboard_around(user.id, max(0, min(radius, 25)), period)
+        
+        return {
+            "success": True,
+            "period": period,
+            **position
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] Leaderboard position error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/gamification/transactions")
+async def get_point_transactions(
+    authorization: str = Header(None),
+    cursor: Optional[str] = None,
+    limit: int = 20
+):
+    """Get point transactions (keyset paginated, pass next_cursor back as cursor)"""
+    try:
+        user = get_user_from_token(authorization)
+        
+        if not gamification_service:
+            raise HTTPException(status_code=503, detail="Gamification service unavailable")
+        
+        page = gamification_service.get_user_transactions(user.id, cursor=cursor, limit=limit)
+        
+        return {
+            "success": True,
+            "transactions": page["items"],
+            "next_cursor": page["next_cursor"]
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] Transactions fetch error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/gamification/transactions/export")
+async def export_point_transactions(authorization: str = Header(None)):
+    """Stream the user's complete point ledger as a JSON array"""
+    try:
+        user = get_user_from_token(authorization)
+        
+        if not gamification_service:
+            raise HTTPException(status_code=503, detail="Gamification service unavailable")
+        
+        return StreamingResponse(
+            stream_json_array(gamification_service.iter_user_transactions(user.id)),
+            media_type="application/json"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[ERROR] Transactions export error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/gamification/daily-rewards")
 async def claim_daily_rewards(authorization: str = Header(None)):
     """Claim daily rewards - one per day only"""
@@ -572,6 +656,29 @@ async def get_content_recommendations(request: ContentRecommendationRequest, aut
         }
 
 
+@router.get("/content/search")
+async def search_content(q: str, cursor: Optional[str] = None, limit: int = 20):
+    """Ranked search across bytes, courses, taikens and posts (pass next_cursor back as cursor)"""
+    try:
+        from services.content_provider_service import content_provider
+        
+        page = content_provider.search_content(q, limit=limit, cursor=cursor)
+        
+        return {
+            "success": True,
+            "query": q,
+            "results": page["items"],
+            "next_cursor": page["next_cursor"]
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] Content search error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ========== PROFILE ROUTES ==========
 
 @router.get("/profile/complete/{user_id}")
@@ -843,19 +950,20 @@ async def get_user_profile(user_id: str):
 
 
 @router.get("/api/user/{user_id}/points")
-async def get_user_points(user_id: str):
+async def get_user_points(user_id: str, cursor: Optional[str] = None, limit: int = 20):
     """Get user gamification points"""
     try:
         if not db:
             raise HTTPException(status_code=500, detail="Database not available")
         
-        points_data = db.get_user_plaro_points(user_id)
+        points_data = db.get_user_plaro_points(user_id, cursor=cursor, limit=limit)
         
         return {
             "total": points_data.get('total_points', 0),
             "streak": 0,
             "rank_level": points_data.get('rank_level', 'beginner'),
             "recent_transactions": points_data.get('recent_transactions', []),
+            "next_cursor": points_data.get('next_cursor'),
             "success": True
         }
     except HTTPException:
@@ -953,12 +1061,14 @@ async def get_jobs_recommendations(user_id: str = None, target_role: str = None,
         
         from services.job_retrieval_service import adzuna_service
         
-        # Search jobs for target role
-        jobs = adzuna_service.search_jobs(query=target_role, location=location, max_results=10)
+        # Jobs for target role (local index, live search fallback)
+        jobs = adzuna_service.find_jobs(query=target_role, location=location, max_results=10)
         
         return {
             "jobs": jobs,
             "count": len(jobs),
+            # Most in-demand skills here, from the latest market snapshot
+            "skill_demand": adzuna_service.market.top(location),
             "success": True
         }
     except Exception as e:
@@ -971,6 +1081,27 @@ async def get_jobs_recommendations(user_id: str = None, target_role: str = None,
         }
 
 
+@router.get("/api/jobs/skill-demand")
+async def get_skill_demand(location: str = None, limit: int = 20):
+    """Most in-demand skills from the latest market snapshot (country-wide without location)"""
+    try:
+        from services.job_retrieval_service import adzuna_service
+        
+        return {
+            "skills": adzuna_service.market.top(location, limit=max(1, min(limit, 100))),
+            "location": location or "all",
+            "snapshot_at": adzuna_service.market.snapshot_at,
+            "success": True
+        }
+    except Exception as e:
+        print(f"[ERROR] Get skill demand error: {e}")
+        return {
+            "skills": [],
+            "success": False,
+            "error": str(e)
+        }
+
+
 @router.get("/agent/jobs/recommendations")
 async def get_agent_jobs_recommendations(target_role: str = None, location: str = "Chennai", user_id: str = None):
     """Get job recommendations for agent"""
@@ -980,13 +1111,14 @@ async def get_agent_jobs_recommendations(target_role: str = None, location: str
         
         from services.job_retrieval_service import adzuna_service
         
-        # Search jobs for target role
-        jobs = adzuna_service.search_jobs(query=target_role, location=location, max_results=10)
+        # Jobs for target role (local index, live search fallback)
+        jobs = adzuna_service.find_jobs(query=target_role, location=location, max_results=10)
         
         return {
             "jobs": jobs,
             "count": len(jobs),
             "target_role": target_role,
+            "skill_demand": adzuna_service.market.top(location),
             "success": True
         }
     except Exception as e:
@@ -2,16 +2,20 @@
 FIXED PEARL Routes - Proper Error Handling and Service Integration
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from database import EnhancedSupabaseHelper
+from row_models import UserSkillRow, ModuleProgressRow
 from services.enhanced_rag_service import enhanced_rag
 from config import get_settings
 import json
 import google.generativeai as genai
-from datetime import datetime
+from datetime import datetime, timedelta
 import traceback
+import asyncio
+import hashlib
+import time
 
 # Import new services
 try:
@@ -54,6 +58,7 @@ class CareerGoalRequest(BaseModel):
     goal: str
     user_id: str = settings.DEMO_USER_ID
     jd_text: Optional[str] = None
+    idempotency_key: Optional[str] = None
 
 
 class ModuleActionRequest(BaseModel):
@@ -101,6 +106,9 @@ class PEARLDatabaseHelper:
                 'session_id', session_id
             ).eq('skill', skill).eq('module_id', module_id).execute()
             
+            actions = module_data.get('actions', [])
+            completed_mask = ModuleProgressRow.mask_from_actions(actions)
+            
             progress_data = {
                 'session_id': session_id,
                 'user_id': user_id,
@@ -108,8 +116,10 @@ class PEARLDatabaseHelper:
                 'module_id': module_id,
                 'module_name': module_data.get('name', f'{skill} - Module {module_id}'),
                 'status': module_data.get('status', 'locked'),
-                'total_actions': len(module_data.get('actions', [])),
-                'actions_completed': sum(1 for a in module_data.get('actions', []) if a.get('completed')),
+                'total_actions': len(actions),
+                'actions_completed': bin(completed_mask).count('1'),
+                'completed_mask': completed_mask,
+                'next_action_index': ModuleProgressRow.first_incomplete(completed_mask, len(actions)),
                 'started_at': datetime.now().isoformat() if module_data.get('status') == 'active' else None,
                 'completed_at': datetime.now().isoformat() if module_data.get('status') == 'completed' else None
             }
@@ -206,124 +216,136 @@ Return only the JSON array, nothing else:
     return ["Communication", "Problem Solving", "Critical Thinking"]
 
 
+# ============================================
+# JOURNEY DEDUP
+# ============================================
+
+# Journeys currently generating in this worker, keyed by fingerprint / idempotency key
+_inflight_journeys: Dict[str, asyncio.Future] = {}
+
+
+def journey_fingerprint(req: CareerGoalRequest) -> str:
+    """Stable hash of the inputs a journey is generated from"""
+    goal = ' '.join(req.goal.lower().split())
+    jd_text = ' '.join((req.jd_text or '').lower().split())
+    return hashlib.sha256(f"{req.user_id}|{goal}|{jd_text}".encode()).hexdigest()
+
+
+def find_journey_session(req: CareerGoalRequest, idempotency_key: Optional[str],
+                         fingerprint: str, windowed: bool = True) -> Optional[Dict]:
+    """
+    Session already created for this idempotency key (keys never expire: the
+    unique index keeps one session per key), or for the same request within
+    the dedup window
+    """
+    if idempotency_key:
+        return db.find_recent_session(req.user_id, idempotency_key=idempotency_key)
+    
+    since = datetime.now() - timedelta(minutes=settings.JOURNEY_DEDUP_WINDOW_MINUTES)
+    return db.find_recent_session(req.user_id, request_fingerprint=fingerprint,
+                                  since=since if windowed else None)
+
+
+def is_stale_journey(session: Dict) -> bool:
+    """Failed, or still generating long after any worker would have finished"""
+    if session.get('status') == 'failed':
+        return True
+    if (session.get('jd_parsed') or {}).get('learning_paths') is not None:
+        return False
+    
+    # A retry restarts the clock through updated_at; created_at stays the original
+    started = session.get('updated_at') or session['created_at']
+    started_at = datetime.fromisoformat(started.replace('Z', '+00:00')).replace(tzinfo=None)
+    return datetime.now() - started_at > timedelta(minutes=settings.JOURNEY_DEDUP_WINDOW_MINUTES)
+
+
+def build_journey_response(session_id: str, target_role: str, learning_paths: Dict) -> Dict:
+    """Start-journey response for a session's learning paths"""
+    response = {
+        "success": True,
+        "session_id": session_id,
+        "target_role": target_role,
+        "skills_to_learn": list(learning_paths.keys()),
+        "learning_paths": learning_paths,
+        "total_modules": sum(len(p['modules']) for p in learning_paths.values()),
+        "estimated_hours": sum(p.get('estimated_hours', 0) for p in learning_paths.values()),
+        "next_action": None
+    }
+    
+    # Get next action if paths exist
+    if learning_paths:
+        first_skill = list(learning_paths.keys())[0]
+        response["next_action"] = pearl.get_next_action(learning_paths[first_skill])
+    
+    return response
+
+
+async def attach_to_journey(session: Dict, target_role: str) -> Dict:
+    """Replay a finished session, or wait for one generating in another worker"""
+    deadline = time.monotonic() + settings.JOURNEY_ATTACH_TIMEOUT_SECONDS
+    
+    while True:
+        learning_paths = (session.get('jd_parsed') or {}).get('learning_paths')
+        if learning_paths is not None:
+            print(f"[PEARL] ♻️  Reusing journey session: {session['id']}")
+            return {**build_journey_response(session['id'], target_role, learning_paths), "deduplicated": True}
+        
+        if time.monotonic() >= deadline:
+            return {
+                "success": True,
+                "session_id": session['id'],
+                "status": "generating",
+                "deduplicated": True
+            }
+        
+        await asyncio.sleep(1)
+        refreshed = db.client.table('ai_agent_sessions').select(
+            'id, jd_parsed, status'
+        ).eq('id', session['id']).single().execute()
+        session = {**session, **(refreshed.data or {})}
+        
+        if session.get('status') == 'failed':
+            raise HTTPException(status_code=500, detail="Journey generation failed, please retry")
+
+
 # ============================================
 # ENDPOINT 1: START JOURNEY (FIXED!)
 # ============================================
 
 @router.post("/start-journey")
-async def start_career_journey(req: CareerGoalRequest):
+async def start_career_journey(req: CareerGoalRequest, idempotency_key: Optional[str] = Header(None)):
     """
     Start learning journey - NOW WORKS FOR ANY GOAL!
+    Repeats (same Idempotency-Key header / body key, or same user + goal inside
+    the dedup window) get the existing session instead of a new generation.
     """
     try:
         print(f"\n[PEARL] ========== Starting journey ==========")
         print(f"[PEARL] Goal: '{req.goal}'")
         print(f"[PEARL] User ID: {req.user_id}")
         
-        # Step 1: Create session
-        print(f"[PEARL] Creating session...")
-        session = db.create_agent_session(
-            user_id=req.user_id, 
-            jd_text=req.jd_text or req.goal
-        )
-        
-        if not session or 'id' not in session:
-            raise HTTPException(
-                status_code=500, 
-                detail="Failed to create session - check database connection"
-            )
-        
-        session_id = session['id']
-        print(f"[PEARL] ✅ Session created: {session_id}")
+        idempotency_key = req.idempotency_key or idempotency_key
+        fingerprint = journey_fingerprint(req)
+        inflight_keys = [fingerprint] + ([f"{req.user_id}:{idempotency_key}"] if idempotency_key else [])
         
-        # Step 2: Extract skills
-        print(f"[PEARL] Extracting skills from goal...")
-        required_skills = await extract_skills_from_goal(req.goal)
-        target_role = req.goal
+        # Same request already generating in this worker: share its result
+        for key in inflight_keys:
+            if key in _inflight_journeys:
+                print(f"[PEARL] ♻️  Duplicate start request, attaching to in-flight journey")
+                return {**await asyncio.shield(_inflight_journeys[key]), "deduplicated": True}
         
-        print(f"[PEARL] ✅ Skills identified: {required_skills}")
-        
-        # Step 3: Get user's current skill levels
-        print(f"[PEARL] Fetching user skill levels...")
-        try:
-            user_skills = db.get_user_skills(req.user_id)
-            skill_dict = {s['skill_name']: float(s['confidence_score']) for s in user_skills}
-            print(f"[PEARL] ✅ User has {len(skill_dict)} existing skills")
-        except Exception as e:
-            print(f"[PEARL] ⚠️  No existing skills found: {e}")
-            skill_dict = {skill: 0.0 for skill in required_skills}
-        
-        # Step 4: Create learning paths
-        print(f"[PEARL] Creating learning paths...")
-        learning_paths = {}
-        
-        for skill in required_skills[:3]:  # Top 3 skills to avoid overload
-            current_conf = skill_dict.get(skill, 0.0)
-            
-            print(f"[PEARL] Creating path for '{skill}' (current: {current_conf})")
-            
-            try:
-                # Use pearl agent to create structured learning path
-                path = pearl.create_learning_path(skill, current_conf)
-                
-                # Enhance with real resources from RAG
-                print(f"[PEARL] Enhancing with real resources...")
-                for module in path['modules']:
-                    for action in module['actions']:
-                        if action['type'] in ['byte', 'course', 'taiken']:
-                            try:
-                                real_resources = enhanced_rag.retrieve_resources(
-                                    skill, action['type'], count=1
-                                )
-                                if real_resources:
-                                    action['external_resource'] = real_resources[0]
-                            except Exception as e:
-                                print(f"[PEARL] ⚠️  Resource retrieval failed: {e}")
-                
-                learning_paths[skill] = path
-                print(f"[PEARL] ✅ Path created for '{skill}' with {len(path['modules'])} modules")
-                
-                # Save to database
-                for module in path['modules']:
-                    try:
-                        PEARLDatabaseHelper.save_module_progress(
-                            session_id, req.user_id, skill, module['module_id'], module
-                        )
-                    except Exception as e:
-                        print(f"[PEARL] ⚠️  Module save failed: {e}")
-                
-            except Exception as e:
-                print(f"[PEARL] ❌ Failed to create path for '{skill}': {e}")
-                # Continue with other skills
-                continue
+        task = asyncio.ensure_future(start_or_attach_journey(req, idempotency_key, fingerprint))
+        for key in inflight_keys:
+            _inflight_journeys[key] = task
         
-        # Step 5: Save complete paths to session
-        print(f"[PEARL] Saving learning paths to session...")
-        PEARLDatabaseHelper.save_learning_paths(session_id, req.user_id, learning_paths)
+        def _release(done):
+            for key in inflight_keys:
+                if _inflight_journeys.get(key) is done:
+                    del _inflight_journeys[key]
+        task.add_done_callback(_release)
         
-        # Step 6: Build response
-        print(f"[PEARL] ========== Journey created successfully! ==========")
-        print(f"[PEARL] Session: {session_id}")
-        print(f"[PEARL] Skills: {list(learning_paths.keys())}")
-        print(f"[PEARL] Modules: {sum(len(p['modules']) for p in learning_paths.values())}")
-        
-        response = {
-            "success": True,
-            "session_id": session_id,
-            "target_role": target_role,
-            "skills_to_learn": list(learning_paths.keys()),
-            "learning_paths": learning_paths,
-            "total_modules": sum(len(p['modules']) for p in learning_paths.values()),
-            "estimated_hours": sum(p.get('estimated_hours', 0) for p in learning_paths.values()),
-            "next_action": None
-        }
-        
-        # Get next action if paths exist
-        if learning_paths:
-            first_skill = list(learning_paths.keys())[0]
-            response["next_action"] = pearl.get_next_action(learning_paths[first_skill])
-        
-        return response
+        # Shielded so a disconnecting client doesn't cancel generation others are waiting on
+        return await asyncio.shield(task)
     
     except HTTPException:
         raise
@@ -340,6 +362,139 @@ async def start_career_journey(req: CareerGoalRequest):
         )
 
 
+async def start_or_attach_journey(req: CareerGoalRequest, idempotency_key: Optional[str],
+                                  fingerprint: str) -> Dict:
+    """Reuse a live session for this request, otherwise generate the journey"""
+    existing = find_journey_session(req, idempotency_key, fingerprint)
+    if existing and not is_stale_journey(existing):
+        return await attach_to_journey(existing, req.goal)
+    
+    # Step 1: Create session (or take over a failed / abandoned one)
+    session_id = None
+    if not existing:
+        print(f"[PEARL] Creating session...")
+        session = db.create_agent_session(
+            user_id=req.user_id, 
+            jd_text=req.jd_text or req.goal,
+            idempotency_key=idempotency_key,
+            request_fingerprint=fingerprint
+        )
+        
+        if session and 'id' in session:
+            session_id = session['id']
+            print(f"[PEARL] ✅ Session created: {session_id}")
+        else:
+            # Another worker won the insert, or a row outside the dedup window
+            # (possibly abandoned) still holds the key / in-flight slot
+            existing = db.find_inflight_session(req.user_id, fingerprint) or \
+                find_journey_session(req, idempotency_key, fingerprint, windowed=False)
+            if not existing:
+                raise HTTPException(
+                    status_code=500, 
+                    detail="Failed to create session - check database connection"
+                )
+    
+    # Only a live session is attached to; a stale one is taken over
+    stale_before = datetime.now() - timedelta(minutes=settings.JOURNEY_DEDUP_WINDOW_MINUTES)
+    for _ in range(3):
+        if session_id:
+            break
+        if not is_stale_journey(existing):
+            return await attach_to_journey(existing, req.goal)
+        
+        print(f"[PEARL] Retrying stale session: {existing['id']}")
+        if db.take_over_session(existing['id'], stale_before):
+            session_id = existing['id']
+            break
+        
+        # Another worker retried it first, or the same request holds the in-flight slot in another session
+        existing = db.find_inflight_session(req.user_id, fingerprint) or \
+            find_journey_session(req, idempotency_key, fingerprint, windowed=False)
+        if not existing:
+            break
+    
+    if not session_id:
+        raise HTTPException(
+            status_code=503,
+            detail="Journey session is busy, please retry"
+        )
+    
+    try:
+        return await build_journey(req, session_id)
+    except Exception:
+        # Let the next retry take the session over instead of waiting on it
+        try:
+            db.client.table('ai_agent_sessions').update({'status': 'failed'}).eq('id', session_id).execute()
+        except Exception as e:
+            print(f"[PEARL] ⚠️  Could not mark session failed: {e}")
+        raise
+
+
+async def build_journey(req: CareerGoalRequest, session_id: str) -> Dict:
+    """Generate skills, learning paths and resources into a session"""
+    # Step 2: Extract skills
+    print(f"[PEARL] Extracting skills from goal...")
+    required_skills = await extract_skills_from_goal(req.goal)
+    target_role = req.goal
+    
+    print(f"[PEARL] ✅ Skills identified: {required_skills}")
+    
+    # Step 3: Get user's current skill levels
+    print(f"[PEARL] Fetching user skill levels...")
+    try:
+        user_skills = db.get_user_skill_rows(req.user_id, UserSkillRow.CONFIDENCE_COLUMNS)
+        skill_dict = {s.skill_name: s.confidence_score for s in user_skills}
+        print(f"[PEARL] ✅ User has {len(skill_dict)} existing skills")
+    except Exception as e:
+        print(f"[PEARL] ⚠️  No existing skills found: {e}")
+        skill_dict = {skill: 0.0 for skill in required_skills}
+    
+    # Step 4: Create learning paths
+    print(f"[PEARL] Creating learning paths...")
+    learning_paths = {}
+    
+    for skill in required_skills[:3]:  # Top 3 skills to avoid overload
+        current_conf = skill_dict.get(skill, 0.0)
+        
+        print(f"[PEARL] Creating path for '{skill}' (current: {current_conf})")
+        
+        try:
+            # Use pearl agent to create structured learning path
+            path = pearl.create_learning_path(skill, current_conf)
+            learning_paths[skill] = path
+            print(f"[PEARL] ✅ Path created for '{skill}' with {len(path['modules'])} modules")
+        except Exception as e:
+            print(f"[PEARL] ❌ Failed to create path for '{skill}': {e}")
+            # Continue with other skills
+            continue
+    
+    # Enhance with real resources from RAG (one batch for every path)
+    print(f"[PEARL] Enhancing with real resources...")
+    enhanced_rag.attach_external_resources(learning_paths)
+    
+    # Save to database
+    for skill, path in learning_paths.items():
+        for module in path['modules']:
+            try:
+                PEARLDatabaseHelper.save_module_progress(
+                    session_id, req.user_id, skill, module['module_id'], module
+                )
+            except Exception as e:
+                print(f"[PEARL] ⚠️  Module save failed: {e}")
+    
+    # Step 5: Save complete paths to session
+    print(f"[PEARL] Saving learning paths to session...")
+    PEARLDatabaseHelper.save_learning_paths(session_id, req.user_id, learning_paths)
+    
+    # Step 6: Build response
+    print(f"[PEARL] ========== Journey created successfully! ==========")
+    print(f"[PEARL] Session: {session_id}")
+    print(f"[PEARL] Skills: {list(learning_paths.keys())}")
+    print(f"[PEARL] Modules: {sum(len(p['modules']) for p in learning_paths.values())}")
+    
+    return build_journey_response(session_id, target_role, learning_paths)
+
+
 # ============================================
 # ENDPOINT 2: UNLOCK MODULE
 # ============================================
@@ -0,0 +1,152 @@
+"""
+Typed Row Models for hot tables
+Compact __slots__ classes with declared column projections, so query sites
+fetch only the columns they use and list-heavy code avoids per-row dicts.
+"""
+from typing import Dict, List, Any, Optional, Iterable
+import copy
+
+
+class Row:
+    """
+    Base for typed table rows.
+
+    Subclasses declare __slots__ (every known column), COLUMNS (the full
+    projection), optional DEFAULTS for NULL/missing columns and CASTS for
+    columns PostgREST may return as strings (e.g. numeric).
+    Columns outside the projection a row was fetched with hold their default.
+    """
+    __slots__ = ()
+    TABLE: str = ''
+    COLUMNS: str = ''
+    DEFAULTS: Dict[str, Any] = {}
+    CASTS: Dict[str, Any] = {}
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            value = fields.get(name)
+            if value is None:
+                value = copy.copy(self.DEFAULTS.get(name))
+            elif name in self.CASTS:
+                value = self.CASTS[name](value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_row(cls, row: Optional[Dict]) -> Optional['Row']:
+        """Build from a PostgREST row dict (unknown keys are ignored)"""
+        if not row:
+            return None
+        return cls(**row)
+
+    @classmethod
+    def from_rows(cls, rows: Optional[Iterable[Dict]]) -> List['Row']:
+        """Build a list of rows from a PostgREST response"""
+        return [cls(**row) for row in rows or []]
+
+    def to_dict(self) -> Dict:
+        """Plain dict for JSON responses"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        key = getattr(self, 'id', None) or getattr(self, 'user_id', None)
+        return f"<{type(self).__name__} {key}>"
+
+
+class UserProfileRow(Row):
+    """user_profiles"""
+    TABLE = 'user_profiles'
+    __slots__ = (
+        'user_id', 'username', 'email', 'role', 'profile_pic', 'streak_count',
+        'followers_count', 'following_count', 'onboarding_complete', 'is_verified',
+        'last_reward_date', 'created_at', 'updated_at'
+    )
+    COLUMNS = ', '.join(__slots__)
+    STREAK_COLUMNS = 'user_id, streak_count, updated_at'
+    DEFAULTS = {
+        'streak_count': 0,
+        'followers_count': 0,
+        'following_count': 0,
+        'onboarding_complete': False,
+        'is_verified': False
+    }
+
+
+class UserSkillRow(Row):
+    """user_skill_memory"""
+    TABLE = 'user_skill_memory'
+    __slots__ = (
+        'id', 'user_id', 'skill_name', 'confidence_score', 'practice_count',
+        'evidence', 'last_practiced_at', 'created_at', 'updated_at'
+    )
+    COLUMNS = ', '.join(__slots__)
+    CONFIDENCE_COLUMNS = 'skill_name, confidence_score'
+    DEFAULTS = {'confidence_score': 0.0, 'practice_count': 0, 'evidence': {}}
+    CASTS = {'confidence_score': float}
+
+
+class ModuleProgressRow(Row):
+    """ai_module_progress"""
+    TABLE = 'ai_module_progress'
+    __slots__ = (
+        'id', 'user_id', 'session_id', 'skill', 'module_id', 'module_name', 'status',
+        'actions_completed', 'total_actions', 'completed_mask', 'next_action_index',
+        'started_at', 'completed_at', 'cached_completion_data', 'last_cache_update',
+        'updated_at'
+    )
+    COLUMNS = ', '.join(__slots__)
+    # Everything except the generated content blob, for listings and counters
+    SUMMARY_COLUMNS = ', '.join(c for c in __slots__ if c != 'cached_completion_data')
+    # Per-action completion lives in completed_mask (bit i = action i), not in the blob
+    MAX_ACTIONS = 63
+    DEFAULTS = {
+        'status': 'locked',
+        'actions_completed': 0,
+        'total_actions': 0,
+        'completed_mask': 0,
+        'cached_completion_data': {}
+    }
+    
+    def is_action_completed(self, action_index: int) -> bool:
+        """Check one action's completion bit"""
+        return bool(self.completed_mask & (1 << action_index))
+    
+    @classmethod
+    def mask_from_actions(cls, actions: List[Dict]) -> int:
+        """Build a completion mask from legacy per-action 'completed' flags"""
+        return sum(
+            1 << idx for idx, action in enumerate(actions[:cls.MAX_ACTIONS])
+            if action.get('completed')
+        )
+    
+    @staticmethod
+    def first_incomplete(mask: int, total_actions: int) -> Optional[int]:
+        """Lowest action index whose bit is unset, or None when all are done"""
+        for idx in range(total_actions):
+            if not mask & (1 << idx):
+                return idx
+        return None
+
+
+class TransactionRow(Row):
+    """plaro_transactions"""
+    TABLE = 'plaro_transactions'
+    __slots__ = (
+        'id', 'user_id', 'source', 'points', 'reason', 'related_content_type',
+        'related_content_id_uuid', 'related_content_id_int', 'session_id',
+        'metadata', 'created_at'
+    )
+    COLUMNS = ', '.join(__slots__)
+    LEDGER_COLUMNS = 'id, created_at, source, points'
+    DEFAULTS = {'source': 'other', 'points': 0, 'metadata': {}}
+
+
+class ContentEventRow(Row):
+    """user_content_events"""
+    TABLE = 'user_content_events'
+    __slots__ = (
+        'id', 'user_id', 'session_id', 'content_type', 'event_type',
+        'content_id_uuid', 'content_id_int', 'metadata', 'created_at'
+    )
+    COLUMNS = ', '.join(__slots__)
+    ACTIVITY_COLUMNS = 'event_type, content_type, created_at, metadata'
+    DEFAULTS = {'metadata': {}}
@@ -0,0 +1,202 @@
+"""
+Achievement Engine
+Event-driven achievements: every rule subscribes to one event type and is
+evaluated only when that event happens, and a user's earned achievements are
+bits in one user_achievements mask, claimed atomically, so awarding never
+searches the points ledger
+"""
+
+from typing import List, Dict, Callable, Tuple, Optional
+import threading
+
+from config import get_settings
+
+settings = get_settings()
+
+try:
+    from database import get_supabase
+except Exception as e:
+    print(f"[WARNING] Achievement persistence unavailable: {e}")
+    get_supabase = None
+
+
+# Bit of each achievement in user_achievements.earned_mask (append only, never renumber).
+# Bits 3-8 are reserved for achievements whose events are not emitted by this service
+# yet (posts, taikens and follows are created outside it); they have no rules below.
+ACHIEVEMENT_BITS = {
+    "first_module": 0,
+    "week_streak": 1,
+    "skill_master": 2,
+    "first_post": 3,
+    "taiken_creator": 4,
+    "first_follower": 5,
+    "community_helper": 6,
+    "roadmap_complete": 7,
+    "freelance_ready": 8
+}
+
+# event type -> [(achievement, condition on the event payload)]
+RULES: Dict[str, List[Tuple[str, Callable[[Dict], bool]]]] = {
+    "module_completed": [("first_module", lambda event: True)],
+    "streak_updated": [("week_streak", lambda event: (event.get("streak") or 0) >= 7)],
+    "confidence_changed": [("skill_master", lambda event: (event.get("confidence") or 0) >= 0.8)]
+}
+
+
+class AchievementEngine:
+    """
+    Earned-achievement masks with an in-process cache.
+    Bits are only set, except when the award behind a claim fails and the
+    claim is released, so events for achievements a user already has cost no
+    database call, and a new one is a single atomic claim.
+    """
+    
+    TABLE = "user_achievements"
+    MAX_CACHED_USERS = 10000
+    
+    def __init__(self):
+        self._masks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Achievement persistence unavailable: {e}")
+    
+    def _remember(self, user_id: str, mask: int):
+        with self._lock:
+            mask |= self._masks.pop(user_id, 0)
+            self._masks[user_id] = mask
+            while len(self._masks) > self.MAX_CACHED_USERS:
+                self._masks.pop(next(iter(self._masks)))
+    
+    def earned_mask(self, user_id: str) -> int:
+        """The user's earned bits (read once per user, then from memory)"""
+        mask = self._masks.get(user_id)
+        if mask is not None:
+            return mask
+        
+        mask = 0
+        if self._client:
+            try:
+                response = self._client.table(self.TABLE).select('earned_mask').eq(
+                    'user_id', user_id
+                ).limit(1).execute()
+                if response.data:
+                    mask = int(response.data[0].get('earned_mask') or 0)
+            except Exception as e:
+                print(f"[GAMIFICATION] Achievement mask read failed: {e}")
+                return 0
+        
+        self._remember(user_id, mask)
+        return mask
+    
+    def earned(self, user_id: str) -> List[str]:
+        mask = self.earned_mask(user_id)
+        return [key for key, bit in ACHIEVEMENT_BITS.items() if mask >> bit & 1]
+    
+    def evaluate(self, user_id: str, event_type: str, event: Optional[Dict] = None) -> List[str]:
+        """Achievements the event satisfies that the user does not have yet"""
+        rules = RULES.get(event_type)
+        if not rules:
+            return []
+        
+        mask = self.earned_mask(user_id)
+        return [
+            key for key, condition in rules
+            if not mask >> ACHIEVEMENT_BITS[key] & 1 and condition(event or {})
+        ]
+    
+    def claim(self, user_id: str, key: str) -> bool:
+        """Set the achievement's bit; True only for the call that set it"""
+        bit = ACHIEVEMENT_BITS[key]
+        if self.earned_mask(user_id) >> bit & 1:
+            return False
+        if not self._client:
+            self._remember(user_id, 1 << bit)
+            return True
+        
+        try:
+            # Atomic test-and-set in Postgres (migrations/014_achievement_masks.sql)
+            result = self._client.rpc('claim_achievement', {
+                'p_user_id': user_id,
+                'p_bit': bit
+            }).execute().data or {}
+            self._remember(user_id, int(result.get('mask') or 0))
+            return bool(result.get('newly'))
+        except Exception as rpc_error:
+            print(f"[GAMIFICATION] claim_achievement RPC unavailable, updating mask directly: {rpc_error}")
+        
+        # Compare-and-set on the old mask so concurrent claims are settled once
+        for _ in range(3):
+            response = self._client.table(self.TABLE).select('earned_mask').eq(
+                'user_id', user_id
+            ).limit(1).execute()
+            
+            if not response.data:
+                try:
+                    self._client.table(self.TABLE).insert({
+                        'user_id': user_id, 'earned_mask': 1 << bit
+                    }).execute()
+                    self._remember(user_id, 1 << bit)
+                    return True
+                except Exception:
+                    # Another claim created the row first
+                    continue
+            
+            old = int(response.data[0].get('earned_mask') or 0)
+            self._remember(user_id, old)
+            if old >> bit & 1:
+                return False
+            
+            updated = self._client.table(self.TABLE).update({
+                'earned_mask': old | 1 << bit
+            }).eq('user_id', user_id).eq('earned_mask', old).execute()
+            if updated.data:
+                self._remember(user_id, old | 1 << bit)
+                return True
+        
+        raise RuntimeError("Achievement claim conflicted with concurrent updates")
+    
+    def release(self, user_id: str, key: str):
+        """Clear a claimed bit whose award failed, so a later event can claim it again"""
+        bit = ACHIEVEMENT_BITS[key]
+        with self._lock:
+            if user_id in self._masks:
+                self._masks[user_id] &= ~(1 << bit)
+        if not self._client:
+            return
+        
+        try:
+            # Atomic bit clear in Postgres (migrations/017_release_achievement.sql)
+            self._client.rpc('release_achievement', {
+                'p_user_id': user_id,
+                'p_bit': bit
+            }).execute()
+            return
+        except Exception as rpc_error:
+            print(f"[GAMIFICATION] release_achievement RPC unavailable, updating mask directly: {rpc_error}")
+        
+        try:
+            for _ in range(3):
+                response = self._client.table(self.TABLE).select('earned_mask').eq(
+                    'user_id', user_id
+                ).limit(1).execute()
+                old = int(response.data[0].get('earned_mask') or 0) if response.data else 0
+                if not old >> bit & 1:
+                    return
+                
+                updated = self._client.table(self.TABLE).update({
+                    'earned_mask': old & ~(1 << bit)
+                }).eq('user_id', user_id).eq('earned_mask', old).execute()
+                if updated.data:
+                    return
+            print(f"[GAMIFICATION] Releasing {key} for {user_id} conflicted with concurrent updates")
+        except Exception as e:
+            print(f"[GAMIFICATION] Releasing {key} for {user_id} failed: {e}")
+
+
+# Global instance
+achievement_engine = AchievementEngine()
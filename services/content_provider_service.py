@@ -4,12 +4,250 @@ Manages content from database tables: courses, bytes, taikens
 Provides structured learning paths from actual platform content
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from supabase import create_client
+import threading
+import time
 from config import get_settings
+from database import encode_cursor, decode_cursor, is_missing_function
+from services.resource_index import analyze
 
 settings = get_settings()
 
+# Column projections per content table; list views never need full bodies
+BYTE_COLUMNS = 'byte_id, caption, byte, domain, difficulty, like_count, educational_value, user_id'
+COURSE_COLUMNS = 'course_id, title, description, domain, category, difficulty, user_id, thumbnail_url, created_at'
+TAIKEN_COLUMNS = (
+    'taiken_id, title, description, domain, difficulty, total_stages, '
+    'total_questions, average_rating, play_count'
+)
+POST_COLUMNS = 'post_id, title, domain, difficulty, tags, like_count, educational_value'
+
+
+# Content types in listing order (bytes, courses, taikens, posts)
+CONTENT_TYPES = ('video', 'course', 'taiken', 'text')
+
+MAX_SEARCH_PAGE_SIZE = 50
+
+# Rows read per table when search falls back to ILIKE scans
+SEARCH_FALLBACK_SCAN = 200
+
+# Worker pool for the per-table fallback when the unified RPC is unavailable
+_fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="content")
+
+
+class DomainContentCache:
+    """
+    Per-domain content listings ({content_type: [item]}), versioned.
+    Triggers bump content_domain_versions whenever a content row in a domain is
+    created, updated or deleted; each worker pulls those bumps every
+    CONTENT_VERSION_CHECK_SECONDS and serves listings whose version still
+    matches from memory, falling back to the shared content_domain_cache table
+    and only then to the content tables.
+    """
+    
+    TABLE = "content_domain_cache"
+    VERSIONS_TABLE = "content_domain_versions"
+    MAX_LOCAL_ENTRIES = 512
+    # Bumps are stamped before their transaction commits, so each check re-reads
+    # this far behind the newest stamp seen to catch late commits
+    VERSION_OVERLAP_SECONDS = 60
+    
+    def __init__(self, client, fetch: Callable[[List[str]], Tuple[Dict[str, Dict[str, List[Dict]]], set]]):
+        self._client = client
+        self._fetch = fetch
+        # domain -> (version, cached_at epoch, content)
+        self._local: Dict[str, Tuple[int, float, Dict[str, List[Dict]]]] = {}
+        self.versions: Dict[str, int] = {}
+        self.versions_checked_at = 0.0
+        self._versions_seen: Optional[str] = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+    
+    # ========== VERSIONS ==========
+    
+    def refresh_versions(self) -> List[str]:
+        """Pull version bumps since the last check; returns the domains that changed"""
+        changed = []
+        since = None
+        if self._versions_seen:
+            seen_at = datetime.fromisoformat(self._versions_seen.replace('Z', '+00:00'))
+            since = (seen_at - timedelta(seconds=self.VERSION_OVERLAP_SECONDS)).isoformat()
+        
+        try:
+            position = None
+            while True:
+                query = self._client.table(self.VERSIONS_TABLE).select('domain, version, updated_at')
+                if position:
+                    # Keyset on (updated_at, domain) so bumps sharing a stamp are not skipped
+                    query = query.or_(
+                        f'updated_at.gt."{position[0]}",'
+                        f'and(updated_at.eq."{position[0]}",domain.gt."{position[1]}")'
+                    )
+                elif since:
+                    query = query.gte('updated_at', since)
+                rows = query.order('updated_at').order('domain').limit(1000).execute().data or []
+                
+                # Re-read rows are deduplicated by version
+                for row in rows:
+                    if self.versions.get(row['domain']) != row['version']:
+                        self.versions[row['domain']] = row['version']
+                        changed.append(row['domain'])
+                if rows:
+                    position = (rows[-1]['updated_at'], rows[-1]['domain'])
+                    self._versions_seen = rows[-1]['updated_at']
+                if len(rows) < 1000:
+                    break
+        except Exception as e:
+            # Without versions, entries still expire after CONTENT_CACHE_TTL_SECONDS
+            print(f"[CONTENT] Content versions unavailable: {e}")
+        
+        self.versions_checked_at = time.time()
+        return changed
+    
+    def ensure_versions(self):
+        """Re-check versions when the last check is older than CONTENT_VERSION_CHECK_SECONDS"""
+        if time.time() - self.versions_checked_at <= settings.CONTENT_VERSION_CHECK_SECONDS:
+            return
+        
+        with self._lock:
+            if time.time() - self.versions_checked_at <= settings.CONTENT_VERSION_CHECK_SECONDS:
+                return
+            changed = self.refresh_versions()
+        
+        # Domains this worker already serves are re-fetched right away, off the request path
+        stale = [domain for domain in changed if domain in self._local]
+        if stale:
+            self._refresh_in_background(stale)
+    
+    def version(self, domain: str) -> int:
+        return self.versions.get(domain, 0)
+    
+    # ========== LOOKUP ==========
+    
+    def get_many(self, domains: List[str]) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Listings for several domains
+        
+        Args:
+            domains: Skill/domain names
+        
+        Returns:
+            Dict of {domain: {content_type: [content item]}}; treat as read-only
+        """
+        
+        self.ensure_versions()
+        now = time.time()
+        content, missing = {}, []
+        
+        for domain in dict.fromkeys(d for d in domains if d):
+            entry = self._local.get(domain)
+            if entry and entry[0] == self.version(domain) and now - entry[1] < settings.CONTENT_CACHE_TTL_SECONDS:
+                content[domain] = entry[2]
+            else:
+                missing.append(domain)
+        
+        if missing:
+            content.update(self._load(missing))
+        
+        return content
+    
+    def _load(self, domains: List[str]) -> Dict[str, Dict[str, List[Dict]]]:
+        """Current listings from the shared table, fetching (and sharing) what is outdated there"""
+        # Versions are read before fetching: a bump during the fetch leaves the entry outdated
+        versions = {domain: self.version(domain) for domain in domains}
+        content = {}
+        
+        try:
+            rows = self._client.table(self.TABLE).select(
+                'domain, version, payload, cached_at'
+            ).in_('domain', domains).execute().data or []
+            
+            for row in rows:
+                cached_at = datetime.fromisoformat(row['cached_at'].replace('Z', '+00:00')).timestamp()
+                if row['version'] == versions.get(row['domain']) and \
+                        time.time() - cached_at < settings.CONTENT_CACHE_TTL_SECONDS:
+                    content[row['domain']] = row.get('payload') or {}
+                    self._remember(row['domain'], (row['version'], cached_at, content[row['domain']]))
+        except Exception as e:
+            print(f"[CONTENT] Shared content cache read failed: {e}")
+        
+        outdated = [domain for domain in domains if domain not in content]
+        if outdated:
+            fetched, failed = self._fetch(outdated)
+            now = time.time()
+            for domain in outdated:
+                if domain in failed:
+                    # Incomplete listings are never cached; an older copy beats a partial one
+                    entry = self._local.get(domain)
+                    content[domain] = entry[2] if entry else fetched.get(domain, {})
+                    continue
+                content[domain] = fetched.get(domain, {})
+                self._remember(domain, (versions[domain], now, content[domain]))
+            
+            complete = {domain: listing for domain, listing in fetched.items() if domain not in failed}
+            if complete:
+                self._share(complete, versions, now)
+        
+        return content
+    
+    def _share(self, fetched: Dict[str, Dict[str, List[Dict]]], versions: Dict[str, int], now: float):
+        cached_at = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        try:
+            self._client.table(self.TABLE).upsert([
+                {'domain': domain, 'version': versions[domain], 'payload': listing, 'cached_at': cached_at}
+                for domain, listing in fetched.items()
+            ], on_conflict='domain').execute()
+        except Exception as e:
+            print(f"[CONTENT] Shared content cache write failed: {e}")
+    
+    def _remember(self, domain: str, entry: Tuple[int, float, Dict[str, List[Dict]]]):
+        with self._lock:
+            self._local.pop(domain, None)
+            self._local[domain] = entry
+            while len(self._local) > self.MAX_LOCAL_ENTRIES:
+                self._local.pop(next(iter(self._local)))
+    
+    def _refresh_in_background(self, domains: List[str]):
+        """Re-fetch changed domains once per worker"""
+        with self._lock:
+            domains = [domain for domain in domains if domain not in self._refreshing]
+            self._refreshing.update(domains)
+        if not domains:
+            return
+        
+        def _refresh():
+            try:
+                self._load(domains)
+            except Exception as e:
+                print(f"[CONTENT] Cache refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(domains)
+        
+        threading.Thread(target=_refresh, daemon=True).start()
+    
+    # ========== WARM-UP ==========
+    
+    def popular_domains(self, limit: int) -> List[str]:
+        """Domains the most learners are working on (skills in user_skill_memory)"""
+        try:
+            rows = self._client.rpc('popular_content_domains', {'p_limit': limit}).execute().data or []
+            return [row['domain'] for row in rows if row.get('domain')]
+        except Exception as e:
+            print(f"[CONTENT] Popular domains unavailable: {e}")
+            return []
+    
+    def warm(self, limit: Optional[int] = None) -> int:
+        """Load the most popular domains into this worker's cache; returns domains warmed"""
+        domains = self.popular_domains(limit or settings.CONTENT_WARM_DOMAINS)
+        if domains:
+            self.get_many(domains)
+            print(f"[CONTENT] ✅ Warmed content cache for {len(domains)} domains")
+        return len(domains)
+
 
 class ContentProviderService:
     """
@@ -19,6 +257,221 @@ class ContentProviderService:
     
     def __init__(self):
         self.client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self._rpc_available = True
+        self._search_rpc_available = True
+        self.cache = DomainContentCache(self.client, self._fetch_content)
+        self._warmup_started = False
+    
+    # ========== ROW CONVERSION ==========
+    
+    @staticmethod
+    def _byte_item(byte: Dict) -> Dict:
+        return {
+            "provider_id": f"byte_{byte['byte_id']}",
+            "name": "PEARL Byte",
+            "content_type": "video",
+            "title": byte.get('caption', 'Learning Byte'),
+            "difficulty": byte.get('difficulty', 'beginner'),
+            "duration": 5,  # Bytes are short
+            "source_url": byte.get('byte'),
+            "content_id": byte['byte_id'],
+            "metadata": {
+                "likes": byte.get('like_count', 0),
+                "educational_value": byte.get('educational_value', 0.5),
+                "creator_id": byte.get('user_id')
+            }
+        }
+    
+    @staticmethod
+    def _course_item(course: Dict) -> Dict:
+        return {
+            "provider_id": f"course_{course['course_id']}",
+            "name": "PEARL Course",
+            "content_type": "course",
+            "title": course.get('title'),
+            "difficulty": course.get('difficulty', 'intermediate'),
+            "duration": 60,  # Estimate
+            "source_url": f"/courses/{course['course_id']}",
+            "content_id": course['course_id'],
+            "metadata": {
+                "description": course.get('description'),
+                "category": course.get('category'),
+                "creator_id": course.get('user_id'),
+                "thumbnail": course.get('thumbnail_url')
+            }
+        }
+    
+    @staticmethod
+    def _taiken_item(taiken: Dict) -> Dict:
+        return {
+            "provider_id": f"taiken_{taiken['taiken_id']}",
+            "name": "PEARL Taiken",
+            "content_type": "taiken",
+            "title": taiken.get('title'),
+            "difficulty": taiken.get('difficulty'),
+            "duration": (taiken.get('total_stages') or 1) * 10,  # ~10 min per stage
+            "source_url": f"/taikens/{taiken['taiken_id']}",
+            "content_id": taiken['taiken_id'],
+            "metadata": {
+                "description": taiken.get('description'),
+                "stages": taiken.get('total_stages'),
+                "questions": taiken.get('total_questions'),
+                "rating": taiken.get('average_rating', 0),
+                "plays": taiken.get('play_count', 0)
+            }
+        }
+    
+    @staticmethod
+    def _post_item(post: Dict) -> Dict:
+        return {
+            "provider_id": f"post_{post['post_id']}",
+            "name": "PEARL Article",
+            "content_type": "text",
+            "title": post.get('title', 'Learning Article'),
+            "difficulty": post.get('difficulty', 'beginner'),
+            "duration": 15,  # Reading time estimate
+            "source_url": f"/posts/{post['post_id']}",
+            "content_id": post['post_id'],
+            "metadata": {
+                "tags": post.get('tags', []),
+                "likes": post.get('like_count', 0),
+                "educational_value": post.get('educational_value', 0.5)
+            }
+        }
+    
+    # ========== FETCH ==========
+    
+    def _table_query(self, content_type: str, domain: str, limit: int, difficulty: Optional[str] = None):
+        """Per-table listing query for one domain, best first"""
+        if content_type == 'video':
+            query = self.client.table('bytes').select(BYTE_COLUMNS).eq('domain', domain)
+            order = 'educational_value'
+        elif content_type == 'course':
+            query = self.client.table('courses').select(
+                f'{COURSE_COLUMNS}, course_videos(count)'
+            ).eq('domain', domain)
+            order = 'created_at'
+        elif content_type == 'taiken':
+            query = self.client.table('taikens').select(TAIKEN_COLUMNS).eq(
+                'domain', domain
+            ).eq('is_published', True)
+            order = 'average_rating'
+        else:
+            query = self.client.table('post').select(POST_COLUMNS).eq(
+                'domain', domain
+            ).eq('is_published', True).eq('is_hidden', False)
+            order = 'educational_value'
+        
+        if difficulty:
+            query = query.eq('difficulty', difficulty)
+        
+        return query.order(order, desc=True).limit(limit)
+    
+    def _fetch_rows(self, domains: List[str], limit: int, difficulty: Optional[str] = None,
+                    content_type: Optional[str] = None) -> Tuple[List[Dict], set]:
+        """
+        (content_type, domain, item) rows for every domain, plus the domains
+        whose rows are incomplete because a query failed.
+        One round trip through the get_domain_content RPC; without it, every
+        per-table query runs concurrently instead of one after another.
+        """
+        if self._rpc_available:
+            try:
+                return self.client.rpc('get_domain_content', {
+                    'p_domains': domains,
+                    'p_limit': limit,
+                    'p_difficulty': difficulty,
+                    'p_content_type': content_type
+                }).execute().data or [], set()
+            except Exception as e:
+                print(f"[CONTENT] Unified content query failed, querying tables concurrently: {e}")
+                # Only a missing function is permanent; a timeout is retried on the next fetch
+                if is_missing_function(e):
+                    self._rpc_available = False
+        
+        futures = {
+            (item_type, domain): _fetch_pool.submit(
+                lambda q: q.execute(), self._table_query(item_type, domain, limit, difficulty)
+            )
+            for domain in domains for item_type in CONTENT_TYPES
+            if not content_type or content_type == item_type
+        }
+        
+        rows, failed = [], set()
+        for (item_type, domain), future in futures.items():
+            try:
+                for item in future.result().data or []:
+                    rows.append({"content_type": item_type, "domain": domain, "item": item})
+            except Exception as e:
+                print(f"[CONTENT] {item_type} query failed for {domain}: {e}")
+                failed.add(domain)
+        return rows, failed
+    
+    def fetch_domain_content(
+        self,
+        domains: List[str],
+        limit: Optional[int] = None,
+        difficulty: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Content listings for several domains in one batched fetch
+        
+        Args:
+            domains: Skill/domain names
+            limit: Items per content type per domain (default CONTENT_FETCH_LIMIT)
+            difficulty: Only content of this difficulty
+            content_type: Only this content type ('video', 'course', 'taiken', 'text')
+        
+        Returns:
+            Dict of {domain: {content_type: [content item]}}, each list best first
+        """
+        
+        return self._fetch_content(domains, limit, difficulty, content_type)[0]
+    
+    def _fetch_content(
+        self,
+        domains: List[str],
+        limit: Optional[int] = None,
+        difficulty: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Tuple[Dict[str, Dict[str, List[Dict]]], set]:
+        """fetch_domain_content plus the domains whose listings are incomplete (kept out of the cache)"""
+        domains = list(dict.fromkeys(d for d in domains if d))
+        limit = limit or settings.CONTENT_FETCH_LIMIT
+        content = {domain: {content_type: [] for content_type in CONTENT_TYPES} for domain in domains}
+        if not domains:
+            return content, set()
+        
+        converters = {
+            'video': self._byte_item,
+            'course': self._course_item,
+            'taiken': self._taiken_item,
+            'text': self._post_item
+        }
+        
+        rows, failed = self._fetch_rows(domains, limit, difficulty, content_type)
+        for row in rows:
+            by_type = content.get(row.get('domain'))
+            if by_type is not None and row.get('content_type') in converters:
+                by_type[row['content_type']].append(converters[row['content_type']](row['item']))
+        
+        return content, failed
+    
+    @staticmethod
+    def _select(content: Dict[str, List[Dict]], content_type: Optional[str] = None,
+                difficulty: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Filter one domain's fetched listings like a per-table query would"""
+        selected = []
+        for item_type in CONTENT_TYPES:
+            if content_type and content_type != item_type:
+                continue
+            items = [
+                item for item in content.get(item_type, [])
+                if not difficulty or item.get('difficulty') == difficulty
+            ]
+            selected.extend(items[:limit])
+        return selected[:limit]
     
     def get_content_for_skill(
         self,
@@ -41,118 +494,20 @@ class ContentProviderService:
         """
         
         try:
-            all_content = []
-            
-            # Search bytes (short videos)
-            if not content_type or content_type == 'video':
-                bytes_query = self.client.table('bytes').select('*').eq('domain', skill)
-                
-                if difficulty:
-                    bytes_query = bytes_query.eq('difficulty', difficulty)
-                
-                bytes_result = bytes_query.order('educational_value', desc=True).limit(limit).execute()
-                
-                for byte in bytes_result.data or []:
-                    all_content.append({
-                        "provider_id": f"byte_{byte['byte_id']}",
-                        "name": "PEARL Byte",
-                        "content_type": "video",
-                        "title": byte.get('caption', 'Learning Byte'),
-                        "difficulty": byte.get('difficulty', 'beginner'),
-                        "duration": 5,  # Bytes are short
-                        "source_url": byte.get('byte'),
-                        "content_id": byte['byte_id'],
-                        "metadata": {
-                            "likes": byte.get('like_count', 0),
-                            "educational_value": byte.get('educational_value', 0.5),
-                            "creator_id": byte.get('user_id')
-                        }
-                    })
-            
-            # Search courses
-            if not content_type or content_type == 'course':
-                courses_query = self.client.table('courses').select('*, course_videos(count)').eq('domain', skill)
-                
-                if difficulty:
-                    courses_query = courses_query.eq('difficulty', difficulty)
-                
-                courses_result = courses_query.order('created_at', desc=True).limit(limit).execute()
-                
-                for course in courses_result.data or []:
-                    all_content.append({
-                        "provider_id": f"course_{course['course_id']}",
-                        "name": "PEARL Course",
-                        "content_type": "course",
-                        "title": course.get('title'),
-                        "difficulty": course.get('difficulty', 'intermediate'),
-                        "duration": 60,  # Estimate
-                        "source_url": f"/courses/{course['course_id']}",
-                        "content_id": course['course_id'],
-                        "metadata": {
-                            "description": course.get('description'),
-                            "category": course.get('category'),
-                            "creator_id": course.get('user_id'),
-                            "thumbnail": course.get('thumbnail_url')
-                        }
-                    })
+            content = self.cache.get_many([skill])[skill]
+            all_content = self._select(content, content_type, difficulty, limit)
             
-            # Search taikens (interactive experiences)
-            if not content_type or content_type == 'taiken':
-                taikens_query = self.client.table('taikens').select('*').eq('domain', skill).eq('is_published', True)
-                
-                if difficulty:
-                    taikens_query = taikens_query.eq('difficulty', difficulty)
-                
-                taikens_result = taikens_query.order('average_rating', desc=True).limit(limit).execute()
-                
-                for taiken in taikens_result.data or []:
-                    all_content.append({
-                        "provider_id": f"taiken_{taiken['taiken_id']}",
-                        "name": "PEARL Taiken",
-                        "content_type": "taiken",
-                        "title": taiken.get('title'),
-                        "difficulty": taiken.get('difficulty'),
-                        "duration": taiken.get('total_stages', 1) * 10,  # ~10 min per stage
-                        "source_url": f"/taikens/{taiken['taiken_id']}",
-                        "content_id": taiken['taiken_id'],
-                        "metadata": {
-                            "description": taiken.get('description'),
-                            "stages": taiken.get('total_stages'),
-                            "questions": taiken.get('total_questions'),
-                            "rating": taiken.get('average_rating', 0),
-                            "plays": taiken.get('play_count', 0)
-                        }
-                    })
-            
-            # Search posts (text/articles)
-            if not content_type or content_type == 'text':
-                posts_query = self.client.table('post').select('*').eq('domain', skill).eq('is_published', True).eq('is_hidden', False)
-                
-                if difficulty:
-                    posts_query = posts_query.eq('difficulty', difficulty)
-                
-                posts_result = posts_query.order('educational_value', desc=True).limit(limit).execute()
-                
-                for post in posts_result.data or []:
-                    all_content.append({
-                        "provider_id": f"post_{post['post_id']}",
-                        "name": "PEARL Article",
-                        "content_type": "text",
-                        "title": post.get('title', 'Learning Article'),
-                        "difficulty": post.get('difficulty', 'beginner'),
-                        "duration": 15,  # Reading time estimate
-                        "source_url": f"/posts/{post['post_id']}",
-                        "content_id": post['post_id'],
-                        "metadata": {
-                            "content": post.get('content'),
-                            "tags": post.get('tags', []),
-                            "likes": post.get('like_count', 0),
-                            "educational_value": post.get('educational_value', 0.5)
-                        }
-                    })
+            # The cached listing is only the top CONTENT_FETCH_LIMIT per type, unfiltered;
+            # when a full list comes up short, more matches may sit below it
+            if len(all_content) < limit and any(
+                len(content.get(item_type, [])) >= settings.CONTENT_FETCH_LIMIT
+                for item_type in CONTENT_TYPES if not content_type or content_type == item_type
+            ):
+                fetched = self.fetch_domain_content([skill], limit, difficulty, content_type)[skill]
+                all_content = self._select(fetched, content_type, difficulty, limit)
             
             print(f"[CONTENT] 📚 Found {len(all_content)} resources for {skill} from database")
-            return all_content[:limit]
+            return all_content
         
         except Exception as e:
             print(f"[CONTENT] ERROR: Failed to get content for {skill}: {e}")
@@ -161,7 +516,8 @@ class ContentProviderService:
     def get_mixed_learning_path(
         self,
         skill: str,
-        learning_preference: str = "mixed"
+        learning_preference: str = "mixed",
+        content: Optional[Dict[str, List[Dict]]] = None
     ) -> List[Dict]:
         """
         Create a balanced content mix based on user's learning preference
@@ -169,6 +525,7 @@ class ContentProviderService:
         Args:
             skill: Skill to learn
             learning_preference: 'video', 'reading', 'hands_on', or 'mixed'
+            content: The skill's listings from fetch_domain_content (cached listings when omitted)
         
         Returns:
             List of content items optimized for the preference
@@ -184,20 +541,22 @@ class ContentProviderService:
         
         pref_weights = weights.get(learning_preference, weights["mixed"])
         
-        content = []
+        if content is None:
+            try:
+                content = self.cache.get_many([skill])[skill]
+            except Exception as e:
+                print(f"[CONTENT] ERROR: Failed to get content for {skill}: {e}")
+                content = {}
+        
+        mixed = []
         
-        # Get content based on weights
+        # Take content based on weights
         for content_type, weight in pref_weights.items():
             if weight > 0:
-                items = self.get_content_for_skill(
-                    skill, 
-                    content_type=content_type,
-                    limit=weight * 2  # Get more than needed
-                )
-                content.extend(items[:weight])
-        
-        print(f"[CONTENT] 🎯 Created {learning_preference} learning path with {len(content)} items for {skill}")
-        return content
+                mixed.extend(content.get(content_type, [])[:weight])
+        
+        print(f"[CONTENT] 🎯 Created {learning_preference} learning path with {len(mixed)} items for {skill}")
+        return mixed
     
     def get_learning_roadmap(
         self,
@@ -207,6 +566,7 @@ class ContentProviderService:
     ) -> Dict:
         """
         Create a comprehensive learning roadmap for multiple related skills
+        Every phase is built from one batched (cached) fetch of all the skills involved
         """
         
         roadmap = {
@@ -214,8 +574,15 @@ class ContentProviderService:
             "phases": []
         }
         
+        try:
+            content = self.cache.get_many([primary_skill] + secondary_skills[:2])
+        except Exception as e:
+            print(f"[CONTENT] ERROR: Failed to get roadmap content: {e}")
+            content = {}
+        primary_content = content.get(primary_skill, {})
+        
         # Phase 1: Primary skill fundamentals
-        phase1_content = self.get_mixed_learning_path(primary_skill, learning_preference)
+        phase1_content = self.get_mixed_learning_path(primary_skill, learning_preference, primary_content)
         
         if phase1_content:
             roadmap["phases"].append({
@@ -230,7 +597,7 @@ class ContentProviderService:
         if secondary_skills:
             phase2_content = []
             for skill in secondary_skills[:2]:
-                items = self.get_content_for_skill(skill, limit=3)
+                items = self._select(content.get(skill, {}), limit=3)
                 phase2_content.extend(items)
             
             if phase2_content:
@@ -242,13 +609,14 @@ class ContentProviderService:
                     "focus": "supporting"
                 })
         
-        # Phase 3: Advanced practice
-        phase3_content = self.get_content_for_skill(
-            primary_skill, 
-            content_type="taiken",
-            difficulty="advanced",
-            limit=3
-        )
+        # Phase 3: Advanced practice (filtered in the query: advanced taikens need not be in the top listing)
+        try:
+            phase3_content = self.fetch_domain_content(
+                [primary_skill], limit=3, difficulty="advanced", content_type="taiken"
+            )[primary_skill]["taiken"]
+        except Exception as e:
+            print(f"[CONTENT] ERROR: Failed to get advanced content for {primary_skill}: {e}")
+            phase3_content = []
         
         if phase3_content:
             roadmap["phases"].append({
@@ -265,68 +633,125 @@ class ContentProviderService:
         print(f"[CONTENT] 🗺️ Created learning roadmap for {primary_skill} with {len(roadmap['phases'])} phases")
         return roadmap
     
-    def search_content(self, query: str, limit: int = 20) -> List[Dict]:
+    def start_cache_warmup(self):
+        """Warm the content cache for popular domains without blocking startup"""
+        if self._warmup_started or not settings.CONTENT_WARM_DOMAINS:
+            return
+        self._warmup_started = True
+        threading.Thread(target=self.cache.warm, daemon=True).start()
+    
+    # ========== SEARCH ==========
+    
+    def _search_fallback(self, query: str) -> List[Dict]:
         """
-        Search across all content types
+        Ranked matches without the search RPC: the ILIKE scans run concurrently
+        and matches are scored by query-term overlap (title terms count double)
         """
-        try:
-            results = []
-            
-            # Search bytes
-            bytes_result = self.client.table('bytes').select('*').ilike('caption', f'%{query}%').limit(limit).execute()
-            for byte in bytes_result.data or []:
-                results.append({
-                    "type": "byte",
-                    "id": byte['byte_id'],
-                    "title": byte.get('caption'),
-                    "url": byte.get('byte'),
-                    "domain": byte.get('domain')
-                })
-            
-            # Search courses
-            courses_result = self.client.table('courses').select('*').or_(
-                f'title.ilike.%{query}%,description.ilike.%{query}%'
-            ).limit(limit).execute()
-            for course in courses_result.data or []:
-                results.append({
-                    "type": "course",
-                    "id": course['course_id'],
-                    "title": course.get('title'),
-                    "url": f"/courses/{course['course_id']}",
-                    "domain": course.get('domain')
-                })
-            
-            # Search taikens
-            taikens_result = self.client.table('taikens').select('*').or_(
-                f'title.ilike.%{query}%,description.ilike.%{query}%'
-            ).eq('is_published', True).limit(limit).execute()
-            for taiken in taikens_result.data or []:
-                results.append({
-                    "type": "taiken",
-                    "id": taiken['taiken_id'],
-                    "title": taiken.get('title'),
-                    "url": f"/taikens/{taiken['taiken_id']}",
-                    "domain": taiken.get('domain')
-                })
+        pattern = f'%{query}%'
+        queries = {
+            'byte': self.client.table('bytes').select(
+                'byte_id, caption, byte, domain'
+            ).ilike('caption', pattern),
+            'course': self.client.table('courses').select('course_id, title, description, domain').or_(
+                f'title.ilike.{pattern},description.ilike.{pattern}'
+            ),
+            'taiken': self.client.table('taikens').select('taiken_id, title, description, domain').or_(
+                f'title.ilike.{pattern},description.ilike.{pattern}'
+            ).eq('is_published', True),
+            'post': self.client.table('post').select('post_id, title, content, domain').or_(
+                f'title.ilike.{pattern},content.ilike.{pattern}'
+            ).eq('is_published', True).eq('is_hidden', False)
+        }
+        futures = {
+            item_type: _fetch_pool.submit(lambda q: q.limit(SEARCH_FALLBACK_SCAN).execute(), q)
+            for item_type, q in queries.items()
+        }
+        
+        terms = set(analyze(query))
+        results = []
+        for item_type, future in futures.items():
+            try:
+                rows = future.result().data or []
+            except Exception as e:
+                print(f"[CONTENT] {item_type} search failed: {e}")
+                continue
             
-            # Search posts
-            posts_result = self.client.table('post').select('*').or_(
-                f'title.ilike.%{query}%,content.ilike.%{query}%'
-            ).eq('is_published', True).limit(limit).execute()
-            for post in posts_result.data or []:
+            for row in rows:
+                row_id = str(row[f'{item_type}_id'])
+                title = row.get('caption') if item_type == 'byte' else row.get('title')
+                body = set(analyze(row.get('description') or row.get('content')))
+                title_terms = set(analyze(title))
+                rank = sum(2 * (term in title_terms) + (term in body) for term in terms) / (3 * len(terms) or 1)
                 results.append({
-                    "type": "post",
-                    "id": post['post_id'],
-                    "title": post.get('title'),
-                    "url": f"/posts/{post['post_id']}",
-                    "domain": post.get('domain')
+                    "type": item_type,
+                    "id": row_id,
+                    "key": f"{item_type}:{row_id}",
+                    "title": title,
+                    "url": row.get('byte') if item_type == 'byte' else f"/{item_type}s/{row_id}",
+                    "domain": row.get('domain'),
+                    # The phrase itself matched, so every row ranks above zero
+                    "rank": round(rank + 0.1, 6)
                 })
+        
+        results.sort(key=lambda r: (r["rank"], r["key"]), reverse=True)
+        return results
+    
+    def search_content(self, query: str, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """
+        Ranked full-text search across bytes, courses, taikens and posts
+        
+        Args:
+            query: Search text (websearch syntax: quoted phrases, -exclusions)
+            limit: Page size
+            cursor: next_cursor from the previous page
+        
+        Returns:
+            Dict with items (type, id, title, url, domain, rank; best first)
+            and next_cursor (None on the last page)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        
+        query = (query or '').strip()
+        if not query:
+            return {"items": [], "next_cursor": None}
+        
+        limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+        position = decode_cursor(cursor)
+        
+        try:
+            rows = None
+            if self._search_rpc_available:
+                try:
+                    # One extra row tells whether another page exists
+                    rows = self.client.rpc('search_platform_content', {
+                        'p_query': query,
+                        'p_limit': limit + 1,
+                        'p_after_rank': position[0] if position else None,
+                        'p_after_key': position[1] if position else None
+                    }).execute().data or []
+                except Exception as e:
+                    print(f"[CONTENT] Indexed search failed, scanning tables: {e}")
+                    # Only a missing function is permanent; a timeout is retried on the next search
+                    if is_missing_function(e):
+                        self._search_rpc_available = False
             
-            return results[:limit]
+            if rows is None:
+                rows = self._search_fallback(query)
+                if position:
+                    rows = [r for r in rows if (r["rank"], r["key"]) < (position[0], position[1])]
             
+            has_more = len(rows) > limit
+            items = rows[:limit]
+            return {
+                "items": items,
+                "next_cursor": encode_cursor(items[-1], 'rank', 'key') if has_more else None
+            }
+        
         except Exception as e:
             print(f"[CONTENT] Search error: {e}")
-            return []
+            return {"items": [], "next_cursor": None}
 
 
 # Global instance
@@ -4,310 +4,189 @@ Provides curated database of real learning resources
 
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable
 import json
+import re
+import threading
+
+from config import get_settings
+from services.skill_matcher import ALIAS_LOOKUP
+from services.resource_index import ResourceIndex, gemini_embedder
+from services.resource_catalog import resource_catalog
+
+settings = get_settings()
+
+
+# Extra spellings that should land on a curated catalog skill (lowercase)
+RESOURCE_ALIASES = {
+    "Python": ["python programming", "py", "core python"],
+    "SQL": ["mysql", "sqlite", "postgresql", "postgres", "t-sql", "databases", "database queries"],
+    "REST APIs": ["api design", "apis", "web apis", "api development", "restful apis"],
+    "JavaScript": ["vanilla javascript", "es6"],
+    "React": ["react hooks", "react development"],
+    "Data Analysis": ["data analytics", "data analyst", "pandas", "exploratory data analysis", "eda"],
+    "Machine Learning": ["scikit-learn", "sklearn", "ml models"],
+}
+
+# Words that qualify a skill without changing which resources fit it
+FILLER_WORDS = {
+    "programming", "language", "basics", "fundamentals", "development",
+    "framework", "advanced", "intermediate", "beginner", "introduction", "intro"
+}
+
+NON_SKILL_CHARS = re.compile(r"[^a-z0-9+#./ ]+")
+VERSION_SUFFIX = re.compile(r"(?<=[a-z+#]{3})\d+(\.\d+)*$")
+VERSION_WORD = re.compile(r"^v?\d+(\.\d+)*(\.x)?$")
+
+# Minimum Dice similarity of trigram sets for a fuzzy match
+FUZZY_THRESHOLD = 0.6
+
+
+def normalize_skill(skill: Optional[str]) -> str:
+    """Lowercase, punctuation-light form of a skill name ("React.js " -> "react.js")"""
+    text = NON_SKILL_CHARS.sub(" ", (skill or "").lower().replace("_", " ").replace("-", " "))
+    return " ".join(text.split())
+
+
+def strip_qualifiers(key: str) -> str:
+    """Drop version numbers and filler words ("python 3 programming" -> "python")"""
+    words = []
+    for word in key.split():
+        if VERSION_WORD.match(word) or word in FILLER_WORDS:
+            continue
+        words.append(VERSION_SUFFIX.sub("", word))
+    return " ".join(words)
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SkillLookupIndex:
+    """
+    Resolves free-form skill names (from users or the LLM) to catalog skills:
+    normalized exact keys and aliases first, then single adjacent transpositions
+    ("pyhton"), then trigram fuzzy matching through a trigram postings list,
+    so no lookup scans the catalog
+    """
+    
+    def __init__(self, skills: Iterable[str]):
+        self.keys: Dict[str, str] = {}
+        self.postings: Dict[str, set] = {}
+        self._cache: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        
+        for skill in skills:
+            key = normalize_skill(skill)
+            names = {key, strip_qualifiers(key)}
+            names.update(ALIAS_LOOKUP.get(key, []))
+            names.update(normalize_skill(alias) for alias in RESOURCE_ALIASES.get(skill, []))
+            for name in names:
+                # Catalog names win over aliases of other skills
+                if name and (name not in self.keys or name == key):
+                    self.keys[name] = skill
+        
+        for name in self.keys:
+            for gram in trigrams(name):
+                self.postings.setdefault(gram, set()).add(name)
+    
+    def resolve(self, skill: str) -> Optional[str]:
+        """Catalog skill for a free-form name, or None"""
+        if skill in self._cache:
+            return self._cache[skill]
+        
+        key = normalize_skill(skill)
+        match = self.keys.get(key)
+        if match is None:
+            stripped = strip_qualifiers(key)
+            match = (
+                self.keys.get(stripped)
+                or self._transposed(stripped or key)
+                or self._fuzzy(stripped or key)
+            )
+        
+        with self._lock:
+            if len(self._cache) > 4096:
+                self._cache.clear()
+            self._cache[skill] = match
+        return match
+    
+    def _transposed(self, key: str) -> Optional[str]:
+        """Key one adjacent swap away ("pyhton" -> "python"); trigrams score these poorly"""
+        if len(key) < 4:
+            # Swapping short names mostly produces other words ("og" -> "go")
+            return None
+        for i in range(len(key) - 1):
+            if key[i] != key[i + 1]:
+                swapped = key[:i] + key[i + 1] + key[i] + key[i + 2:]
+                if swapped in self.keys:
+                    return self.keys[swapped]
+        return None
+    
+    def _fuzzy(self, key: str) -> Optional[str]:
+        """Best key by trigram Dice similarity, counting overlaps via postings"""
+        grams = trigrams(key) if key else set()
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for name in self.postings.get(gram, ()):
+                shared[name] = shared.get(name, 0) + 1
+        
+        best, best_score = None, FUZZY_THRESHOLD
+        for name, count in shared.items():
+            score = 2 * count / (len(grams) + len(trigrams(name)))
+            if score >= best_score:
+                best, best_score = name, score
+        
+        return self.keys[best] if best else None
 
 
 class EnhancedRAGService:
     """Retrieves real, curated external learning resources"""
     
-    # Curated resource database
-    RESOURCE_DB = {
-        "Python": {
-            "byte": [
-                {
-                    "title": "Python in 100 Seconds",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=x7X9w_GIm1s",
-                    "duration": 2,
-                    "source": "Fireship"
-                },
-                {
-                    "title": "Python Basics - What is Python?",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=rfscVS0vtik",
-                    "duration": 10,
-                    "source": "Corey Schafer"
-                }
-            ],
-            "course": [
-                {
-                    "title": "Python for Everybody",
-                    "platform": "freeCodeCamp",
-                    "url": "https://www.freecodecamp.org/learn/scientific-computing-with-python/",
-                    "duration": 200,
-                    "source": "Dr. Charles Severance"
-                },
-                {
-                    "title": "Complete Python Bootcamp",
-                    "platform": "Udemy",
-                    "url": "https://www.udemy.com/course/complete-python-bootcamp/",
-                    "duration": 240,
-                    "source": "José Portilla"
-                },
-                {
-                    "title": "Python Programming Masterclass",
-                    "platform": "Coursera",
-                    "url": "https://www.coursera.org/learn/python-programming",
-                    "duration": 180,
-                    "source": "Tim Buchalka"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "Build Projects on Replit",
-                    "platform": "Replit",
-                    "url": "https://replit.com/community",
-                    "description": "Interactive Python projects with instant feedback",
-                    "difficulty": "beginner"
-                },
-                {
-                    "title": "LeetCode Python Problems",
-                    "platform": "LeetCode",
-                    "url": "https://leetcode.com/",
-                    "description": "Coding challenges and practice",
-                    "difficulty": "medium"
-                },
-                {
-                    "title": "Python Data Science Projects",
-                    "platform": "Kaggle",
-                    "url": "https://www.kaggle.com/",
-                    "description": "Real-world projects and competitions",
-                    "difficulty": "advanced"
-                }
-            ]
-        },
-        "SQL": {
-            "byte": [
-                {
-                    "title": "SQL in 100 Seconds",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=zsjvFFKOm3c",
-                    "duration": 2,
-                    "source": "Fireship"
-                },
-                {
-                    "title": "SQL Basics Tutorial",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=zbMHLZEHgtc",
-                    "duration": 15,
-                    "source": "Traversy Media"
-                }
-            ],
-            "course": [
-                {
-                    "title": "SQL for Data Analysis",
-                    "platform": "Mode Analytics",
-                    "url": "https://mode.com/sql-tutorial/",
-                    "duration": 120,
-                    "source": "Mode Analytics"
-                },
-                {
-                    "title": "The Complete SQL Bootcamp",
-                    "platform": "Udemy",
-                    "url": "https://www.udemy.com/course/the-complete-sql-bootcamp/",
-                    "duration": 150,
-                    "source": "Jose Portilla"
-                },
-                {
-                    "title": "Google Cloud SQL Basics",
-                    "platform": "Google Cloud Skills Boost",
-                    "url": "https://www.cloudskillsboost.google/",
-                    "duration": 90,
-                    "source": "Google"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "SQLiteOnline Editor",
-                    "platform": "SQLiteOnline",
-                    "url": "https://sqliteonline.com/",
-                    "description": "Practice SQL with online editor",
-                    "difficulty": "beginner"
-                },
-                {
-                    "title": "HackerRank SQL Challenges",
-                    "platform": "HackerRank",
-                    "url": "https://www.hackerrank.com/domains/sql",
-                    "description": "SQL problem solving",
-                    "difficulty": "medium"
-                }
-            ]
-        },
-        "REST APIs": {
-            "byte": [
-                {
-                    "title": "REST APIs in 100 Seconds",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=-MTSQjw5DrM",
-                    "duration": 2,
-                    "source": "Fireship"
-                }
-            ],
-            "course": [
-                {
-                    "title": "Build REST APIs with Django",
-                    "platform": "freeCodeCamp",
-                    "url": "https://www.freecodecamp.org/news/build-a-rest-api-in-django/",
-                    "duration": 180,
-                    "source": "freeCodeCamp"
-                },
-                {
-                    "title": "REST API Design Rulebook",
-                    "platform": "Udacity",
-                    "url": "https://www.udacity.com/",
-                    "duration": 120,
-                    "source": "Udacity"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "Build API on Replit",
-                    "platform": "Replit",
-                    "url": "https://replit.com/",
-                    "description": "Create and test APIs instantly",
-                    "difficulty": "intermediate"
-                }
-            ]
-        },
-        "JavaScript": {
-            "byte": [
-                {
-                    "title": "JavaScript in 100 Seconds",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=DHjqpvDnNGE",
-                    "duration": 2,
-                    "source": "Fireship"
-                }
-            ],
-            "course": [
-                {
-                    "title": "The Complete JavaScript Course",
-                    "platform": "Udemy",
-                    "url": "https://www.udemy.com/course/the-complete-javascript-course-2022/",
-                    "duration": 300,
-                    "source": "Jonas Schmedtmann"
-                },
-                {
-                    "title": "JavaScript Algorithms & Data Structures",
-                    "platform": "freeCodeCamp",
-                    "url": "https://www.freecodecamp.org/learn/javascript-algorithms-and-data-structures/",
-                    "duration": 300,
-                    "source": "freeCodeCamp"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "CodePen JavaScript Projects",
-                    "platform": "CodePen",
-                    "url": "https://codepen.io/",
-                    "description": "Interactive coding environment",
-                    "difficulty": "beginner"
-                }
-            ]
-        },
-        "React": {
-            "byte": [
-                {
-                    "title": "React in 100 Seconds",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=Tn6-PIqc4UM",
-                    "duration": 2,
-                    "source": "Fireship"
-                }
-            ],
-            "course": [
-                {
-                    "title": "React - The Complete Guide",
-                    "platform": "Udemy",
-                    "url": "https://www.udemy.com/course/react-the-complete-guide-incl-redux/",
-                    "duration": 360,
-                    "source": "Maximilian Schwarzmüller"
-                },
-                {
-                    "title": "React Tutorial: Tic-Tac-Toe",
-                    "platform": "Official React",
-                    "url": "https://react.dev/learn/tutorial-tic-tac-toe",
-                    "duration": 90,
-                    "source": "React Team"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "Build on CodeSandbox",
-                    "platform": "CodeSandbox",
-                    "url": "https://codesandbox.io/",
-                    "description": "React development environment",
-                    "difficulty": "beginner"
-                }
-            ]
-        },
-        "Data Analysis": {
-            "byte": [
-                {
-                    "title": "Pandas in 10 Minutes",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/results?search_query=pandas+python+tutorial",
-                    "duration": 10,
-                    "source": "Various"
-                }
-            ],
-            "course": [
-                {
-                    "title": "Data Analysis with Python",
-                    "platform": "freeCodeCamp",
-                    "url": "https://www.freecodecamp.org/learn/data-analysis-with-python/",
-                    "duration": 250,
-                    "source": "freeCodeCamp"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "Kaggle Datasets & Analysis",
-                    "platform": "Kaggle",
-                    "url": "https://www.kaggle.com/",
-                    "description": "Real data analysis projects",
-                    "difficulty": "intermediate"
-                }
-            ]
-        },
-        "Machine Learning": {
-            "byte": [
-                {
-                    "title": "Machine Learning in 100 Seconds",
-                    "platform": "YouTube",
-                    "url": "https://www.youtube.com/watch?v=PeMlggyqfqo",
-                    "duration": 2,
-                    "source": "Fireship"
-                }
-            ],
-            "course": [
-                {
-                    "title": "Machine Learning Specialization",
-                    "platform": "Coursera",
-                    "url": "https://www.coursera.org/specializations/machine-learning-introduction",
-                    "duration": 400,
-                    "source": "Andrew Ng"
-                },
-                {
-                    "title": "ML with Python",
-                    "platform": "Scikit-learn",
-                    "url": "https://scikit-learn.org/stable/",
-                    "duration": 200,
-                    "source": "Scikit-learn Team"
-                }
-            ],
-            "taiken": [
-                {
-                    "title": "Build ML Models on Google Colab",
-                    "platform": "Google Colab",
-                    "url": "https://colab.research.google.com/",
-                    "description": "Free ML development environment",
-                    "difficulty": "intermediate"
-                }
-            ]
-        }
-    }
+    # Indexes are rebuilt when the catalog revision (snapshot version, log position) moves
+    _skill_index: Optional[SkillLookupIndex] = None
+    _skill_index_revision = None
+    _search_index: Optional[ResourceIndex] = None
+    _search_index_revision = None
+    
+    @staticmethod
+    def catalog() -> Dict[str, Dict[str, List[Dict]]]:
+        """Current curated catalog {skill: {type: [resource]}} (read-only)"""
+        return resource_catalog.current()
+    
+    @staticmethod
+    def resolve_skill(skill: str) -> Optional[str]:
+        """Catalog skill name for a free-form skill ("python 3", "REST API", "Pyhton")"""
+        catalog = EnhancedRAGService.catalog()
+        if EnhancedRAGService._skill_index_revision != resource_catalog.revision:
+            EnhancedRAGService._skill_index = SkillLookupIndex(catalog.keys())
+            EnhancedRAGService._skill_index_revision = resource_catalog.revision
+        return EnhancedRAGService._skill_index.resolve(skill)
+    
+    @staticmethod
+    def search_index() -> ResourceIndex:
+        """BM25 (plus optional embedding) index over the catalog, built on first use"""
+        catalog = EnhancedRAGService.catalog()
+        if EnhancedRAGService._search_index_revision != resource_catalog.revision:
+            embedder = gemini_embedder(settings.RAG_EMBEDDING_MODEL) if settings.RAG_EMBEDDINGS_ENABLED else None
+            EnhancedRAGService._search_index = ResourceIndex(catalog, embedder)
+            EnhancedRAGService._search_index_revision = resource_catalog.revision
+        return EnhancedRAGService._search_index
+    
+    @staticmethod
+    def search_resources(query: str, resource_type: Optional[str] = None,
+                         count: int = 3, skill: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Ranked catalog resources for free text ("build APIs with Django", a module name)
+        Returns {type: [resource with skill, type and score]} for one or every type
+        """
+        index = EnhancedRAGService.search_index()
+        catalog_skill = EnhancedRAGService.resolve_skill(skill) if skill else None
+        
+        if resource_type:
+            return {resource_type: index.search(query, resource_type, count, catalog_skill)}
+        return index.search_by_type(query, count, catalog_skill)
     
     @staticmethod
     def retrieve_resources(skill: str, resource_type: str, count: int = 3) -> List[Dict]:
@@ -315,12 +194,21 @@ class EnhancedRAGService:
         Retrieve real resources for a skill and type
         Falls back to search queries if not in database
         """
-        skill_resources = EnhancedRAGService.RESOURCE_DB.get(skill, {})
+        catalog_skill = EnhancedRAGService.resolve_skill(skill)
+        skill_resources = EnhancedRAGService.catalog().get(catalog_skill, {})
         resources = skill_resources.get(resource_type, [])
         
         if resources:
             return resources[:count]
         
+        # Skills outside the catalog can still match resource text ("Python for Data Science"),
+        # but only resources that mention every term of the skill
+        resources = EnhancedRAGService.search_index().search(
+            skill, resource_type, count, must_match=skill
+        )
+        if resources:
+            return resources
+        
         # Fallback: generate search queries
         fallback_platforms = {
             "byte": f"https://youtube.com/results?search_query={skill.replace(' ', '+')}+tutorial",
@@ -336,22 +224,102 @@ class EnhancedRAGService:
             "description": f"Search for {skill} {resource_type} resources"
         }]
     
+    @staticmethod
+    def retrieve_batch(requests: List[Dict], used: Optional[Iterable[Dict]] = None) -> List[Dict]:
+        """
+        One resource for each {"skill", "type", "context"} request, in a single pass
+        Candidates are ranked against the request context (e.g. the module name),
+        and the least-used candidate wins, so modules of one skill get different
+        resources until the skill's pool runs out. Resources in used (already
+        assigned elsewhere in the path) count as used once.
+        """
+        index = EnhancedRAGService.search_index()
+        catalog = EnhancedRAGService.catalog()
+        usage: Dict[tuple, int] = {}
+        for resource in used or []:
+            key = (resource.get("title"), resource.get("url"))
+            usage[key] = usage.get(key, 0) + 1
+        fallbacks: Dict[tuple, Dict] = {}
+        assignments = []
+        
+        for request in requests:
+            skill = request.get("skill") or ""
+            resource_type = request.get("type")
+            query = f"{request.get('context') or ''} {skill}"
+            catalog_skill = EnhancedRAGService.resolve_skill(skill)
+            
+            if catalog_skill:
+                pool = catalog.get(catalog_skill, {}).get(resource_type, [])
+                candidates = index.search(query, resource_type, len(pool), catalog_skill)
+                # Pool entries with no term overlap are still fair game, after the ranked ones
+                ranked = {(c.get("title"), c.get("url")) for c in candidates}
+                candidates += [
+                    dict(resource, skill=catalog_skill, type=resource_type, score=0.0)
+                    for resource in pool if (resource.get("title"), resource.get("url")) not in ranked
+                ]
+            else:
+                # Uncatalogued skills only take resources that mention the skill itself;
+                # otherwise the context alone would pull in other skills' resources
+                candidates = index.search(query, resource_type, 5, must_match=skill)
+            
+            if not candidates:
+                key = (skill, resource_type)
+                if key not in fallbacks:
+                    fallbacks[key] = EnhancedRAGService.retrieve_resources(skill, resource_type, count=1)[0]
+                assignments.append(fallbacks[key])
+                continue
+            
+            # Least-used first, then best match for this context; the sort is stable
+            best = min(
+                enumerate(candidates),
+                key=lambda item: (usage.get((item[1].get("title"), item[1].get("url")), 0), item[0])
+            )[1]
+            key = (best.get("title"), best.get("url"))
+            usage[key] = usage.get(key, 0) + 1
+            assignments.append(best)
+        
+        return assignments
+    
+    @staticmethod
+    def attach_external_resources(learning_paths: Dict[str, Dict], used: Optional[Iterable[Dict]] = None):
+        """
+        Give every byte/course/taiken action a curated resource, diversified across modules
+        
+        Args:
+            learning_paths: {skill: {"modules": [{"name", "actions"}]}}; actions are updated in place
+            used: Resources already attached to other modules of the same paths
+        """
+        actions, requests = [], []
+        for skill, path in learning_paths.items():
+            for module in path.get('modules', []):
+                for action in module.get('actions', []):
+                    if action.get('type') in ['byte', 'course', 'taiken']:
+                        actions.append(action)
+                        requests.append({
+                            "skill": skill,
+                            "type": action['type'],
+                            "context": f"{module.get('name', '')} {action.get('title', '')}"
+                        })
+        
+        if not requests:
+            return
+        
+        try:
+            for action, resource in zip(actions, EnhancedRAGService.retrieve_batch(requests, used)):
+                if resource:
+                    action['external_resource'] = resource
+        except Exception as e:
+            print(f"[PEARL] ⚠️  Resource retrieval failed: {e}")
+    
     @staticmethod
     def get_available_skills() -> List[str]:
         """Get list of available skills in resource database"""
-        return list(EnhancedRAGService.RESOURCE_DB.keys())
+        return list(EnhancedRAGService.catalog().keys())
     
     @staticmethod
     def add_custom_resource(skill: str, resource_type: str, resource: Dict) -> bool:
-        """Add custom resource to database"""
-        if skill not in EnhancedRAGService.RESOURCE_DB:
-            EnhancedRAGService.RESOURCE_DB[skill] = {}
-        
-        if resource_type not in EnhancedRAGService.RESOURCE_DB[skill]:
-            EnhancedRAGService.RESOURCE_DB[skill][resource_type] = []
-        
-        EnhancedRAGService.RESOURCE_DB[skill][resource_type].append(resource)
-        return True
+        """Add custom resource to database (the shared catalog log, seen by every worker)"""
+        return resource_catalog.add(skill, resource_type, resource)
 
 
 # Global instance
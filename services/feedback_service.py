@@ -2,14 +2,20 @@
 Feedback Service
 User reviews, ratings, and improvement suggestions
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterator
 from datetime import datetime
 
 try:
-    from database import EnhancedSupabaseHelper
+    from database import EnhancedSupabaseHelper, DEFAULT_PAGE_SIZE
     db = EnhancedSupabaseHelper()
 except:
     db = None
+    DEFAULT_PAGE_SIZE = 50
+
+HISTORY_COLUMNS = (
+    'id, module_id, course_id, skill, rating, usefulness_rating, '
+    'feedback_text, tags, feedback_type, submitted_at'
+)
 
 
 class FeedbackService:
@@ -177,44 +183,68 @@ class FeedbackService:
             }
     
     @staticmethod
-    def get_user_feedback_history(user_id: str) -> List[Dict]:
-        """Get user's feedback history"""
+    def get_user_feedback_history(
+        user_id: str,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> Dict:
+        """Get one page of user's feedback history, newest first"""
         try:
             if not db:
-                return []
+                return {"history": [], "next_cursor": None}
             
-            feedback = db.client.table('user_feedback').select('*').eq(
-                'user_id', user_id
-            ).order('submitted_at', desc=True).execute()
+            page = db.fetch_page(
+                'user_feedback', HISTORY_COLUMNS, filters={'user_id': user_id},
+                order_column='submitted_at', cursor=cursor, limit=limit
+            )
             
-            return feedback.data if feedback.data else []
+            return {"history": page['items'], "next_cursor": page['next_cursor']}
             
+        except ValueError:
+            raise
         except Exception as e:
             print(f"[FEEDBACK] History fetch failed: {e}")
-            return []
+            return {"history": [], "next_cursor": None}
+    
+    @staticmethod
+    def iter_user_feedback_history(user_id: str) -> Iterator[Dict]:
+        """Iterate the user's full feedback history in keyset batches (for exports)"""
+        if not db:
+            return iter(())
+        
+        return db.iter_rows(
+            'user_feedback', HISTORY_COLUMNS, filters={'user_id': user_id},
+            order_column='submitted_at'
+        )
     
     @staticmethod
-    def get_popular_tags() -> Dict:
+    def get_popular_tags(max_tags: int = 20) -> Dict:
         """Get most common feedback tags"""
         try:
             if not db:
                 return {"tags": {}}
             
-            feedback = db.client.table('user_feedback').select('tags').execute()
+            try:
+                # Aggregate in Postgres (migrations/001_keyset_pagination.sql)
+                result = db.client.rpc('feedback_tag_counts', {'max_tags': max_tags}).execute()
+                sorted_tags = [(row['tag'], row['uses']) for row in result.data or []]
+            except Exception as rpc_error:
+                print(f"[FEEDBACK] Tag RPC unavailable, scanning in batches: {rpc_error}")
+                
+                # Only the counters are kept in memory, never the whole table
+                tag_counts = {}
+                for f in db.iter_rows('user_feedback', 'id, submitted_at, tags',
+                                      order_column='submitted_at'):
+                    for tag in f.get('tags') or []:
+                        tag_counts[tag] = tag_counts.get(tag, 0) + 1
+                
+                sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
             
-            if not feedback.data:
+            if not sorted_tags:
                 return {"tags": {}}
             
-            tag_counts = {}
-            for f in feedback.data:
-                tags = f.get('tags', [])
-                for tag in tags:
-                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
-            
-            sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
-            
             return {
-                "tags": dict(sorted_tags[:20]),
+                "tags": dict(sorted_tags[:max_tags]),
                 "most_common": sorted_tags[0][0] if sorted_tags else None
             }
             
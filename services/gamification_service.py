@@ -4,9 +4,19 @@ Handles points, streaks, achievements with proper database integration
 Uses: plaro_transactions, user_profile_rank, user_profiles
 """
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from supabase import create_client
 from config import get_settings
+from database import (
+    fetch_keyset_page, iter_keyset_rows, encode_cursor, record_points_rollup,
+    get_points_breakdown, reconcile_points_by_source, record_summary_award, record_summary_streak,
+    invalidate_summary, daily_task_for_event, DAILY_TASKS, SUMMARY_TABLE, SUMMARY_RECENT_TRANSACTIONS
+)
+from row_models import UserProfileRow, UserSkillRow, TransactionRow, ContentEventRow
+from services.leaderboard_service import leaderboard, period_leaderboards
+from services.achievement_engine import achievement_engine
+import threading
+import time
 import json
 
 settings = get_settings()
@@ -17,6 +27,7 @@ class GamificationService:
     
     def __init__(self):
         self.client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self._reconcile_started = False
     
     # Achievement definitions (could be moved to database table later)
     ACHIEVEMENTS = {
@@ -112,10 +123,14 @@ class GamificationService:
                 "metadata": metadata or {}
             }
             
-            self.client.table('plaro_transactions').insert(transaction).execute()
+            response = self.client.table('plaro_transactions').insert(transaction).execute()
             
-            # Update user_profile_rank
-            self._update_user_rank(user_id, points)
+            # Update user_profile_rank, the day/week/month buckets and the summary
+            rank_level = self._update_user_rank(user_id, points)
+            record_points_rollup(self.client, user_id, points)
+            record_summary_award(
+                self.client, user_id, response.data[0] if response.data else transaction, rank_level
+            )
             
             print(f"[GAMIFICATION] ✅ Awarded {points} points to {user_id} ({source})")
             return True
@@ -124,22 +139,24 @@ class GamificationService:
             print(f"[GAMIFICATION ERROR] Award points failed: {e}")
             return False
     
-    def _update_user_rank(self, user_id: str, points_delta: int):
-        """Update user rank and check for level ups"""
+    def _update_user_rank(self, user_id: str, points_delta: int) -> Optional[str]:
+        """Update user rank and check for level ups; returns the new rank level"""
         try:
             # Get current rank
-            rank_result = self.client.table('user_profile_rank').select('*').eq(
-                'user_id', user_id
-            ).single().execute()
+            rank_result = self.client.table('user_profile_rank').select(
+                'total_points, rank_level, rank_history'
+            ).eq('user_id', user_id).single().execute()
             
             if not rank_result.data:
                 # Create initial rank
                 self.client.table('user_profile_rank').insert({
                     "user_id": user_id,
                     "total_points": points_delta,
-                    "rank_level": "beginner"
+                    "rank_level": "beginner",
+                    "last_updated": datetime.now().isoformat()
                 }).execute()
-                return
+                leaderboard.update(user_id, points_delta, "beginner")
+                return "beginner"
             
             current_rank = rank_result.data
             new_total = current_rank.get('total_points', 0) + points_delta
@@ -164,12 +181,16 @@ class GamificationService:
                 "rank_history": rank_history,
                 "last_updated": datetime.now().isoformat()
             }).eq('user_id', user_id).execute()
+            leaderboard.update(user_id, new_total, new_rank_level)
             
             if new_rank_level != current_rank.get('rank_level'):
                 print(f"[GAMIFICATION] 🎉 User {user_id} leveled up to {new_rank_level}!")
             
+            return new_rank_level
+            
         except Exception as e:
             print(f"[GAMIFICATION ERROR] Update rank failed: {e}")
+            return None
     
     def _calculate_rank_level(self, total_points: int) -> str:
         """Calculate rank level from points"""
@@ -194,17 +215,13 @@ class GamificationService:
         achievement = self.ACHIEVEMENTS[achievement_key]
         
         try:
-            # Check if already earned (check in transactions)
-            existing = self.client.table('plaro_transactions').select('id').eq(
-                'user_id', user_id
-            ).eq('source', 'achievement').eq('reason', f"Achievement: {achievement['title']}").execute()
-            
-            if existing.data:
+            # Atomically set the achievement's earned bit; only the first claim awards
+            if not achievement_engine.claim(user_id, achievement_key):
                 print(f"[GAMIFICATION] Achievement {achievement_key} already earned")
                 return False
             
-            # Award points
-            self.award_plaro_points(
+            # Award points; without them the claim is given back so the achievement can be retried
+            awarded = self.award_plaro_points(
                 user_id=user_id,
                 source='achievement',
                 points=achievement['points'],
@@ -217,6 +234,9 @@ class GamificationService:
                     **(metadata or {})
                 }
             )
+            if not awarded:
+                achievement_engine.release(user_id, achievement_key)
+                return False
             
             print(f"[GAMIFICATION] 🏆 Awarded {achievement['title']} to {user_id}")
             return True
@@ -225,38 +245,69 @@ class GamificationService:
             print(f"[GAMIFICATION ERROR] Award achievement failed: {e}")
             return False
     
+    def handle_event(self, user_id: str, event_type: str, event: Optional[Dict] = None) -> List[str]:
+        """
+        Award the achievements an event unlocks
+        
+        Args:
+            user_id: User the event belongs to
+            event_type: 'module_completed', 'streak_updated', 'confidence_changed', ...
+            event: Event payload the rules read (streak, confidence, skill, ...)
+        
+        Returns:
+            Keys of newly awarded achievements
+        """
+        awarded = []
+        try:
+            for key in achievement_engine.evaluate(user_id, event_type, event):
+                metadata = {"skill": event["skill"]} if event and event.get("skill") else None
+                if self.award_achievement(user_id, key, metadata):
+                    awarded.append(key)
+        except Exception as e:
+            print(f"[GAMIFICATION ERROR] Achievement event {event_type} failed: {e}")
+        return awarded
+    
     def check_learning_achievements(self, user_id: str) -> List[str]:
-        """Check and award learning-related achievements"""
+        """
+        Check and award learning-related achievements from current state.
+        Awards normally happen per event (handle_event); this sweep only backfills
+        and skips the queries for achievements the user already has.
+        Community and roadmap achievements (first_post, first_follower, ...) have
+        no event source here yet and are not awarded by either path.
+        """
         awarded = []
+        earned = set(achievement_engine.earned(user_id))
         
         try:
             # Check first module
-            module_progress = self.client.table('ai_module_progress').select('*').eq(
-                'user_id', user_id
-            ).eq('status', 'completed').execute()
-            
-            if module_progress.data and len(module_progress.data) >= 1:
-                if self.award_achievement(user_id, "first_module"):
-                    awarded.append("first_module")
+            if "first_module" not in earned:
+                module_progress = self.client.table('ai_module_progress').select('id').eq(
+                    'user_id', user_id
+                ).eq('status', 'completed').limit(1).execute()
+                
+                if module_progress.data:
+                    awarded += self.handle_event(user_id, "module_completed")
             
             # Check streak
-            profile = self.client.table('user_profiles').select('streak_count').eq(
-                'user_id', user_id
-            ).single().execute()
-            
-            if profile.data and profile.data.get('streak_count', 0) >= 7:
-                if self.award_achievement(user_id, "week_streak"):
-                    awarded.append("week_streak")
+            if "week_streak" not in earned:
+                profile = UserProfileRow.from_row(self.client.table('user_profiles').select(
+                    'streak_count'
+                ).eq('user_id', user_id).single().execute().data)
+                
+                if profile:
+                    awarded += self.handle_event(user_id, "streak_updated", {"streak": profile.streak_count})
             
             # Check skill mastery
-            skills = self.client.table('user_skill_memory').select('*').eq(
-                'user_id', user_id
-            ).gte('confidence_score', 0.8).execute()
-            
-            if skills.data:
-                if self.award_achievement(user_id, "skill_master", 
-                                         {"skill": skills.data[0].get('skill_name')}):
-                    awarded.append("skill_master")
+            if "skill_master" not in earned:
+                skills = UserSkillRow.from_rows(self.client.table('user_skill_memory').select(
+                    'skill_name, confidence_score'
+                ).eq('user_id', user_id).gte('confidence_score', 0.8).limit(1).execute().data)
+                
+                if skills:
+                    awarded += self.handle_event(user_id, "confidence_changed", {
+                        "skill": skills[0].skill_name,
+                        "confidence": skills[0].confidence_score
+                    })
             
             return awarded
             
@@ -264,83 +315,206 @@ class GamificationService:
             print(f"[GAMIFICATION ERROR] Check achievements failed: {e}")
             return []
     
-    def get_leaderboard(self, limit: int = 20) -> List[Dict]:
-        """Get leaderboard of top users"""
+    def _with_profiles(self, entries: List[Dict]) -> List[Dict]:
+        """Attach username/profile_pic to ranked entries (one query for the whole page)"""
+        profiles = {}
+        if entries:
+            response = self.client.table('user_profiles').select(
+                'user_id, username, profile_pic'
+            ).in_('user_id', [entry['user_id'] for entry in entries]).execute()
+            profiles = {row['user_id']: row for row in response.data or []}
+        
+        return [
+            {
+                'rank': entry['rank'],
+                'user_id': entry['user_id'],
+                'username': profiles.get(entry['user_id'], {}).get('username') or 'Anonymous',
+                'points': entry['points'],
+                'rank_level': entry.get('rank_level') or leaderboard.entries.get(
+                    entry['user_id'], (0, 'beginner')
+                )[1],
+                'profile_pic': profiles.get(entry['user_id'], {}).get('profile_pic')
+            }
+            for entry in entries
+        ]
+    
+    def get_leaderboard(self, limit: int = 20, offset: int = 0, period: str = "all") -> List[Dict]:
+        """
+        Get leaderboard of top users (ranks offset+1 .. offset+limit)
+        
+        Args:
+            limit: Page size (1..100)
+            offset: Users to skip
+            period: 'all' (total points) or 'day', 'week', 'month' (points earned this period)
+        
+        Raises:
+            ValueError: If the period is unknown
+        """
+        limit, offset = max(1, min(limit, 100)), max(0, offset)
         try:
-            # Join user_profile_rank with user_profiles
-            response = self.client.table('user_profile_rank').select(
-                'user_id, total_points, rank_level, user_profiles(username, profile_pic)'
-            ).order('total_points', desc=True).limit(limit).execute()
-            
-            leaderboard = []
-            for rank, entry in enumerate(response.data or [], 1):
-                profile = entry.get('user_profiles', {})
-                leaderboard.append({
-                    'rank': rank,
-                    'user_id': entry['user_id'],
-                    'username': profile.get('username', 'Anonymous') if profile else 'Anonymous',
-                    'points': entry.get('total_points', 0),
-                    'rank_level': entry.get('rank_level', 'beginner'),
-                    'profile_pic': profile.get('profile_pic') if profile else None
-                })
-            
-            return leaderboard
-            
+            if period == "all":
+                return self._with_profiles(leaderboard.top(limit, offset))
+            return self._with_profiles(period_leaderboards.top(period, limit, offset))
+        except ValueError:
+            raise
         except Exception as e:
             print(f"[GAMIFICATION ERROR] Get leaderboard failed: {e}")
             return []
     
-    def get_user_plaro_points(self, user_id: str) -> Dict:
+    def get_leaderboard_around(self, user_id: str, radius: int = 5, period: str = "all") -> Dict:
+        """User's rank plus the users ranked directly above and below"""
+        try:
+            if period == "all":
+                return {
+                    'rank': leaderboard.rank_of(user_id),
+                    'total_users': len(leaderboard),
+                    'neighbours': self._with_profiles(leaderboard.around(user_id, radius))
+                }
+            
+            position = period_leaderboards.rank_of(user_id, period)
+            if not position:
+                return {'rank': None, 'points': 0, 'neighbours': []}
+            
+            start = max(0, position['rank'] - 1 - radius)
+            return {
+                'rank': position['rank'],
+                'points': position['points'],
+                'neighbours': self._with_profiles(period_leaderboards.top(
+                    period, position['rank'] + radius - start, start
+                ))
+            }
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"[GAMIFICATION ERROR] Get leaderboard position failed: {e}")
+            return {'rank': None, 'total_users': 0, 'neighbours': []}
+    
+    def get_user_plaro_points(self, user_id: str, cursor: Optional[str] = None,
+                              limit: int = 10) -> Dict:
         """Get user's Plaro points summary"""
         try:
             # Get total from rank
-            rank = self.client.table('user_profile_rank').select('*').eq(
-                'user_id', user_id
-            ).single().execute()
+            rank = self.client.table('user_profile_rank').select(
+                'total_points, rank_level'
+            ).eq('user_id', user_id).single().execute()
             
-            # Get recent transactions
-            transactions = self.client.table('plaro_transactions').select('*').eq(
-                'user_id', user_id
-            ).order('created_at', desc=True).limit(10).execute()
+            # Get recent transactions (one keyset page)
+            transactions = self.get_user_transactions(user_id, cursor=cursor, limit=limit)
             
-            # Get breakdown by source
-            all_transactions = self.client.table('plaro_transactions').select('source, points').eq(
-                'user_id', user_id
-            ).execute()
-            
-            breakdown = {}
-            for txn in all_transactions.data or []:
-                source = txn.get('source', 'other')
-                breakdown[source] = breakdown.get(source, 0) + txn.get('points', 0)
+            # Get breakdown by source (one aggregate row per source)
+            breakdown = get_points_breakdown(self.client, user_id)
             
             return {
                 "total_points": rank.data.get('total_points', 0) if rank.data else 0,
                 "rank_level": rank.data.get('rank_level', 'beginner') if rank.data else 'beginner',
-                "recent_transactions": transactions.data or [],
+                "recent_transactions": transactions['items'],
+                "next_cursor": transactions['next_cursor'],
                 "breakdown": breakdown
             }
             
+        except ValueError:
+            raise
         except Exception as e:
             print(f"[GAMIFICATION ERROR] Get points failed: {e}")
             return {
                 "total_points": 0,
                 "rank_level": "beginner",
                 "recent_transactions": [],
+                "next_cursor": None,
                 "breakdown": {}
             }
     
+    def reconcile_points(self, batch_size: Optional[int] = None) -> Dict:
+        """
+        Rebuild every user's per-source point totals from the ledger
+        
+        Args:
+            batch_size: Users reconciled per transaction (default POINTS_RECONCILE_BATCH_SIZE)
+        
+        Returns:
+            Users checked and aggregate rows corrected
+        """
+        batch_size = batch_size or settings.POINTS_RECONCILE_BATCH_SIZE
+        checked = corrected = 0
+        batch = []
+        
+        for row in iter_keyset_rows(
+            self.client, 'user_profile_rank', 'user_id',
+            order_column='user_id', id_column='user_id', batch_size=1000
+        ):
+            batch.append(row['user_id'])
+            if len(batch) >= batch_size:
+                corrected += reconcile_points_by_source(self.client, batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            corrected += reconcile_points_by_source(self.client, batch)
+            checked += len(batch)
+        
+        print(f"[GAMIFICATION] ✅ Reconciled points for {checked} users ({corrected} totals corrected)")
+        return {"users": checked, "corrected": corrected}
+    
+    def claim_points_reconcile_run(self, interval_minutes: int) -> bool:
+        """Take the reconcile lease so only one worker reconciles per interval"""
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(minutes=interval_minutes)).isoformat()
+        try:
+            claimed = self.client.table('points_reconcile_state').update({
+                'last_run_at': now.isoformat()
+            }).eq('id', 1).lt('last_run_at', cutoff).execute()
+            return bool(claimed.data)
+        except Exception as e:
+            print(f"[GAMIFICATION] Points reconcile lease unavailable: {e}")
+            return False
+    
+    def start_points_reconcile_scheduler(self):
+        """Reconcile point totals every POINTS_RECONCILE_INTERVAL_MINUTES in a background thread"""
+        interval = settings.POINTS_RECONCILE_INTERVAL_MINUTES
+        if self._reconcile_started or interval <= 0:
+            return
+        self._reconcile_started = True
+        
+        def _loop():
+            while True:
+                try:
+                    if self.claim_points_reconcile_run(interval):
+                        self.reconcile_points()
+                except Exception as e:
+                    print(f"[GAMIFICATION ERROR] Scheduled points reconciliation failed: {e}")
+                # Re-check often enough to take over from a worker that died mid-interval
+                time.sleep(60 * min(interval, 15))
+        
+        threading.Thread(target=_loop, daemon=True, name="points-reconcile").start()
+        print(f"[GAMIFICATION] Points reconciliation scheduled every {interval} minutes")
+    
+    def get_user_transactions(self, user_id: str, cursor: Optional[str] = None,
+                              limit: int = 20) -> Dict:
+        """Get one keyset page of the user's point transactions, newest first"""
+        return fetch_keyset_page(
+            self.client, 'plaro_transactions', TransactionRow.COLUMNS,
+            filters={'user_id': user_id}, order_column='created_at',
+            cursor=cursor, limit=limit
+        )
+    
+    def iter_user_transactions(self, user_id: str):
+        """Iterate the user's full transaction ledger in keyset batches (for exports)"""
+        return iter_keyset_rows(
+            self.client, 'plaro_transactions', TransactionRow.COLUMNS,
+            filters={'user_id': user_id}, order_column='created_at'
+        )
+    
     def update_streak(self, user_id: str) -> bool:
         """Update user's learning streak"""
         try:
-            profile = self.client.table('user_profiles').select('streak_count, updated_at').eq(
-                'user_id', user_id
-            ).single().execute()
+            profile = UserProfileRow.from_row(self.client.table('user_profiles').select(
+                UserProfileRow.STREAK_COLUMNS
+            ).eq('user_id', user_id).single().execute().data)
             
-            if not profile.data:
+            if not profile:
                 return False
             
-            current_streak = profile.data.get('streak_count', 0)
-            last_update = profile.data.get('updated_at')
+            current_streak = profile.streak_count
+            last_update = profile.updated_at
             
             if last_update:
                 last_update_date = datetime.fromisoformat(last_update.replace('Z', '+00:00')).date()
@@ -364,6 +538,8 @@ class GamificationService:
                 'streak_count': new_streak,
                 'updated_at': datetime.now().isoformat()
             }).eq('user_id', user_id).execute()
+            record_summary_streak(self.client, user_id, new_streak)
+            self.handle_event(user_id, "streak_updated", {"streak": new_streak})
             
             print(f"[GAMIFICATION] 🔥 Streak updated: {new_streak} days for {user_id}")
             return True
@@ -372,51 +548,99 @@ class GamificationService:
             print(f"[GAMIFICATION ERROR] Update streak failed: {e}")
             return False
     
+    def _build_summary(self, user_id: str) -> Dict:
+        """Summary row computed from the ledger, profile and today's events"""
+        points = self.get_user_plaro_points(user_id, limit=SUMMARY_RECENT_TRANSACTIONS)
+        
+        profile = UserProfileRow.from_row(self.client.table('user_profiles').select(
+            'streak_count'
+        ).eq('user_id', user_id).single().execute().data)
+        
+        today = datetime.now().date()
+        today_start = datetime.combine(today, datetime.min.time())
+        today_events = ContentEventRow.from_rows(self.client.table('user_content_events').select(
+            'event_type, content_type'
+        ).eq('user_id', user_id).gte('created_at', today_start.isoformat()).execute().data)
+        
+        tasks = {daily_task_for_event(e.event_type, e.content_type) for e in today_events}
+        
+        return {
+            'user_id': user_id,
+            'total_points': points['total_points'],
+            'rank_level': points['rank_level'],
+            'breakdown': points['breakdown'],
+            'recent_transactions': points['recent_transactions'],
+            'streak': profile.streak_count if profile else 0,
+            'daily_date': today.isoformat(),
+            'daily_tasks': {task: True for task in tasks if task},
+            'version': 0
+        }
+    
+    def _newest_transaction_id(self, user_id: str):
+        rows = self.client.table('plaro_transactions').select('id').eq('user_id', user_id).order(
+            'created_at', desc=True
+        ).order('id', desc=True).limit(1).execute().data
+        return rows[0]['id'] if rows else None
+    
+    def get_summary_row(self, user_id: str) -> Dict:
+        """The user's materialized summary, built and stored on first use"""
+        response = self.client.table(SUMMARY_TABLE).select('*').eq('user_id', user_id).limit(1).execute()
+        if response.data:
+            return response.data[0]
+        
+        for _ in range(2):
+            summary = self._build_summary(user_id)
+            recent = summary['recent_transactions']
+            try:
+                # A concurrent build (or an update that raced it) keeps the row it wrote
+                self.client.table(SUMMARY_TABLE).upsert(
+                    summary, on_conflict='user_id', ignore_duplicates=True
+                ).execute()
+                
+                # An award that landed during the build found no row to update: build again
+                if self._newest_transaction_id(user_id) == (recent[0].get('id') if recent else None):
+                    return summary
+                invalidate_summary(self.client, user_id)
+            except Exception as e:
+                print(f"[GAMIFICATION] Summary not stored: {e}")
+                return summary
+        return summary
+    
     def get_user_gamification_summary(self, user_id: str) -> Dict:
-        """Get complete gamification summary for user"""
+        """Get complete gamification summary for user (one keyed read of the materialized row)"""
         try:
-            # Get points summary
-            points_summary = self.get_user_plaro_points(user_id)
-            
-            # Get streak
-            profile = self.client.table('user_profiles').select('streak_count').eq(
-                'user_id', user_id
-            ).single().execute()
-            streak = profile.data.get('streak_count', 0) if profile.data else 0
-            
-            # Calculate daily progress
-            today = datetime.now().date()
-            today_start = datetime.combine(today, datetime.min.time())
-            
-            today_events = self.client.table('user_content_events').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', today_start.isoformat()).execute()
-            
-            daily_tasks = {
-                'complete_module': len([e for e in (today_events.data or []) 
-                                      if e.get('event_type') == 'complete' 
-                                      and e.get('content_type') == 'module']) > 0,
-                'practice_skill': len([e for e in (today_events.data or []) 
-                                     if e.get('event_type') == 'practice_submit']) > 0,
-                'engage_content': len([e for e in (today_events.data or []) 
-                                     if e.get('event_type') in ['like', 'comment', 'share']]) > 0
+            summary = self.get_summary_row(user_id)
+            
+            recent = summary.get('recent_transactions') or []
+            # Total and level come from user_profile_rank (the leaderboard's in-memory copy)
+            standing = leaderboard.entry(user_id)
+            points_summary = {
+                'total_points': standing[0] if standing else summary.get('total_points', 0),
+                'rank_level': standing[1] if standing else summary.get('rank_level', 'beginner'),
+                'recent_transactions': recent,
+                # Older transactions page through /gamification/transactions
+                'next_cursor': encode_cursor(recent[-1], 'created_at')
+                if len(recent) >= SUMMARY_RECENT_TRANSACTIONS else None,
+                'breakdown': summary.get('breakdown') or {}
             }
             
+            # Flags from an earlier day no longer count
+            done = {}
+            if summary.get('daily_date') == datetime.now().date().isoformat():
+                done = summary.get('daily_tasks') or {}
+            daily_tasks = {task: bool(done.get(task)) for task in DAILY_TASKS}
             daily_progress = sum(1 for completed in daily_tasks.values() if completed)
             
-            # Get leaderboard position
-            leaderboard_pos = self._get_user_leaderboard_position(user_id)
-            
             return {
                 'points_summary': points_summary,
-                'streak': streak,
+                'streak': summary.get('streak', 0),
                 'daily_challenge': {
                     'progress': daily_progress,
                     'total': 3,
                     'percentage': (daily_progress / 3) * 100,
                     'tasks': daily_tasks
                 },
-                'leaderboard_position': leaderboard_pos
+                'leaderboard_position': self._get_user_leaderboard_position(user_id)
             }
             
         except Exception as e:
@@ -426,11 +650,7 @@ class GamificationService:
     def _get_user_leaderboard_position(self, user_id: str) -> Optional[int]:
         """Get user's position on leaderboard"""
         try:
-            leaderboard = self.get_leaderboard(limit=100)
-            for i, entry in enumerate(leaderboard, 1):
-                if entry['user_id'] == user_id:
-                    return i
-            return None
+            return leaderboard.rank_of(user_id)
         except:
             return None
 
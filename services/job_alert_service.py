@@ -0,0 +1,214 @@
+"""
+Job Alert Service
+Background job-match notifications: newly ingested postings are matched
+against an inverted skill -> users index built from user_skill_memory, so the
+work scales with new jobs x interested users instead of all users x all jobs
+"""
+
+from typing import List, Dict, Set, Tuple
+import threading
+import time
+
+from config import get_settings
+from services.skill_matcher import SkillMatcher, skill_variants
+from services.job_ranking_service import job_ranker
+from services.job_index_service import job_fingerprint, tokenize
+from services.notification_service import NotificationService
+
+settings = get_settings()
+
+try:
+    from database import get_supabase, iter_keyset_rows
+except Exception as e:
+    print(f"[WARNING] Job alerts unavailable: {e}")
+    get_supabase = None
+    iter_keyset_rows = None
+
+
+class UserSkillIndex:
+    """
+    Inverted index over user_skill_memory: skill -> users who have it, plus each
+    user's confidence-weighted skill vector for ranking.
+    Reloaded when older than JOB_ALERT_INDEX_RELOAD_SECONDS.
+    """
+    
+    TABLE = "user_skill_memory"
+    
+    def __init__(self):
+        # Skill names are matched case-insensitively; the first spelling seen is shown
+        self.skill_names: Dict[str, str] = {}
+        self.skill_users: Dict[str, Set[str]] = {}
+        self.user_skills: Dict[str, Dict[str, float]] = {}
+        # First token of every skill spelling -> skills, to shortlist before regex matching
+        self.token_skills: Dict[str, Set[str]] = {}
+        self._matchers: Dict[str, SkillMatcher] = {}
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Job alerts unavailable: {e}")
+    
+    def build(self, rows):
+        """Rebuild the index from (user_id, skill_name, confidence_score) rows"""
+        names, skill_users, user_skills = {}, {}, {}
+        
+        for row in rows:
+            skill = (row.get("skill_name") or "").strip()
+            if not skill or not row.get("user_id"):
+                continue
+            key = skill.lower()
+            name = names.setdefault(key, skill)
+            skill_users.setdefault(key, set()).add(row["user_id"])
+            user_skills.setdefault(row["user_id"], {})[name] = float(row.get("confidence_score") or 0)
+        
+        token_skills = {}
+        for key, name in names.items():
+            for variant in skill_variants(name):
+                tokens = tokenize(variant)
+                if tokens:
+                    token_skills.setdefault(tokens[0], set()).add(key)
+        
+        with self._lock:
+            self.skill_names = names
+            self.skill_users = skill_users
+            self.user_skills = user_skills
+            self.token_skills = token_skills
+            self._matchers = {}
+            self.loaded_at = time.time()
+    
+    def load(self) -> int:
+        """Load every user's skills from user_skill_memory and rebuild"""
+        if not self._client or not iter_keyset_rows:
+            return 0
+        
+        try:
+            self.build(iter_keyset_rows(
+                self._client, self.TABLE, 'id, user_id, skill_name, confidence_score',
+                batch_size=1000
+            ))
+            print(f"[JOB ALERTS] ✅ Indexed {len(self.skill_names)} skills for {len(self.user_skills)} users")
+        except Exception as e:
+            print(f"[JOB ALERTS] Skill index load failed: {e}")
+            self.loaded_at = time.time()
+        
+        return len(self.user_skills)
+    
+    def ensure_loaded(self):
+        """Reload when the in-memory copy is older than the reload interval"""
+        if time.time() - self.loaded_at > settings.JOB_ALERT_INDEX_RELOAD_SECONDS:
+            self.load()
+    
+    def candidates(self, jobs: List[Dict]) -> Dict[str, List[Tuple[Dict, Dict[str, List[int]]]]]:
+        """{user_id: [(job, {skill: hit positions})]} for users holding a skill each job mentions"""
+        candidates: Dict[str, List[Tuple[Dict, Dict[str, List[int]]]]] = {}
+        
+        with self._lock:
+            for job in jobs:
+                hits = self._find_skills(f"{job.get('title') or ''} {job.get('description') or ''}")
+                # The job's skill hits pick the users to consider
+                users = set()
+                for skill in hits:
+                    users |= self.skill_users.get(skill.lower(), set())
+                for user_id in users:
+                    candidates.setdefault(user_id, []).append((job, hits))
+        
+        return candidates
+    
+    def _find_skills(self, text: str) -> Dict[str, List[int]]:
+        """
+        {skill: hit positions} over the whole skill vocabulary.
+        One regex over thousands of skills is slow, so the job's tokens shortlist
+        the skills first and only those are confirmed with their own matcher.
+        """
+        shortlist = set()
+        for token in set(tokenize(text)):
+            shortlist |= self.token_skills.get(token, set())
+        
+        hits = {}
+        for key in shortlist:
+            matcher = self._matchers.get(key)
+            if matcher is None:
+                matcher = self._matchers[key] = SkillMatcher([self.skill_names[key]])
+            hits.update(matcher.find(text))
+        return hits
+    
+    def skills_of(self, user_id: str) -> Dict[str, float]:
+        """A user's {skill_name: confidence_score}"""
+        return self.user_skills.get(user_id, {})
+
+
+class JobMatchNotifier:
+    """Matches batches of new postings to interested users and notifies them in bulk"""
+    
+    def __init__(self):
+        self.users = UserSkillIndex()
+    
+    def match(self, jobs: List[Dict]) -> Dict[str, List[Tuple[Dict, float, List[str]]]]:
+        """
+        Best new jobs per affected user
+        
+        Args:
+            jobs: Newly ingested job dictionaries
+        
+        Returns:
+            Dict of {user_id: [(job, score, matched_skills)]}, best first,
+            at most JOB_ALERT_MAX_PER_USER each
+        """
+        
+        self.users.ensure_loaded()
+        
+        # Each user's candidate jobs are scored as one vectorized batch
+        matches = {}
+        for user_id, user_candidates in self.users.candidates(jobs).items():
+            ranked = job_ranker.rank(
+                user_candidates, self.users.skills_of(user_id),
+                top_k=settings.JOB_ALERT_MAX_PER_USER,
+                min_score=settings.JOB_ALERT_MIN_SCORE
+            )
+            if ranked:
+                matches[user_id] = ranked
+        
+        return matches
+    
+    def notify_new_jobs(self, jobs: List[Dict]) -> Dict:
+        """
+        Send job_match notifications for newly ingested postings
+        
+        Args:
+            jobs: Newly ingested job dictionaries
+        
+        Returns:
+            Counts of jobs, notified users and notifications written
+        """
+        
+        if not jobs:
+            return {"jobs": 0, "users": 0, "notifications": 0}
+        
+        matches = self.match(jobs)
+        
+        notifications = [
+            NotificationService.job_match_notification(
+                user_id, job, round(score * 100, 1), matched_skills,
+                # One notification per user and posting, however often it is re-ingested
+                dedup_key=f"job_match:{user_id}:{job.get('fingerprint') or job_fingerprint(job)}"
+            )
+            for user_id, ranked in matches.items()
+            for job, score, matched_skills in ranked
+        ]
+        
+        written = 0
+        if notifications:
+            result = NotificationService.create_notifications(notifications)
+            written = result.get("inserted", 0)
+        
+        print(f"[JOB ALERTS] ✅ {len(jobs)} new jobs -> {written} notifications for {len(matches)} users")
+        
+        return {"jobs": len(jobs), "users": len(matches), "notifications": written}
+
+
+# Global instance
+job_match_notifier = JobMatchNotifier()
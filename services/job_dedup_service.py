@@ -0,0 +1,133 @@
+"""
+Job Dedup Service
+Near-duplicate job posting detection with MinHash signatures and LSH banding,
+so reposts of the same job (other query, location or agency, slightly
+different title) collapse to one canonical posting
+"""
+
+from typing import List, Dict, Set
+import re
+import zlib
+import numpy as np
+
+from config import get_settings
+
+settings = get_settings()
+
+
+WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+# 2^32 - 5; with a < 2^31 and 32-bit shingle hashes, a*x + b fits in uint64
+MINHASH_PRIME = np.uint64(4294967291)
+
+
+class JobDeduplicator:
+    """MinHash/LSH clustering over title, company and description"""
+    
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 7):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+    
+    def shingles(self, job: Dict) -> Set[int]:
+        """Hashed word n-grams of the posting text"""
+        words = WORD_PATTERN.findall(
+            f"{job.get('title') or ''} {job.get('company') or ''} {job.get('description') or ''}".lower()
+        )
+        if len(words) < self.shingle_size:
+            return {zlib.crc32(" ".join(words).encode())} if words else set()
+        
+        return {
+            zlib.crc32(" ".join(words[i:i + self.shingle_size]).encode())
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+    
+    def signature(self, shingles: Set[int]) -> np.ndarray:
+        """MinHash signature: min over every permutation in one vectorized pass"""
+        if not shingles:
+            return np.full(self.num_perm, MINHASH_PRIME, dtype=np.uint64)
+        
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        hashed = (np.outer(values, self.a) + self.b) % MINHASH_PRIME
+        return hashed.min(axis=0)
+    
+    def clusters(self, jobs: List[Dict], threshold: float) -> List[List[int]]:
+        """Groups of job positions whose estimated Jaccard similarity >= threshold"""
+        signatures = [self.signature(self.shingles(job)) for job in jobs]
+        parent = list(range(len(jobs)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        # Jobs sharing any band bucket are candidates; only those get compared
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = {}
+            start = band * self.rows
+            for pos, sig in enumerate(signatures):
+                buckets.setdefault(sig[start:start + self.rows].tobytes(), []).append(pos)
+            
+            for members in buckets.values():
+                first = members[0]
+                for other in members[1:]:
+                    if find(first) == find(other):
+                        continue
+                    similarity = np.mean(signatures[first] == signatures[other])
+                    if similarity >= threshold:
+                        parent[find(other)] = find(first)
+        
+        groups: Dict[int, List[int]] = {}
+        for pos in range(len(jobs)):
+            groups.setdefault(find(pos), []).append(pos)
+        return list(groups.values())
+    
+    @staticmethod
+    def _canonical_rank(job: Dict):
+        # Prefer postings with salary info, then the most recent, then the fullest description
+        return (
+            job.get("salary_min") is not None or job.get("salary_max") is not None,
+            job.get("created") or "",
+            len(job.get("description") or "")
+        )
+    
+    def dedupe(self, jobs: List[Dict], threshold: float = None) -> List[Dict]:
+        """
+        Collapse near-duplicate postings to one canonical job each
+        
+        Args:
+            jobs: Job dictionaries
+            threshold: Minimum estimated Jaccard similarity (default JOB_DEDUP_THRESHOLD)
+        
+        Returns:
+            Canonical jobs in original order; each carries duplicate_count and
+            duplicate_ids for the postings folded into it
+        """
+        
+        if len(jobs) < 2:
+            return jobs
+        
+        threshold = settings.JOB_DEDUP_THRESHOLD if threshold is None else threshold
+        
+        canonical = []
+        for members in self.clusters(jobs, threshold):
+            best = max(members, key=lambda pos: self._canonical_rank(jobs[pos]))
+            job = jobs[best]
+            if len(members) > 1:
+                job = dict(job)
+                job["duplicate_count"] = len(members) - 1
+                job["duplicate_ids"] = [jobs[pos].get("job_id") for pos in members if pos != best]
+            canonical.append((min(members), job))
+        
+        canonical.sort(key=lambda item: item[0])
+        return [job for _, job in canonical]
+
+
+# Global instance
+job_deduplicator = JobDeduplicator()
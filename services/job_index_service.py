@@ -0,0 +1,289 @@
+"""
+Job Index Service
+Local index of ingested Adzuna postings: structured rows in job_postings plus
+in-process inverted indexes over title, location and description terms, so
+job matching runs over thousands of postings without live API calls
+"""
+
+from typing import List, Dict, Optional, Set, Iterable, Tuple
+from datetime import datetime, timedelta, timezone
+import hashlib
+import re
+import threading
+import time
+
+from config import get_settings
+from services.skill_matcher import SkillMatcher, skill_variants
+from services.job_dedup_service import job_deduplicator
+
+settings = get_settings()
+
+try:
+    from database import get_supabase, iter_keyset_rows
+except Exception as e:
+    print(f"[WARNING] Job index persistence unavailable: {e}")
+    get_supabase = None
+    iter_keyset_rows = None
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "of", "on", "or", "the", "to", "with", "we", "you", "our", "will", "your"
+}
+
+JOB_COLUMNS = (
+    'fingerprint, job_id, title, company, location, description, salary_min, '
+    'salary_max, url, created, category, last_seen_at'
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens, keeping skill punctuation (c++, c#, node.js)"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        token = token.rstrip(".")
+        if token and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def job_fingerprint(job: Dict) -> str:
+    """Identity of a posting across Adzuna ids (same title, company and location)"""
+    key = "|".join(
+        " ".join(tokenize(job.get(field))) for field in ("title", "company", "location")
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class JobIndex:
+    """
+    In-process inverted index over the shared job_postings table.
+    Each worker loads the table into memory and reloads it when it is older
+    than JOB_INDEX_RELOAD_SECONDS, so ingestion by any worker is picked up.
+    """
+    
+    TABLE = "job_postings"
+    
+    def __init__(self):
+        self.jobs: List[Dict] = []
+        self.term_postings: Dict[str, Set[int]] = {}
+        self.title_postings: Dict[str, Set[int]] = {}
+        self.location_postings: Dict[str, Set[int]] = {}
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Job index persistence unavailable: {e}")
+    
+    # ========== BUILD ==========
+    
+    def build(self, jobs: Iterable[Dict]):
+        """Rebuild all postings lists from job rows (near-duplicates collapsed first)"""
+        indexed, terms, titles, locations = [], {}, {}, {}
+        
+        for job in job_deduplicator.dedupe(list(jobs)):
+            pos = len(indexed)
+            indexed.append(job)
+            
+            for token in set(tokenize(job.get("title"))):
+                titles.setdefault(token, set()).add(pos)
+            for token in set(tokenize(job.get("location"))):
+                locations.setdefault(token, set()).add(pos)
+            for token in set(tokenize(f"{job.get('title')} {job.get('description')}")):
+                terms.setdefault(token, set()).add(pos)
+        
+        with self._lock:
+            self.jobs = indexed
+            self.term_postings = terms
+            self.title_postings = titles
+            self.location_postings = locations
+            self.loaded_at = time.time()
+    
+    def load(self) -> int:
+        """Load recent postings from job_postings and rebuild"""
+        if not self._client or not iter_keyset_rows:
+            return 0
+        
+        try:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=settings.JOB_INDEX_MAX_AGE_DAYS)).isoformat()
+            rows = iter_keyset_rows(
+                self._client, self.TABLE, JOB_COLUMNS,
+                order_column='last_seen_at', id_column='fingerprint', batch_size=1000
+            )
+            self.build(row for row in rows if (row.get('last_seen_at') or '') >= cutoff)
+            print(f"[JOB INDEX] ✅ Loaded {len(self.jobs)} postings")
+        except Exception as e:
+            print(f"[JOB INDEX] Load failed: {e}")
+            # Don't retry on every request while the table is unavailable
+            self.loaded_at = time.time()
+        
+        return len(self.jobs)
+    
+    def ensure_loaded(self):
+        """Reload when the in-memory copy is older than the reload interval"""
+        if time.time() - self.loaded_at > settings.JOB_INDEX_RELOAD_SECONDS:
+            self.load()
+    
+    # ========== INGEST ==========
+    
+    def store(self, jobs: List[Dict]) -> int:
+        """Dedupe postings and upsert them into job_postings; returns rows written"""
+        now = datetime.now(timezone.utc).isoformat()
+        unique = {}
+        
+        # Near-duplicates (reposts, agency copies) first, then exact fingerprints
+        for job in job_deduplicator.dedupe(jobs):
+            if not job.get("job_id") or not job.get("title"):
+                continue
+            fingerprint = job_fingerprint(job)
+            # Same posting seen on several pages/queries: keep the newest
+            if fingerprint not in unique or (job.get("created") or "") > (unique[fingerprint].get("created") or ""):
+                unique[fingerprint] = {
+                    "fingerprint": fingerprint,
+                    "job_id": str(job["job_id"]),
+                    "title": job.get("title"),
+                    "company": job.get("company"),
+                    "location": job.get("location"),
+                    "description": job.get("description"),
+                    "salary_min": job.get("salary_min"),
+                    "salary_max": job.get("salary_max"),
+                    "url": job.get("url"),
+                    "created": job.get("created"),
+                    "category": job.get("category"),
+                    "last_seen_at": now
+                }
+        
+        rows = list(unique.values())
+        if not rows or not self._client:
+            return 0
+        
+        for start in range(0, len(rows), 500):
+            self._client.table(self.TABLE).upsert(
+                rows[start:start + 500], on_conflict='fingerprint'
+            ).execute()
+        
+        # Postings Adzuna no longer returns age out
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=settings.JOB_INDEX_MAX_AGE_DAYS)).isoformat()
+        self._client.table(self.TABLE).delete().lt('last_seen_at', cutoff).execute()
+        
+        return len(rows)
+    
+    def new_postings(self, jobs: List[Dict]) -> List[Dict]:
+        """Deduped postings whose fingerprint is not in job_postings yet (call before store)"""
+        unique = {}
+        for job in job_deduplicator.dedupe(jobs):
+            if job.get("job_id") and job.get("title"):
+                unique.setdefault(job_fingerprint(job), job)
+        
+        existing = set()
+        if self._client:
+            fingerprints = list(unique)
+            # Small IN lists keep the request URL short
+            for start in range(0, len(fingerprints), 100):
+                response = self._client.table(self.TABLE).select('fingerprint').in_(
+                    'fingerprint', fingerprints[start:start + 100]
+                ).execute()
+                existing.update(row['fingerprint'] for row in response.data or [])
+        
+        return [
+            dict(job, fingerprint=fingerprint)
+            for fingerprint, job in unique.items() if fingerprint not in existing
+        ]
+    
+    def claim_ingest_run(self, interval_minutes: int) -> bool:
+        """Take the ingest lease so only one worker ingests per interval"""
+        if not self._client:
+            return True
+        
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(minutes=interval_minutes)).isoformat()
+        try:
+            claimed = self._client.table('job_ingest_state').update({
+                'last_run_at': now.isoformat()
+            }).eq('id', 1).lt('last_run_at', cutoff).execute()
+            return bool(claimed.data)
+        except Exception as e:
+            print(f"[JOB INDEX] Ingest lease unavailable: {e}")
+            return False
+    
+    # ========== QUERY ==========
+    
+    def _candidates(self, query: str, location: Optional[str]) -> Set[int]:
+        """Jobs whose title has any query token, narrowed to the location"""
+        candidates = set()
+        for token in tokenize(query):
+            candidates |= self.title_postings.get(token, set())
+        
+        location_tokens = tokenize(location)
+        if location_tokens:
+            in_location = set.intersection(
+                *(self.location_postings.get(token, set()) for token in location_tokens)
+            )
+            candidates &= in_location
+        
+        return candidates
+    
+    def search(self, query: str, location: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Rank indexed jobs by query-token overlap with the title, then the description"""
+        self.ensure_loaded()
+        
+        with self._lock:
+            jobs = self.jobs
+            candidates = self._candidates(query, location)
+            tokens = set(tokenize(query))
+            
+            scored = []
+            for pos in candidates:
+                score = sum(
+                    2 * (pos in self.title_postings.get(token, ()))
+                    + (pos in self.term_postings.get(token, ()))
+                    for token in tokens
+                )
+                scored.append((score, jobs[pos].get("created") or "", pos))
+        
+        scored.sort(reverse=True)
+        return [dict(jobs[pos]) for _, _, pos in scored[:limit]]
+    
+    def match_skills(self, skills: Iterable[str], query: str,
+                     location: Optional[str] = None) -> List[Tuple[Dict, Dict[str, List[int]]]]:
+        """(job, {skill: hit positions}) for role-matching jobs that mention at least one skill"""
+        self.ensure_loaded()
+        skills = list(skills)
+        matcher = SkillMatcher.for_skills(skills)
+        
+        with self._lock:
+            candidates = self._candidates(query, location)
+            
+            # Postings narrow the scan to jobs containing some skill/alias token...
+            mentioned = set()
+            for skill in skills:
+                for variant in skill_variants(skill):
+                    mentioned |= self.jobs_with_term(variant, candidates)
+            
+            # ...then one matcher pass per job confirms boundaries and case
+            results = []
+            for pos in mentioned:
+                job = self.jobs[pos]
+                hits = matcher.find(f"{job.get('title') or ''} {job.get('description') or ''}")
+                if hits:
+                    results.append((dict(job), hits))
+            
+            return results
+    
+    def jobs_with_term(self, phrase: str, positions: Optional[Set[int]] = None) -> Set[int]:
+        """Positions of jobs containing every token of phrase (optionally within positions)"""
+        tokens = tokenize(phrase)
+        if not tokens:
+            return set()
+        
+        matched = set.intersection(*(self.term_postings.get(token, set()) for token in tokens))
+        return matched & positions if positions is not None else matched
+    
+    def __len__(self) -> int:
+        return len(self.jobs)
@@ -0,0 +1,105 @@
+"""
+Job Ranking Service
+Scores a batch of jobs against a user's confidence-weighted skill vector with
+NumPy matrix operations and returns the top-k via partial sort
+"""
+
+from typing import List, Dict, Tuple
+import numpy as np
+
+
+# Skills the user barely knows still count a little toward a match
+MIN_SKILL_WEIGHT = 0.1
+
+# Blend of confidence-weighted coverage and idf-weighted cosine similarity
+COVERAGE_WEIGHT = 0.6
+SIMILARITY_WEIGHT = 0.4
+
+
+class JobRanker:
+    """Vectorized, confidence-weighted job ranking"""
+    
+    def score(self, hit_counts: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Score every job in one pass
+        
+        Args:
+            hit_counts: (jobs x skills) mention counts
+            weights: (skills,) user confidence weights
+        
+        Returns:
+            (jobs,) scores in [0, 1]
+        """
+        present = (hit_counts > 0).astype(np.float32)
+        
+        # Share of the user's (confidence-weighted) skills the job asks for
+        coverage = present @ weights / weights.sum()
+        
+        # Term importance: skills mentioned by fewer jobs in the batch weigh more
+        doc_freq = present.sum(axis=0)
+        idf = np.log((1 + len(hit_counts)) / (1 + doc_freq)) + 1
+        job_vectors = np.log1p(hit_counts) * idf
+        
+        norms = np.linalg.norm(job_vectors, axis=1) * np.linalg.norm(weights)
+        similarity = np.divide(
+            job_vectors @ weights, norms,
+            out=np.zeros(len(hit_counts), dtype=np.float32), where=norms > 0
+        )
+        
+        return COVERAGE_WEIGHT * coverage + SIMILARITY_WEIGHT * similarity
+    
+    def rank(
+        self,
+        candidates: List[Tuple[Dict, Dict[str, List[int]]]],
+        user_skills: Dict[str, float],
+        top_k: int = 20,
+        min_score: float = 0.0
+    ) -> List[Tuple[Dict, float, List[str]]]:
+        """
+        Rank jobs for a user
+        
+        Args:
+            candidates: (job, {skill: hit positions}) pairs from SkillMatcher
+            user_skills: Dict of {skill_name: confidence_score}
+            top_k: Number of jobs to return
+            min_score: Drop jobs scoring below this
+        
+        Returns:
+            (job, score, matched_skills) best first
+        """
+        
+        if not candidates or not user_skills or top_k <= 0:
+            return []
+        
+        skills = list(user_skills.keys())
+        column = {skill: idx for idx, skill in enumerate(skills)}
+        weights = np.array(
+            [max(float(user_skills[s] or 0), MIN_SKILL_WEIGHT) for s in skills],
+            dtype=np.float32
+        )
+        
+        hit_counts = np.zeros((len(candidates), len(skills)), dtype=np.float32)
+        for row, (_, hits) in enumerate(candidates):
+            for skill, positions in hits.items():
+                if skill in column:
+                    hit_counts[row, column[skill]] = len(positions)
+        
+        scores = self.score(hit_counts, weights)
+        
+        # Partial sort: only the top k are fully ordered
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        
+        results = []
+        for row in top:
+            if scores[row] <= 0 or scores[row] < min_score:
+                continue
+            matched = [skills[col] for col in np.flatnonzero(hit_counts[row])]
+            results.append((candidates[row][0], float(scores[row]), matched))
+        
+        return results
+
+
+# Global instance
+job_ranker = JobRanker()
@@ -4,11 +4,213 @@ Retrieves real job descriptions from Adzuna and matches to user skills
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 from config import get_settings
-from typing import List, Dict, Optional
+from services.job_index_service import JobIndex
+from services.skill_matcher import SkillMatcher
+from services.job_ranking_service import job_ranker
+from services.job_dedup_service import job_deduplicator
+from services.skill_demand_service import SkillDemandSnapshot, ALL_LOCATIONS
+from services.job_alert_service import job_match_notifier
+from typing import List, Dict, Optional, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import threading
+import time
 
 settings = get_settings()
 
+try:
+    from database import get_supabase
+except Exception as e:
+    print(f"[WARNING] Shared job cache unavailable, caching per process: {e}")
+    get_supabase = None
+
+
+class JobSearchCache:
+    """
+    TTL cache for Adzuna search results with stale-while-revalidate.
+    A small in-process map sits in front of the shared job_search_cache table,
+    so every worker reuses the same results. Entries past their TTL are still
+    served for the stale window while a single background refresh runs.
+    """
+    
+    TABLE = "job_search_cache"
+    MAX_LOCAL_ENTRIES = 512
+    
+    def __init__(self, ttl_seconds: int, stale_seconds: int):
+        self.ttl = ttl_seconds
+        self.stale = stale_seconds
+        self._local: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Shared job cache unavailable, caching per process: {e}")
+    
+    @staticmethod
+    def make_key(query: str, location: str, page: int, results_per_page: int) -> str:
+        """Normalized cache key for one search page"""
+        query = ' '.join((query or '').lower().split())
+        location = ' '.join((location or '').lower().split())
+        return f"{query}|{location}|{page}|{results_per_page}"
+    
+    def get_or_fetch(self, key: str, fetch: Callable[[], Optional[List[Dict]]]) -> List[Dict]:
+        """
+        Return cached jobs for key, calling fetch on a miss.
+        fetch returns None on failure so errors are never cached.
+        """
+        fetched_at, jobs = self._get(key)
+        age = time.time() - fetched_at
+        
+        if jobs is not None and age < self.ttl:
+            return self._copy(jobs)
+        
+        if jobs is not None and age < self.ttl + self.stale:
+            self._refresh_in_background(key, fetch)
+            return self._copy(jobs)
+        
+        fresh = fetch()
+        if fresh is None:
+            # Upstream failed: an expired entry beats nothing
+            return self._copy(jobs or [])
+        
+        self._set(key, fresh)
+        return self._copy(fresh)
+    
+    def _get(self, key: str) -> Tuple[float, Optional[List[Dict]]]:
+        """(fetched_at epoch, jobs) from the local map, else the shared table"""
+        local = self._local.get(key)
+        if local and time.time() - local[0] < self.ttl:
+            return local
+        
+        if self._client:
+            try:
+                response = self._client.table(self.TABLE).select(
+                    'payload, fetched_at'
+                ).eq('cache_key', key).limit(1).execute()
+                
+                if response.data:
+                    row = response.data[0]
+                    fetched_at = datetime.fromisoformat(
+                        row['fetched_at'].replace('Z', '+00:00')
+                    ).timestamp()
+                    if not local or fetched_at > local[0]:
+                        local = (fetched_at, row.get('payload') or [])
+                        self._remember(key, local)
+            except Exception as e:
+                print(f"[ADZUNA] Shared cache read failed: {e}")
+        
+        return local or (0.0, None)
+    
+    def _set(self, key: str, jobs: List[Dict]):
+        """Store jobs locally and in the shared table"""
+        now = time.time()
+        self._remember(key, (now, jobs))
+        
+        if self._client:
+            try:
+                self._client.table(self.TABLE).upsert({
+                    'cache_key': key,
+                    'payload': jobs,
+                    'fetched_at': datetime.fromtimestamp(now, timezone.utc).isoformat()
+                }, on_conflict='cache_key').execute()
+            except Exception as e:
+                print(f"[ADZUNA] Shared cache write failed: {e}")
+    
+    def _remember(self, key: str, entry: Tuple[float, List[Dict]]):
+        with self._lock:
+            self._local.pop(key, None)
+            self._local[key] = entry
+            while len(self._local) > self.MAX_LOCAL_ENTRIES:
+                self._local.pop(next(iter(self._local)))
+    
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Optional[List[Dict]]]):
+        """Refetch a stale entry once per worker, off the request path"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def _refresh():
+            try:
+                fresh = fetch()
+                if fresh is not None:
+                    self._set(key, fresh)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        threading.Thread(target=_refresh, daemon=True).start()
+    
+    @staticmethod
+    def _copy(jobs: List[Dict]) -> List[Dict]:
+        # Callers annotate job dicts (match_percentage etc.), keep cached ones clean
+        return [dict(job) for job in jobs]
+
+
+class CallBudgetExceeded(requests.exceptions.RequestException):
+    """Raised instead of calling Adzuna when the call budget is spent"""
+
+
+class AdzunaCallBudget:
+    """
+    Token buckets capping Adzuna calls per minute and per day (per worker process).
+    Every call takes one token from each bucket; buckets refill continuously.
+    Bulk jobs (ingestion, snapshots) wait for the minute bucket but stop at
+    ADZUNA_USER_RESERVE of either bucket, so live searches always have calls left.
+    """
+    
+    def __init__(self, per_minute: int, per_day: int, user_reserve: float):
+        # [tokens, capacity, refill per second]
+        self._minute = [float(per_minute), float(per_minute), per_minute / 60.0]
+        self._day = [float(per_day), float(per_day), per_day / 86400.0]
+        self.user_reserve = min(max(user_reserve, 0.0), 1.0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        for bucket in (self._minute, self._day):
+            bucket[0] = min(bucket[1], bucket[0] + elapsed * bucket[2])
+    
+    def acquire(self, bulk: bool = False) -> bool:
+        """
+        Take one call from the budget
+        
+        Args:
+            bulk: Background job call; waits for the minute bucket and leaves the user reserve
+        
+        Returns:
+            True if the call may go ahead, False if the budget is spent
+        """
+        
+        while True:
+            with self._lock:
+                self._refill()
+                reserve = self.user_reserve if bulk else 0.0
+                minute_floor = 1 + reserve * self._minute[1]
+                day_floor = 1 + reserve * self._day[1]
+                
+                if self._day[0] < day_floor or self._minute[2] <= 0:
+                    # Waiting for the day bucket would take hours
+                    return False
+                if self._minute[0] >= minute_floor:
+                    self._minute[0] -= 1
+                    self._day[0] -= 1
+                    return True
+                if not bulk:
+                    # Live searches fail fast and fall back to cached results
+                    return False
+                wait = (minute_floor - self._minute[0]) / self._minute[2]
+            time.sleep(wait)
+
 
 class AdzunaJobService:
     """
@@ -23,6 +225,33 @@ class AdzunaJobService:
         self.app_key = settings.ADZUNA_APP_KEY
         self.country = "in"  # India
         self.timeout = 10
+        self.max_concurrency = max(1, settings.ADZUNA_MAX_CONCURRENCY)
+        
+        # One keep-alive pool for every call instead of a new TCP/TLS handshake each time
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.budget = AdzunaCallBudget(
+            settings.ADZUNA_CALLS_PER_MINUTE,
+            settings.ADZUNA_CALLS_PER_DAY,
+            settings.ADZUNA_USER_RESERVE
+        )
+        
+        # Ingestion and snapshots fan out on their own small pool, so they hold at most
+        # ADZUNA_BULK_CONCURRENCY pooled connections and live searches keep the rest
+        self.bulk_executor = ThreadPoolExecutor(
+            max_workers=max(1, min(settings.ADZUNA_BULK_CONCURRENCY, self.max_concurrency)),
+            thread_name_prefix="adzuna-bulk"
+        )
+        
+        self.cache = JobSearchCache(
+            settings.ADZUNA_CACHE_TTL_SECONDS,
+            settings.ADZUNA_CACHE_STALE_SECONDS
+        )
+        self.index = JobIndex()
+        self.market = SkillDemandSnapshot()
+        self._scheduler_started = False
+        self._market_scheduler_started = False
         
         if not self.app_id or not self.app_key:
             print("[WARNING] Adzuna API credentials not configured. Job search will not work.")
@@ -31,15 +260,17 @@ class AdzunaJobService:
         self,
         query: str,
         location: str = "Chennai",
-        max_results: int = 10
+        max_results: int = 10,
+        page: int = 1
     ) -> List[Dict]:
         """
-        Search for jobs matching a query
+        Search for jobs matching a query (served from the search cache when fresh)
         
         Args:
             query: Job title or skill to search for
             location: City/location for job search
             max_results: Maximum number of results to return
+            page: Result page (1-based)
         
         Returns:
             List of job dictionaries with metadata
@@ -49,7 +280,21 @@ class AdzunaJobService:
             print("[ERROR] Adzuna credentials not configured")
             return []
         
-        url = f"{self.BASE_URL}/{self.country}/search/1"
+        key = JobSearchCache.make_key(query, location, page, max_results)
+        return self.cache.get_or_fetch(
+            key, lambda: self._fetch_jobs(query, location, max_results, page)
+        )
+    
+    def _get(self, url: str, params: Dict, bulk: bool = False) -> requests.Response:
+        """GET through the pooled session once the call budget allows it"""
+        if not self.budget.acquire(bulk):
+            raise CallBudgetExceeded("Adzuna call budget exhausted")
+        return self.session.get(url, params=params, timeout=self.timeout)
+    
+    def _fetch_jobs(self, query: str, location: str, max_results: int, page: int,
+                    bulk: bool = False) -> Optional[List[Dict]]:
+        """Call the Adzuna search API; None on failure"""
+        url = f"{self.BASE_URL}/{self.country}/search/{page}"
         
         params = {
             "app_id": self.app_id,
@@ -63,7 +308,7 @@ class AdzunaJobService:
         try:
             print(f"[ADZUNA] 🔍 Searching jobs: '{query}' in {location}")
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self._get(url, params, bulk)
             response.raise_for_status()
             data = response.json()
             
@@ -83,15 +328,18 @@ class AdzunaJobService:
                 }
                 jobs.append(job)
             
+            # The same posting is often listed by several agencies
+            jobs = job_deduplicator.dedupe(jobs)
+            
             print(f"[ADZUNA] ✅ Found {len(jobs)} jobs")
             return jobs
         
         except requests.exceptions.RequestException as e:
             print(f"[ERROR] Adzuna API request failed: {e}")
-            return []
+            return None
         except Exception as e:
             print(f"[ERROR] Job search failed: {e}")
-            return []
+            return None
     
     def get_job_details(self, job_id: str) -> Optional[Dict]:
         """
@@ -115,7 +363,7 @@ class AdzunaJobService:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self._get(url, params)
             response.raise_for_status()
             return response.json()
         
@@ -131,7 +379,7 @@ class AdzunaJobService:
     ) -> List[Dict]:
         """
         Find jobs that match user's current skills
-        Performs keyword matching between job descriptions and user skills
+        Skill mentions are ranked against the user's confidence-weighted skill vector
         
         Args:
             user_skills: Dict of {skill_name: confidence_score}
@@ -139,88 +387,295 @@ class AdzunaJobService:
             location: Location for job search
         
         Returns:
-            List of matched jobs sorted by match percentage
+            Top JOB_MATCH_TOP_K matched jobs sorted by match score
         """
         
-        # Search for target role
-        jobs = self.search_jobs(query=target_role, location=location, max_results=20)
-        
-        if not jobs:
-            print(f"[ADZUNA] No jobs found for '{target_role}'")
+        if not user_skills:
             return []
         
-        matched_jobs = []
+        # Local index first: every ingested posting for the role, via skill postings lists
+        self.index.ensure_loaded()
+        candidates = self.index.match_skills(user_skills.keys(), target_role, location) if len(self.index) else []
+        source = "JOB INDEX"
         
-        for job in jobs:
-            description_lower = (job.get("description") or "").lower()
-            title_lower = (job.get("title") or "").lower()
-            combined_text = f"{title_lower} {description_lower}"
+        if not candidates:
+            # Search for target role
+            jobs = self.search_jobs(query=target_role, location=location, max_results=20)
             
-            match_count = 0
-            matched_skills = []
+            if not jobs:
+                print(f"[ADZUNA] No jobs found for '{target_role}'")
+                return []
             
-            # Check for skill mentions in job description
-            for skill in user_skills.keys():
-                skill_lower = skill.lower()
-                # Search for exact skill or common variations
-                if skill_lower in combined_text:
-                    match_count += 1
-                    matched_skills.append(skill)
+            # All skills + aliases compiled once; each job text is scanned in a single pass
+            matcher = SkillMatcher.for_skills(user_skills.keys())
+            source = "ADZUNA"
             
-            # Calculate match percentage
-            match_percentage = (match_count / len(user_skills)) * 100 if user_skills else 0
-            
-            # Include jobs with at least 30% skill overlap
-            if match_percentage >= 30:
-                job["match_percentage"] = round(match_percentage, 1)
-                job["matched_skills"] = matched_skills
-                job["missing_skills"] = [s for s in user_skills.keys() if s not in matched_skills]
-                job["skill_gap"] = len(job["missing_skills"]) / len(user_skills) if user_skills else 0
-                matched_jobs.append(job)
+            for job in jobs:
+                hits = matcher.find(f"{job.get('title') or ''} {job.get('description') or ''}")
+                if hits:
+                    candidates.append((job, hits))
+        
+        ranked = job_ranker.rank(
+            candidates, user_skills,
+            top_k=settings.JOB_MATCH_TOP_K,
+            min_score=settings.JOB_MATCH_MIN_SCORE
+        )
         
-        # Sort by match percentage (descending)
-        matched_jobs.sort(key=lambda x: x["match_percentage"], reverse=True)
+        matched_jobs = [
+            self._annotate_match(job, matched_skills, score, user_skills)
+            for job, score, matched_skills in ranked
+        ]
         
-        print(f"[ADZUNA] ✅ Matched {len(matched_jobs)} jobs with >30% skill overlap")
+        print(f"[{source}] ✅ Ranked {len(matched_jobs)} of {len(candidates)} skill-matching jobs")
         
         return matched_jobs
     
-    def get_skill_demand(self, location: str = "Chennai") -> Dict[str, int]:
+    @staticmethod
+    def _annotate_match(job: Dict, matched_skills: List[str], score: float,
+                        user_skills: dict) -> Dict:
+        """Attach match details to a job dict"""
+        match_percentage = len(matched_skills) / len(user_skills) * 100 if user_skills else 0
+        job["match_score"] = round(score * 100, 1)
+        job["match_percentage"] = round(match_percentage, 1)
+        job["matched_skills"] = matched_skills
+        job["missing_skills"] = [s for s in user_skills.keys() if s not in matched_skills]
+        job["skill_gap"] = len(job["missing_skills"]) / len(user_skills) if user_skills else 0
+        return job
+    
+    def find_jobs(
+        self,
+        query: str,
+        location: str = "Chennai",
+        max_results: int = 10
+    ) -> List[Dict]:
         """
-        Analyze job market to find most in-demand skills
+        Jobs for a role from the local index, falling back to a live search
         
         Args:
-            location: Location to analyze
+            query: Job title or skill to search for
+            location: City/location for job search
+            max_results: Maximum number of results to return
         
         Returns:
-            Dict of {skill: job_count}
+            List of job dictionaries with metadata
+        """
+        
+        jobs = self.index.search(query, location, limit=max_results)
+        if jobs:
+            return jobs
+        
+        return self.search_jobs(query=query, location=location, max_results=max_results)
+    
+    def ingest_jobs(
+        self,
+        roles: Optional[List[str]] = None,
+        locations: Optional[List[str]] = None,
+        pages: Optional[int] = None
+    ) -> Dict:
+        """
+        Page through Adzuna for every role/location and refresh the local job index
+        
+        Args:
+            roles: Job titles to ingest (default JOB_INGEST_ROLES)
+            locations: Locations to ingest (default JOB_INGEST_LOCATIONS)
+            pages: Result pages of 50 per role/location (default JOB_INGEST_PAGES)
+        
+        Returns:
+            Counts of fetched, stored, new and indexed postings
         """
         
         if not self.app_id or not self.app_key:
-            print("[WARNING] Adzuna credentials not configured for skill demand analysis")
-            return {}
+            return {"fetched": 0, "stored": 0, "new": 0, "indexed": len(self.index)}
+        
+        roles = roles or [r.strip() for r in settings.JOB_INGEST_ROLES.split(",") if r.strip()]
+        locations = locations or [l.strip() for l in settings.JOB_INGEST_LOCATIONS.split(",") if l.strip()]
+        pages = pages or settings.JOB_INGEST_PAGES
+        
+        print(f"[JOB INDEX] Ingesting {len(roles)} roles x {len(locations)} locations x {pages} pages")
+        
+        # Bulk pages bypass the search cache and draw on the bulk share of the call budget
+        futures = [
+            self.bulk_executor.submit(self._fetch_jobs, role, location, 50, page, True)
+            for role in roles for location in locations for page in range(1, pages + 1)
+        ]
+        
+        fetched = []
+        for future in futures:
+            try:
+                fetched.extend(future.result() or [])
+            except Exception as e:
+                print(f"[WARNING] Ingest page failed: {e}")
         
         try:
-            # Search for popular tech skills with better sample size
-            top_skills = ["Python", "JavaScript", "SQL", "React", "AWS", "Machine Learning"]
-            skill_demand = {}
-            
-            for skill in top_skills:
+            # Postings not seen before are what users get alerted about
+            new_jobs = self.index.new_postings(fetched)
+            stored = self.index.store(fetched)
+        except Exception as e:
+            print(f"[ERROR] Job index store failed: {e}")
+            new_jobs, stored = [], 0
+        
+        indexed = self.index.load()
+        print(f"[JOB INDEX] ✅ Ingested {len(fetched)} postings ({stored} unique, {len(new_jobs)} new), index has {indexed}")
+        
+        if new_jobs and settings.JOB_ALERTS_ENABLED:
+            try:
+                job_match_notifier.notify_new_jobs(new_jobs)
+            except Exception as e:
+                print(f"[ERROR] Job match notifications failed: {e}")
+        
+        return {"fetched": len(fetched), "stored": stored, "new": len(new_jobs), "indexed": indexed}
+    
+    def start_ingestion_scheduler(self):
+        """Ingest on JOB_INGEST_INTERVAL_MINUTES in a background thread (one worker per interval)"""
+        interval = settings.JOB_INGEST_INTERVAL_MINUTES
+        if self._scheduler_started or interval <= 0 or not self.app_id or not self.app_key:
+            return
+        self._scheduler_started = True
+        
+        def _loop():
+            while True:
                 try:
-                    jobs = self.search_jobs(query=skill, location=location, max_results=5)
-                    if jobs:
-                        skill_demand[skill] = len(jobs)
-                    else:
-                        print(f"[ADZUNA] No jobs found for {skill}, skipping")
-                except Exception as skill_error:
-                    print(f"[WARNING] Failed to get demand for {skill}: {skill_error}")
-                    continue
-            
-            if skill_demand:
-                print(f"[ADZUNA] 📊 Skill demand analysis complete: {len(skill_demand)} skills analyzed")
-            else:
-                print(f"[ADZUNA] ⚠️  No skill demand data retrieved (API may be unavailable)")
+                    if self.index.claim_ingest_run(interval):
+                        self.ingest_jobs()
+                except Exception as e:
+                    print(f"[ERROR] Scheduled job ingestion failed: {e}")
+                # Re-check often enough to take over from a worker that died mid-interval
+                time.sleep(60 * min(interval, 15))
+        
+        threading.Thread(target=_loop, daemon=True, name="job-ingest").start()
+        print(f"[JOB INDEX] Ingestion scheduled every {interval} minutes")
+    
+    def _fetch_count(self, skill: str, location: Optional[str]) -> Optional[int]:
+        """Adzuna's total posting count for a skill phrase; None on failure"""
+        url = f"{self.BASE_URL}/{self.country}/search/1"
+        
+        params = {
+            "app_id": self.app_id,
+            "app_key": self.app_key,
+            # Only the total is needed, not the postings
+            "results_per_page": 1,
+            "what_phrase": skill,
+            "content-type": "application/json"
+        }
+        if location:
+            params["where"] = location
+        
+        try:
+            # Counts are only taken by the snapshot job, so they are bulk calls
+            response = self._get(url, params, bulk=True)
+            response.raise_for_status()
+            return int(response.json().get("count") or 0)
+        except Exception as e:
+            print(f"[ERROR] Adzuna count failed for '{skill}' in {location or 'all locations'}: {e}")
+            return None
+    
+    def snapshot_skill_demand(
+        self,
+        skills: Optional[List[str]] = None,
+        locations: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Take a market snapshot: posting counts for every taxonomy skill per location
+        
+        Args:
+            skills: Skills to count (default SKILL_DEMAND_TAXONOMY)
+            locations: Locations to count in (default country-wide + SKILL_DEMAND_LOCATIONS)
+        
+        Returns:
+            Snapshot timestamp plus counts of queried, failed and stored entries
+        """
+        
+        if not self.app_id or not self.app_key:
+            print("[WARNING] Adzuna credentials not configured for skill demand analysis")
+            return {"snapshot_at": self.market.snapshot_at, "queried": 0, "failed": 0, "stored": 0}
+        
+        skills = skills or self.market.taxonomy()
+        locations = locations or self.market.locations()
+        # The previous snapshot backs any count this run fails to take
+        self.market.ensure_loaded()
+        
+        print(f"[SKILL DEMAND] 📊 Counting {len(skills)} skills x {len(locations)} locations")
+        
+        futures = {
+            (location, skill): self.bulk_executor.submit(
+                self._fetch_count, skill, None if location == ALL_LOCATIONS else location
+            )
+            for location in locations for skill in skills
+        }
+        
+        counts: Dict[str, Dict[str, int]] = {}
+        failed = 0
+        for (location, skill), future in futures.items():
+            try:
+                job_count = future.result()
+            except Exception as e:
+                print(f"[WARNING] Skill demand count failed: {e}")
+                job_count = None
             
+            if job_count is None:
+                # A failed (or over-budget) count keeps the previous snapshot's value
+                # rather than being stored as zero demand or dropped from the snapshot
+                failed += 1
+                previous = self.market.counts.get(location.lower(), {}).get(skill.lower())
+                if previous is None:
+                    continue
+                job_count = previous[1]
+            counts.setdefault(location, {})[skill] = job_count
+        
+        try:
+            stored = self.market.store(counts)
+        except Exception as e:
+            print(f"[ERROR] Skill demand snapshot store failed: {e}")
+            stored = 0
+        
+        print(f"[SKILL DEMAND] ✅ Snapshot stored: {stored} counts ({failed} failed)")
+        
+        return {
+            "snapshot_at": self.market.snapshot_at,
+            "queried": len(futures),
+            "failed": failed,
+            "stored": stored
+        }
+    
+    def start_market_snapshot_scheduler(self):
+        """Snapshot skill demand every SKILL_DEMAND_INTERVAL_MINUTES in a background thread"""
+        interval = settings.SKILL_DEMAND_INTERVAL_MINUTES
+        if self._market_scheduler_started or interval <= 0 or not self.app_id or not self.app_key:
+            return
+        self._market_scheduler_started = True
+        
+        def _loop():
+            while True:
+                try:
+                    if self.market.claim_run(interval):
+                        self.snapshot_skill_demand()
+                except Exception as e:
+                    print(f"[ERROR] Scheduled skill demand snapshot failed: {e}")
+                time.sleep(60 * min(interval, 15))
+        
+        threading.Thread(target=_loop, daemon=True, name="skill-demand").start()
+        print(f"[SKILL DEMAND] Snapshots scheduled every {interval} minutes")
+    
+    def get_skill_demand(
+        self,
+        location: Optional[str] = "Chennai",
+        skills: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """
+        Job-market demand per skill from the latest snapshot (no API calls)
+        
+        Args:
+            location: Location to analyze (None for country-wide)
+            skills: Only these skills (default every taxonomy skill)
+        
+        Returns:
+            Dict of {skill: job_count}
+        """
+        
+        try:
+            skill_demand = self.market.demand(location, skills)
+            if not skill_demand and not len(self.market):
+                print(f"[SKILL DEMAND] ⚠️  No market snapshot taken yet")
             return skill_demand
         
         except Exception as e:
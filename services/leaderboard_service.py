@@ -0,0 +1,416 @@
+"""
+Leaderboard Service
+All-time leaderboard over user_profile_rank kept in an indexable skip list,
+so a user's rank, the top N and the users around someone are O(log n)
+lookups for any number of users instead of a top-100 query and a scan
+"""
+
+from typing import List, Dict, Optional, Tuple, Iterable
+from datetime import date, datetime, timedelta, timezone
+import random
+import threading
+import time
+
+from config import get_settings
+
+settings = get_settings()
+
+try:
+    from database import get_supabase, iter_keyset_rows, rollup_bucket, ROLLUP_PERIODS
+except Exception as e:
+    print(f"[WARNING] Leaderboard sync unavailable: {e}")
+    get_supabase = None
+    iter_keyset_rows = None
+    rollup_bucket = None
+    ROLLUP_PERIODS = ()
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+    
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        # width[i]: positions skipped by following next[i] (to the end + 1 when None)
+        self.width: List[int] = [1] * levels
+
+
+class RankedSkipList:
+    """
+    Sorted keys with order statistics: insert, remove, position of a key and
+    the key at a position all take O(log n) expected time
+    """
+    
+    MAX_LEVEL = 24
+    
+    def __init__(self, seed: Optional[int] = None):
+        self.head = _Node(None, self.MAX_LEVEL)
+        # Levels in use; higher head levels are reset when first reached
+        self.level = 1
+        self.size = 0
+        self._random = random.Random(seed)
+    
+    @classmethod
+    def from_sorted(cls, keys: List, seed: Optional[int] = None) -> "RankedSkipList":
+        """Build from already sorted keys in O(n) (bulk loads skip per-key inserts)"""
+        skiplist = cls(seed)
+        nodes = [_Node(key, skiplist._random_level()) for key in keys]
+        skiplist.size = len(nodes)
+        skiplist.level = max((len(node.next) for node in nodes), default=1)
+        
+        # Link each level left to right; a width is the position gap to the next node
+        last = [skiplist.head] * skiplist.level
+        last_position = [0] * skiplist.level
+        for position, node in enumerate(nodes, start=1):
+            for i in range(len(node.next)):
+                last[i].next[i] = node
+                last[i].width[i] = position - last_position[i]
+                last[i], last_position[i] = node, position
+        for i in range(skiplist.level):
+            last[i].width[i] = skiplist.size + 1 - last_position[i]
+        
+        return skiplist
+    
+    def _random_level(self) -> int:
+        # Each further level with probability 1/2: count the trailing one bits
+        bits = self._random.getrandbits(self.MAX_LEVEL - 1)
+        level = 1
+        while bits & 1:
+            level += 1
+            bits >>= 1
+        return level
+    
+    def _path(self, key) -> Tuple[List[_Node], List[int]]:
+        """Last node before key on every level, and that node's position"""
+        update: List[_Node] = [self.head] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node, position = self.head, 0
+        
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            update[i], positions[i] = node, position
+        return update, positions
+    
+    def insert(self, key):
+        update, positions = self._path(key)
+        level = self._random_level()
+        if level > self.level:
+            for i in range(self.level, level):
+                self.head.width[i] = self.size + 1
+            self.level = level
+        node = _Node(key, level)
+        before = positions[0]
+        
+        for i in range(self.level):
+            if i < level:
+                node.next[i] = update[i].next[i]
+                update[i].next[i] = node
+                node.width[i] = update[i].width[i] - (before - positions[i])
+                update[i].width[i] = before - positions[i] + 1
+            else:
+                update[i].width[i] += 1
+        self.size += 1
+    
+    def remove(self, key) -> bool:
+        update, _ = self._path(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return False
+        
+        for i in range(self.level):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+        self.size -= 1
+        return True
+    
+    def position(self, key) -> Optional[int]:
+        """1-based position of key, None if absent"""
+        node, position = self.head, 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.width[i]
+                node = node.next[i]
+        return position if node is not self.head and node.key == key else None
+    
+    def slice(self, start: int, count: int) -> List:
+        """Up to count keys from 1-based position start"""
+        if count <= 0 or start > self.size:
+            return []
+        start = max(start, 1)
+        
+        node, position = self.head, 0
+        for i in reversed(range(self.level)):
+            while node.next[i] is not None and position + node.width[i] < start:
+                position += node.width[i]
+                node = node.next[i]
+        
+        keys = []
+        node = node.next[0]
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+    
+    def __len__(self) -> int:
+        return self.size
+
+
+class Leaderboard:
+    """
+    In-process copy of user_profile_rank ordered by (points desc, user_id).
+    Local awards update it immediately; awards from other workers are pulled
+    through the database-stamped changed_at every LEADERBOARD_SYNC_SECONDS,
+    and the whole table is reloaded every LEADERBOARD_RELOAD_SECONDS as a
+    safety net.
+    """
+    
+    TABLE = "user_profile_rank"
+    COLUMNS = 'user_id, total_points, rank_level, changed_at'
+    # changed_at is stamped before commit, so each sync re-reads this far
+    # behind the newest stamp seen to catch transactions that committed late
+    SYNC_OVERLAP_SECONDS = 60
+    # A failed reload is retried after this long instead of on every request
+    LOAD_RETRY_SECONDS = 30
+    
+    def __init__(self):
+        self.entries: Dict[str, Tuple[int, str]] = {}
+        self.ranks = RankedSkipList()
+        self.loaded_at = 0.0
+        self.synced_at = 0.0
+        self._load_retry_at = 0.0
+        self._seen: Optional[str] = None
+        self._lock = threading.RLock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Leaderboard sync unavailable: {e}")
+    
+    @staticmethod
+    def _key(user_id: str, points: int) -> Tuple[int, str]:
+        return (-points, user_id)
+    
+    # ========== SYNC ==========
+    
+    def _apply(self, user_id: str, points: int, rank_level: Optional[str]):
+        previous = self.entries.get(user_id)
+        if previous is not None:
+            if previous[0] == points:
+                self.entries[user_id] = (points, rank_level or previous[1])
+                return
+            self.ranks.remove(self._key(user_id, previous[0]))
+        self.entries[user_id] = (points, rank_level or "beginner")
+        self.ranks.insert(self._key(user_id, points))
+    
+    def _track(self, row: Dict):
+        if (row.get("changed_at") or "") > (self._seen or ""):
+            self._seen = row["changed_at"]
+    
+    def build(self, rows: Iterable[Dict]):
+        """Rebuild from (user_id, total_points, rank_level, changed_at) rows"""
+        entries, seen = {}, None
+        for row in rows:
+            if row.get("user_id"):
+                entries[row["user_id"]] = (int(row.get("total_points") or 0), row.get("rank_level") or "beginner")
+                seen = max(seen or "", row.get("changed_at") or "") or None
+        
+        ranks = RankedSkipList.from_sorted(sorted(
+            self._key(user_id, points) for user_id, (points, _) in entries.items()
+        ))
+        
+        with self._lock:
+            self.entries, self.ranks, self._seen = entries, ranks, seen
+            self.loaded_at = self.synced_at = time.time()
+    
+    def load(self) -> int:
+        """Load every user_profile_rank row and rebuild"""
+        if not self._client or not iter_keyset_rows:
+            self.loaded_at = self.synced_at = time.time()
+            return len(self.entries)
+        
+        try:
+            self.build(iter_keyset_rows(
+                self._client, self.TABLE, self.COLUMNS,
+                order_column='user_id', id_column='user_id', batch_size=1000
+            ))
+            print(f"[LEADERBOARD] ✅ Loaded {len(self.entries)} users")
+        except Exception as e:
+            print(f"[LEADERBOARD] Load failed: {e}")
+            # loaded_at stays put so the reload is retried; syncs keep the copy current meanwhile
+            self._load_retry_at = time.time() + self.LOAD_RETRY_SECONDS
+        
+        return len(self.entries)
+    
+    def sync(self) -> int:
+        """Apply rows changed since the last load/sync (every row if none seen yet); returns rows applied"""
+        applied = 0
+        if self._client:
+            try:
+                since = None
+                if self._seen:
+                    seen_at = datetime.fromisoformat(self._seen.replace('Z', '+00:00'))
+                    since = (seen_at - timedelta(seconds=self.SYNC_OVERLAP_SECONDS)).isoformat()
+                position = None
+                while True:
+                    query = self._client.table(self.TABLE).select(self.COLUMNS)
+                    if position:
+                        # Keyset on (changed_at, user_id) so rows sharing a stamp are not skipped
+                        query = query.or_(
+                            f'changed_at.gt."{position[0]}",'
+                            f'and(changed_at.eq."{position[0]}",user_id.gt."{position[1]}")'
+                        )
+                    elif since:
+                        # Without a stamp (empty table, failed load) sync starts from the epoch
+                        query = query.gte('changed_at', since)
+                    rows = query.order('changed_at').order('user_id').limit(1000).execute().data or []
+                    
+                    # Rows re-read from the overlap carry the current total, so applying them again is a no-op
+                    with self._lock:
+                        for row in rows:
+                            self._apply(row["user_id"], int(row.get("total_points") or 0), row.get("rank_level"))
+                            self._track(row)
+                    applied += len(rows)
+                    if rows:
+                        position = (rows[-1]["changed_at"], rows[-1]["user_id"])
+                    if len(rows) < 1000:
+                        break
+            except Exception as e:
+                print(f"[LEADERBOARD] Sync failed: {e}")
+        
+        self.synced_at = time.time()
+        return applied
+    
+    def ensure_fresh(self):
+        now = time.time()
+        if now - self.loaded_at > settings.LEADERBOARD_RELOAD_SECONDS and now >= self._load_retry_at:
+            self.load()
+        elif now - self.synced_at > settings.LEADERBOARD_SYNC_SECONDS:
+            self.sync()
+    
+    def update(self, user_id: str, total_points: int, rank_level: Optional[str] = None):
+        """Record a user's new total (called right after this worker writes it)"""
+        with self._lock:
+            self._apply(user_id, total_points, rank_level)
+    
+    # ========== QUERY ==========
+    
+    def _entries_at(self, start: int, count: int) -> List[Dict]:
+        return [
+            {
+                "rank": start + offset,
+                "user_id": user_id,
+                "points": -neg_points,
+                "rank_level": self.entries[user_id][1]
+            }
+            for offset, (neg_points, user_id) in enumerate(self.ranks.slice(start, count))
+        ]
+    
+    def entry(self, user_id: str) -> Optional[Tuple[int, str]]:
+        """(total_points, rank_level) of a user, None if they have no points row"""
+        self.ensure_fresh()
+        return self.entries.get(user_id)
+    
+    def rank_of(self, user_id: str) -> Optional[int]:
+        """1-based rank of a user, None if they have no points row"""
+        self.ensure_fresh()
+        with self._lock:
+            entry = self.entries.get(user_id)
+            return self.ranks.position(self._key(user_id, entry[0])) if entry else None
+    
+    def top(self, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Users ranked offset+1 .. offset+limit"""
+        self.ensure_fresh()
+        with self._lock:
+            return self._entries_at(offset + 1, limit)
+    
+    def around(self, user_id: str, radius: int = 5) -> List[Dict]:
+        """The user plus up to radius users ranked directly above and below"""
+        self.ensure_fresh()
+        with self._lock:
+            entry = self.entries.get(user_id)
+            if not entry:
+                return []
+            position = self.ranks.position(self._key(user_id, entry[0]))
+            start = max(1, position - radius)
+            return self._entries_at(start, position + radius - start + 1)
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class PeriodLeaderboards:
+    """
+    Daily, weekly and monthly boards read from plaro_points_rollups, where
+    every award is added to the user's current day/week/month bucket.
+    A board is one index range over (period, bucket, points desc).
+    """
+    
+    TABLE = "plaro_points_rollups"
+    
+    def __init__(self):
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Leaderboard sync unavailable: {e}")
+    
+    @staticmethod
+    def bucket(period: str, day: Optional[date] = None) -> str:
+        """Bucket (first day, ISO) of the period containing day, default today (UTC)"""
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown leaderboard period: {period}")
+        return rollup_bucket(period, day or datetime.now(timezone.utc).date()).isoformat()
+    
+    def top(self, period: str, limit: int = 20, offset: int = 0,
+            day: Optional[date] = None) -> List[Dict]:
+        """Users ranked offset+1 .. offset+limit for the period containing day"""
+        bucket = self.bucket(period, day)
+        if not self._client or limit <= 0:
+            return []
+        
+        rows = self._client.table(self.TABLE).select('user_id, points').eq(
+            'period', period
+        ).eq('bucket', bucket).order('points', desc=True).order('user_id').range(
+            offset, offset + limit - 1
+        ).execute().data or []
+        
+        return [
+            {"rank": offset + i, "user_id": row["user_id"], "points": row["points"]}
+            for i, row in enumerate(rows, start=1)
+        ]
+    
+    def rank_of(self, user_id: str, period: str, day: Optional[date] = None) -> Optional[Dict]:
+        """{'rank', 'points'} for a user in the period, None if they scored nothing in it"""
+        bucket = self.bucket(period, day)
+        if not self._client:
+            return None
+        
+        own = self._client.table(self.TABLE).select('points').eq('user_id', user_id).eq(
+            'period', period
+        ).eq('bucket', bucket).limit(1).execute().data
+        if not own:
+            return None
+        
+        points = own[0]['points']
+        # Ties are ordered by user_id, as in top()
+        ahead = self._client.table(self.TABLE).select('user_id', count='exact').eq(
+            'period', period
+        ).eq('bucket', bucket).or_(
+            f'points.gt.{points},and(points.eq.{points},user_id.lt.{user_id})'
+        ).limit(1).execute()
+        
+        return {"rank": (ahead.count or 0) + 1, "points": points}
+
+
+# Global instances
+leaderboard = Leaderboard()
+period_leaderboards = PeriodLeaderboards()
@@ -7,7 +7,7 @@ Uses Gemini 2.5 Flash for intelligent path orchestration
 import google.generativeai as genai
 from config import get_settings
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 settings = get_settings()
 genai.configure(api_key=settings.GEMINI_API_KEY)
@@ -27,7 +27,8 @@ class LearningPathOptimizer:
         user_skills: dict,
         required_skills: list,
         time_constraint_weeks: int,
-        learning_preference: str
+        learning_preference: str,
+        market_demand: Optional[Dict[str, int]] = None
     ) -> dict:
         """
         Analyzes user profile and optimizes the learning path
@@ -37,11 +38,15 @@ class LearningPathOptimizer:
             required_skills: List of skills needed for target role
             time_constraint_weeks: Available time to upskill
             learning_preference: 'video', 'reading', 'hands_on', or 'mixed'
+            market_demand: Dict of {skill_name: open job postings} (default latest market snapshot)
         
         Returns:
             Dict with optimized sequence, estimates, and recommendations
         """
         
+        if market_demand is None:
+            market_demand = LearningPathOptimizer._market_demand(required_skills)
+        
         prompt = f"""
 You are a Learning Path Optimization AI Agent specializing in career development.
 
@@ -52,6 +57,7 @@ USER PROFILE:
 - Required Skills for Target: {required_skills}
 - Available Time: {time_constraint_weeks} weeks
 - Preferred Learning Style: {learning_preference}
+- Job Market Demand (open postings per skill): {json.dumps(market_demand)}
 
 YOUR TASK:
 1. Identify skill gaps (required but low confidence)
@@ -59,6 +65,7 @@ YOUR TASK:
    - Relevance to target role (higher = earlier)
    - Dependency chain (prerequisites first)
    - Confidence gap severity
+   - Job market demand (more open postings = earlier, among similar gaps)
 3. Group skills for parallel learning where possible
 4. Suggest skipping modules for high-confidence skills (>0.7)
 5. Adjust difficulty progressively
@@ -121,7 +128,7 @@ Return ONLY this valid JSON (no markdown, no extra text):
             if not response.text:
                 print(f"[ERROR] Empty response from Gemini")
                 return LearningPathOptimizer._fallback_optimization(
-                    user_skills, required_skills, time_constraint_weeks, learning_preference
+                    user_skills, required_skills, time_constraint_weeks, learning_preference, market_demand
                 )
             
             result = json.loads(response.text)
@@ -130,7 +137,7 @@ Return ONLY this valid JSON (no markdown, no extra text):
             if not isinstance(result, dict) or 'optimized_sequence' not in result:
                 print(f"[ERROR] Invalid response structure")
                 return LearningPathOptimizer._fallback_optimization(
-                    user_skills, required_skills, time_constraint_weeks, learning_preference
+                    user_skills, required_skills, time_constraint_weeks, learning_preference, market_demand
                 )
             
             print(f"[OPTIMIZER] ✅ Successfully optimized learning path")
@@ -143,26 +150,39 @@ Return ONLY this valid JSON (no markdown, no extra text):
         except json.JSONDecodeError as e:
             print(f"[ERROR] JSON parsing failed: {e}")
             return LearningPathOptimizer._fallback_optimization(
-                user_skills, required_skills, time_constraint_weeks, learning_preference
+                user_skills, required_skills, time_constraint_weeks, learning_preference, market_demand
             )
         except Exception as e:
             print(f"[ERROR] Optimization failed: {e}")
             return LearningPathOptimizer._fallback_optimization(
-                user_skills, required_skills, time_constraint_weeks, learning_preference
+                user_skills, required_skills, time_constraint_weeks, learning_preference, market_demand
             )
     
     @staticmethod
-    def _fallback_optimization(user_skills: dict, required_skills: list, weeks: int, pref: str) -> dict:
+    def _market_demand(skills: list) -> Dict[str, int]:
+        """Country-wide posting counts for skills from the latest market snapshot"""
+        try:
+            from services.job_retrieval_service import adzuna_service
+            return adzuna_service.get_skill_demand(location=None, skills=skills)
+        except Exception as e:
+            print(f"[WARNING] Market demand unavailable: {e}")
+            return {}
+    
+    @staticmethod
+    def _fallback_optimization(user_skills: dict, required_skills: list, weeks: int, pref: str,
+                               market_demand: Optional[Dict[str, int]] = None) -> dict:
         """Fallback optimization if Gemini fails"""
         
         print(f"[OPTIMIZER] 🔄 Using fallback optimization")
         
-        # Sort by confidence gap
+        market_demand = market_demand or {}
+        
+        # Sort by confidence gap, then by job market demand
         scored_skills = [
             (skill, user_skills.get(skill, 0.0), 1.0 - user_skills.get(skill, 0.0))
             for skill in required_skills
         ]
-        scored_skills.sort(key=lambda x: x[2], reverse=True)  # Sort by gap
+        scored_skills.sort(key=lambda x: (x[2], market_demand.get(x[0], 0)), reverse=True)
         
         # Content mix preference mapping
         mix_map = {
@@ -58,6 +58,40 @@ class NotificationService:
         }
     }
     
+    @staticmethod
+    def build_notification(
+        user_id: str,
+        notification_type: str,
+        title: str,
+        message: str,
+        action_url: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        dedup_key: Optional[str] = None
+    ) -> Dict:
+        """Notification row for user_notifications (not saved)"""
+        if notification_type not in NotificationService.NOTIFICATION_TYPES:
+            notification_type = "ai_tip"
+        
+        type_config = NotificationService.NOTIFICATION_TYPES[notification_type]
+        
+        notification_data = {
+            'user_id': user_id,
+            'notification_type': notification_type,
+            'title': title,
+            'message': message,
+            'icon': type_config['icon'],
+            'priority': type_config['priority'],
+            'category': type_config['category'],
+            'action_url': action_url,
+            'metadata': metadata or {},
+            'read': False,
+            'created_at': datetime.now().isoformat()
+        }
+        if dedup_key:
+            notification_data['dedup_key'] = dedup_key
+        
+        return notification_data
+    
     @staticmethod
     def create_notification(
         user_id: str,
@@ -72,24 +106,9 @@ class NotificationService:
             if not db:
                 return {"success": False, "error": "Database not available"}
             
-            if notification_type not in NotificationService.NOTIFICATION_TYPES:
-                notification_type = "ai_tip"
-            
-            type_config = NotificationService.NOTIFICATION_TYPES[notification_type]
-            
-            notification_data = {
-                'user_id': user_id,
-                'notification_type': notification_type,
-                'title': title,
-                'message': message,
-                'icon': type_config['icon'],
-                'priority': type_config['priority'],
-                'category': type_config['category'],
-                'action_url': action_url,
-                'metadata': metadata or {},
-                'read': False,
-                'created_at': datetime.now().isoformat()
-            }
+            notification_data = NotificationService.build_notification(
+                user_id, notification_type, title, message, action_url, metadata
+            )
             
             result = db.client.table('user_notifications').insert(
                 notification_data
@@ -104,6 +123,32 @@ class NotificationService:
             print(f"[NOTIFICATION] Create failed: {e}")
             return {"success": False, "error": str(e)}
     
+    @staticmethod
+    def create_notifications(notifications: List[Dict], batch_size: int = 1000) -> Dict:
+        """
+        Bulk insert notification rows from build_notification.
+        Rows whose dedup_key was already sent are skipped, so re-running a
+        batch never notifies a user twice.
+        """
+        try:
+            if not db:
+                return {"success": False, "error": "Database not available"}
+            
+            inserted = 0
+            for start in range(0, len(notifications), batch_size):
+                result = db.client.table('user_notifications').upsert(
+                    notifications[start:start + batch_size],
+                    on_conflict='dedup_key',
+                    ignore_duplicates=True
+                ).execute()
+                inserted += len(result.data or [])
+            
+            return {"success": True, "inserted": inserted}
+            
+        except Exception as e:
+            print(f"[NOTIFICATION] Bulk create failed: {e}")
+            return {"success": False, "error": str(e)}
+    
     @staticmethod
     def notify_module_unlock(user_id: str, skill: str, module_name: str, module_id: int) -> Dict:
         """Notify user of module unlock"""
@@ -151,6 +196,27 @@ class NotificationService:
             metadata={"job_title": job_title, "match": match_percentage}
         )
     
+    @staticmethod
+    def job_match_notification(user_id: str, job: Dict, match_percentage: float,
+                               matched_skills: List[str], dedup_key: Optional[str] = None) -> Dict:
+        """job_match row for a specific posting (for create_notifications)"""
+        return NotificationService.build_notification(
+            user_id=user_id,
+            notification_type="job_match",
+            title="Job Match Found! 💼",
+            message=f"{job.get('title')} - {int(match_percentage)}% match",
+            action_url=job.get("url") or "/jobs",
+            metadata={
+                "job_id": job.get("job_id"),
+                "job_title": job.get("title"),
+                "company": job.get("company"),
+                "location": job.get("location"),
+                "match": match_percentage,
+                "matched_skills": matched_skills
+            },
+            dedup_key=dedup_key
+        )
+    
     @staticmethod
     def notify_level_up(user_id: str, new_level: int, xp_earned: int) -> Dict:
         """Notify user of level up"""
@@ -7,7 +7,11 @@ from typing import List, Dict, Optional
 import google.generativeai as genai
 from config import get_settings
 from supabase import create_client
+from row_models import ModuleProgressRow
+from database import mark_action_complete
+from services.enhanced_rag_service import enhanced_rag
 import json
+import threading
 from datetime import datetime
 
 settings = get_settings()
@@ -20,10 +24,18 @@ class PEARLAgent:
     def __init__(self):
         self.client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
     
-    def create_learning_path(self, user_id: str, session_id: str, skill: str, current_confidence: float = 0.0) -> Dict:
-        """Create complete learning path and save to database"""
+    def create_learning_path(self, user_id: str, session_id: str, skill: str, current_confidence: float = 0.0,
+                             lazy: Optional[bool] = None) -> Dict:
+        """
+        Create learning path and save to database.
+        In lazy mode only module 1 gets actions/questions up front; later
+        modules are saved as outlines and materialized when reached.
+        """
         print(f"[PEARL] Creating path for: {skill}")
         
+        if lazy is None:
+            lazy = settings.PEARL_LAZY_PATHS
+        
         difficulty = "beginner" if current_confidence < 0.3 else "intermediate" if current_confidence < 0.7 else "advanced"
         
         # Step 1: Decompose skill into modules
@@ -35,8 +47,11 @@ class PEARLAgent:
         # Step 2: Save modules to database
         saved_modules = []
         for module in decomposition['modules']:
-            # Generate actions for this module
-            actions = self._generate_actions(module, skill)
+            # Generate actions for this module (outline only for later modules in lazy mode)
+            if lazy and module['module_id'] != 1:
+                actions = {"actions": []}
+            else:
+                actions = self._generate_actions(module, skill)
             
             # Save module to ai_module_progress
             module_data = {
@@ -47,7 +62,7 @@ class PEARLAgent:
                 "module_name": module['name'],
                 "status": 'active' if module['module_id'] == 1 else 'locked',
                 "actions_completed": 0,
-                "total_actions": len(actions.get('actions', [])),
+                **self._action_state(actions.get('actions', [])),
                 "cached_completion_data": {
                     "module": module,
                     "actions": actions.get('actions', [])
@@ -72,6 +87,96 @@ class PEARLAgent:
         print(f"[PEARL] ✅ Path created and saved: {len(saved_modules)} modules")
         return learning_path
     
+    @staticmethod
+    def _action_state(actions: List[Dict]) -> Dict:
+        """Fresh completion columns for a module's generated actions"""
+        return {
+            "total_actions": len(actions),
+            "completed_mask": 0,
+            "next_action_index": 0 if actions else None
+        }
+    
+    def materialize_module(self, progress_id: str) -> bool:
+        """
+        Generate actions and checkpoint questions for an outline module.
+        A module with no actions is an outline (or a failed generation, which is retried).
+        """
+        try:
+            row = self.client.table('ai_module_progress').select(
+                'id, user_id, session_id, skill, total_actions, module:cached_completion_data->module'
+            ).eq('id', progress_id).single().execute().data
+            
+            module = ModuleProgressRow.from_row(row)
+            if not module:
+                return False
+            if module.total_actions:
+                return True
+            
+            outline = row.get('module')
+            if not outline:
+                return False
+            
+            print(f"[PEARL] Materializing module {outline.get('module_id')} for: {module.skill}")
+            actions = self._generate_actions(outline, module.skill).get('actions', [])
+            if not actions:
+                return False
+            self._attach_resources(module, outline, actions)
+            
+            # Only fill a row that is still an outline, so a racing prefetch can't clobber progress
+            self.client.table('ai_module_progress').update({
+                **self._action_state(actions),
+                "cached_completion_data": {
+                    "module": outline,
+                    "actions": actions
+                },
+                "last_cache_update": datetime.now().isoformat()
+            }).eq('id', progress_id).eq('total_actions', 0).execute()
+            
+            return True
+            
+        except Exception as e:
+            print(f"[PEARL ERROR] Module materialization failed: {e}")
+            return False
+    
+    def _attach_resources(self, module: ModuleProgressRow, outline: Dict, actions: List[Dict]):
+        """Attach RAG resources to a lazily generated module, avoiding ones its path already uses"""
+        used = []
+        try:
+            siblings = self.client.table('ai_module_progress').select(
+                'actions:cached_completion_data->actions'
+            ).eq('user_id', module.user_id).eq('session_id', module.session_id).eq(
+                'skill', module.skill
+            ).neq('id', module.id).execute()
+            used = [
+                action['external_resource']
+                for sibling in siblings.data or [] for action in sibling.get('actions') or []
+                if action.get('external_resource')
+            ]
+        except Exception as e:
+            print(f"[PEARL] Path resources unavailable: {e}")
+        
+        enhanced_rag.attach_external_resources(
+            {module.skill: {"modules": [dict(outline, actions=actions)]}}, used
+        )
+    
+    def prefetch_next_module(self, user_id: str, session_id: str, current_module_id: int):
+        """Materialize the next module in the background before it is unlocked"""
+        def _prefetch():
+            try:
+                next_module = self.client.table('ai_module_progress').select(
+                    'id, total_actions'
+                ).eq('user_id', user_id).eq('session_id', session_id).eq(
+                    'module_id', current_module_id + 1
+                ).execute()
+                
+                rows = ModuleProgressRow.from_rows(next_module.data)
+                if rows and not rows[0].total_actions:
+                    self.materialize_module(rows[0].id)
+            except Exception as e:
+                print(f"[PEARL] Prefetch skipped: {e}")
+        
+        threading.Thread(target=_prefetch, daemon=True).start()
+    
     def _decompose_skill(self, skill: str, difficulty: str) -> Dict:
         """Decompose skill into modules using Gemini"""
         prompt = f"""
@@ -173,7 +278,6 @@ Return JSON:
                 if action.get('type') == 'checkpoint':
                     action['questions'] = self._generate_checkpoint_questions(skill, module)
                     action['pass_threshold'] = 70
-                    action['completed'] = False
             
             return parsed
             
@@ -220,30 +324,39 @@ Return JSON array:
     def get_next_action(self, user_id: str, session_id: str) -> Optional[Dict]:
         """Get next incomplete action from database"""
         try:
-            # Get active module
-            active_module = self.client.table('ai_module_progress').select('*').eq(
-                'user_id', user_id
-            ).eq('session_id', session_id).eq('status', 'active').single().execute()
+            # Get active module (next_action_index is maintained on every completion)
+            query = self.client.table('ai_module_progress').select(
+                'id, module_id, module_name, total_actions, next_action_index'
+            ).eq('user_id', user_id).eq('session_id', session_id).eq('status', 'active')
+            
+            module = ModuleProgressRow.from_row(query.single().execute().data)
             
-            if not active_module.data:
+            # Active outline whose materialization failed at unlock: retry once
+            if module and not module.total_actions and self.materialize_module(module.id):
+                module = ModuleProgressRow.from_row(query.single().execute().data)
+            
+            if not module or module.next_action_index is None:
                 return None
             
-            module = active_module.data
-            cached_data = module.get('cached_completion_data', {})
-            actions = cached_data.get('actions', [])
-            
-            # Find first incomplete action
-            for idx, action in enumerate(actions):
-                if not action.get('completed', False):
-                    return {
-                        "module_id": module['module_id'],
-                        "module_name": module['module_name'],
-                        "action_index": idx,
-                        "action": action,
-                        "progress_id": module['id']
-                    }
+            idx = module.next_action_index
             
-            return None
+            # Pull just that action out of the blob
+            action_row = self.client.table('ai_module_progress').select(
+                f'action:cached_completion_data->actions->{idx}'
+            ).eq('id', module.id).single().execute()
+            
+            action = (action_row.data or {}).get('action')
+            if not action:
+                return None
+            
+            action['completed'] = False
+            return {
+                "module_id": module.module_id,
+                "module_name": module.module_name,
+                "action_index": idx,
+                "action": action,
+                "progress_id": module.id
+            }
             
         except Exception as e:
             print(f"[PEARL ERROR] Get next action failed: {e}")
@@ -252,71 +365,83 @@ Return JSON array:
     def complete_action(self, progress_id: str, action_index: int, completion_data: Optional[Dict] = None) -> Dict:
         """Mark action as complete and save to database"""
         try:
-            # Get module progress
-            module = self.client.table('ai_module_progress').select('*').eq('id', progress_id).single().execute()
-            
-            if not module.data:
+            # Get module progress (only the action's type from the blob)
+            row = self.client.table('ai_module_progress').select(
+                'id, user_id, session_id, module_id, total_actions, '
+                f'action_type:cached_completion_data->actions->{action_index}->>type'
+            ).eq('id', progress_id).single().execute().data
+            
+            module = ModuleProgressRow.from_row(row)
+            if not module:
                 return {"success": False, "error": "Module not found"}
             
-            # Update cached data
-            cached_data = module.data.get('cached_completion_data', {})
-            actions = cached_data.get('actions', [])
+            if not 0 <= action_index < module.total_actions:
+                return {"success": False, "error": "Invalid action index"}
             
-            if action_index < len(actions):
-                actions[action_index]['completed'] = True
-                actions[action_index]['completed_at'] = datetime.now().isoformat()
-            
-            cached_data['actions'] = actions
-            
-            # Save action completion
-            action_completion = {
-                "module_progress_id": progress_id,
-                "action_index": action_index,
-                "action_type": actions[action_index].get('type') if action_index < len(actions) else 'unknown',
-                "completion_data": completion_data or {}
-            }
-            self.client.table('ai_action_completions').insert(action_completion).execute()
-            
-            # Update module progress
-            actions_completed = module.data.get('actions_completed', 0) + 1
-            total_actions = module.data.get('total_actions', 4)
+            # Flip the action's bit; the content blob is never rewritten
+            state = mark_action_complete(self.client, progress_id, action_index)
+            if not state:
+                return {"success": False, "error": "Module not found"}
             
-            update_data = {
-                "actions_completed": actions_completed,
-                "cached_completion_data": cached_data,
-                "last_cache_update": datetime.now().isoformat()
-            }
+            # Save action completion (once: repeats leave the first record alone)
+            if state['newly_completed']:
+                action_completion = {
+                    "module_progress_id": progress_id,
+                    "action_index": action_index,
+                    "action_type": row.get('action_type') or 'unknown',
+                    "completion_data": completion_data or {}
+                }
+                self.client.table('ai_action_completions').insert(action_completion).execute()
             
-            # Check if module complete
-            if actions_completed >= total_actions:
-                update_data['status'] = 'completed'
-                update_data['completed_at'] = datetime.now().isoformat()
+            actions_completed = state['actions_completed']
+            module_complete = actions_completed >= module.total_actions
             
-            self.client.table('ai_module_progress').update(update_data).eq('id', progress_id).execute()
+            # Warm up the next module while the user finishes this one
+            remaining = module.total_actions - actions_completed
+            if state['newly_completed'] and remaining == settings.PEARL_PREFETCH_REMAINING_ACTIONS:
+                self.prefetch_next_module(module.user_id, module.session_id, module.module_id)
             
-            # If module complete, unlock next
-            if actions_completed >= total_actions:
-                self._unlock_next_module(module.data['user_id'], module.data['session_id'], module.data['module_id'])
+            # Repeat completions of the same action don't re-complete the module
+            if module_complete and state['newly_completed']:
+                self.client.table('ai_module_progress').update({
+                    'status': 'completed',
+                    'completed_at': datetime.now().isoformat()
+                }).eq('id', progress_id).execute()
+                
+                self._unlock_next_module(module.user_id, module.session_id, module.module_id)
+                self._module_completed_event(module.user_id, progress_id)
             
             return {
                 "success": True,
                 "actions_completed": actions_completed,
-                "module_complete": actions_completed >= total_actions
+                "module_complete": module_complete
             }
             
         except Exception as e:
             print(f"[PEARL ERROR] Complete action failed: {e}")
             return {"success": False, "error": str(e)}
     
+    def _module_completed_event(self, user_id: str, progress_id: str):
+        """Let the achievement engine see the completion (first_module etc.)"""
+        try:
+            from services.gamification_service import gamification_service
+            gamification_service.handle_event(user_id, "module_completed", {"progress_id": progress_id})
+        except Exception as e:
+            print(f"[PEARL] Achievement check failed: {e}")
+    
     def _unlock_next_module(self, user_id: str, session_id: str, current_module_id: int):
         """Unlock next module when current is complete"""
         try:
             # Find next module
-            next_module = self.client.table('ai_module_progress').select('*').eq(
+            next_module = self.client.table('ai_module_progress').select('id, total_actions').eq(
                 'user_id', user_id
             ).eq('session_id', session_id).eq('module_id', current_module_id + 1).single().execute()
             
             if next_module.data:
+                # Lazy paths: fill in the outline if prefetch hasn't already
+                if not next_module.data.get('total_actions'):
+                    self.materialize_module(next_module.data['id'])
+                
                 self.client.table('ai_module_progress').update({
                     'status': 'active',
                     'started_at': datetime.now().isoformat()
@@ -331,14 +456,15 @@ Return JSON array:
         """Submit checkpoint answers and evaluate"""
         try:
             # Get module
-            module = self.client.table('ai_module_progress').select('*').eq('id', progress_id).single().execute()
+            module = ModuleProgressRow.from_row(self.client.table('ai_module_progress').select(
+                'id, cached_completion_data'
+            ).eq('id', progress_id).single().execute().data)
             
-            if not module.data:
+            if not module:
                 return {"success": False, "error": "Module not found"}
             
             # Get checkpoint questions
-            cached_data = module.data.get('cached_completion_data', {})
-            actions = cached_data.get('actions', [])
+            actions = module.cached_completion_data.get('actions', [])
             
             checkpoint = next((a for a in actions if a.get('type') == 'checkpoint'), None)
             
@@ -394,18 +520,19 @@ Return JSON array:
     def get_user_progress(self, user_id: str, session_id: str) -> Dict:
         """Get user's complete learning progress"""
         try:
-            modules = self.client.table('ai_module_progress').select('*').eq(
-                'user_id', user_id
-            ).eq('session_id', session_id).order('module_id').execute()
+            # Progress listing never needs the generated content blob
+            modules = ModuleProgressRow.from_rows(self.client.table('ai_module_progress').select(
+                ModuleProgressRow.SUMMARY_COLUMNS
+            ).eq('user_id', user_id).eq('session_id', session_id).order('module_id').execute().data)
             
-            total_modules = len(modules.data or [])
-            completed_modules = len([m for m in (modules.data or []) if m.get('status') == 'completed'])
+            total_modules = len(modules)
+            completed_modules = len([m for m in modules if m.status == 'completed'])
             
             return {
                 "total_modules": total_modules,
                 "completed_modules": completed_modules,
                 "progress_percentage": (completed_modules / total_modules * 100) if total_modules > 0 else 0,
-                "modules": modules.data or []
+                "modules": [m.to_dict() for m in modules]
             }
             
         except Exception as e:
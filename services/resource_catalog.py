@@ -0,0 +1,195 @@
+"""
+Resource Catalog
+The curated learning-resource catalog: a versioned JSON snapshot shipped with
+the app plus an append log of additions (resource_catalog_log, or a local
+.log file without a database). Every worker replays the same log on top of
+the same snapshot, so all of them converge on one catalog, and both are
+re-checked periodically so changes are picked up without a restart.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+from config import get_settings
+
+settings = get_settings()
+
+try:
+    from database import get_supabase
+except Exception as e:
+    print(f"[WARNING] Shared resource catalog log unavailable, using local log: {e}")
+    get_supabase = None
+
+
+DEFAULT_SNAPSHOT_PATH = Path(__file__).resolve().parent.parent / "data" / "resource_catalog.json"
+
+Catalog = Dict[str, Dict[str, List[Dict]]]
+
+
+class ResourceCatalog:
+    """
+    Snapshot + append log, materialized copy-on-write.
+    `data` is never mutated in place: a reload or an addition swaps in a new
+    dict, so readers can hold a reference without locking.
+    """
+    
+    TABLE = "resource_catalog_log"
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.RESOURCE_CATALOG_PATH or DEFAULT_SNAPSHOT_PATH)
+        self.log_path = self.path.with_suffix(".log")
+        self.data: Catalog = {}
+        self.version = 0
+        # Log entries up to log_offset are already folded into the snapshot
+        self.log_offset = 0
+        self.log_position = 0
+        self.checked_at = 0.0
+        self._snapshot_stat: Optional[Tuple[float, int]] = None
+        self._lock = threading.RLock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Shared resource catalog log unavailable, using local log: {e}")
+        
+        self.reload()
+    
+    @property
+    def revision(self) -> Tuple[int, int]:
+        """(snapshot version, last applied log entry); changes whenever data does"""
+        return (self.version, self.log_position)
+    
+    # ========== LOAD ==========
+    
+    def _read_snapshot(self) -> Tuple[int, int, Catalog]:
+        with open(self.path, "rb") as f:
+            payload = json.loads(f.read())
+        return int(payload.get("version") or 0), int(payload.get("log_offset") or 0), payload.get("skills") or {}
+    
+    def _read_log(self, after: int) -> List[Dict]:
+        """Log entries with id > after, in id order"""
+        if self._client:
+            response = self._client.table(self.TABLE).select(
+                'id, skill, resource_type, resource'
+            ).gt('id', after).order('id').limit(1000).execute()
+            return response.data or []
+        
+        if not self.log_path.exists():
+            return []
+        
+        entries = []
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line_number <= after or not line.strip():
+                    continue
+                try:
+                    entries.append(dict(json.loads(line), id=line_number))
+                except ValueError:
+                    # A half-written last line is picked up on the next check
+                    break
+        return entries
+    
+    @staticmethod
+    def _apply(data: Catalog, entries: List[Dict]) -> Catalog:
+        """New catalog with log entries appended (touched skills are copied, not mutated)"""
+        data = dict(data)
+        for entry in entries:
+            by_type = dict(data.get(entry["skill"], {}))
+            by_type[entry["resource_type"]] = by_type.get(entry["resource_type"], []) + [entry["resource"]]
+            data[entry["skill"]] = by_type
+        return data
+    
+    def reload(self) -> Tuple[int, int]:
+        """Re-read the snapshot if its file changed, then apply new log entries"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                if (stat.st_mtime, stat.st_size) != self._snapshot_stat:
+                    version, log_offset, skills = self._read_snapshot()
+                    self.data, self.version = skills, version
+                    self.log_offset = self.log_position = log_offset
+                    self._snapshot_stat = (stat.st_mtime, stat.st_size)
+                    print(f"[RAG] ✅ Loaded resource catalog v{version} ({len(skills)} skills)")
+            except Exception as e:
+                print(f"[RAG] Resource catalog snapshot load failed: {e}")
+            
+            try:
+                while True:
+                    entries = self._read_log(self.log_position)
+                    if not entries:
+                        break
+                    self.data = self._apply(self.data, entries)
+                    self.log_position = entries[-1]["id"]
+            except Exception as e:
+                print(f"[RAG] Resource catalog log read failed: {e}")
+            
+            self.checked_at = time.time()
+            return self.revision
+    
+    def ensure_fresh(self):
+        """Reload when the last check is older than RESOURCE_CATALOG_RELOAD_SECONDS"""
+        if time.time() - self.checked_at > settings.RESOURCE_CATALOG_RELOAD_SECONDS:
+            self.reload()
+    
+    def current(self) -> Catalog:
+        """Up-to-date catalog ({skill: {type: [resource]}}); treat as read-only"""
+        self.ensure_fresh()
+        return self.data
+    
+    # ========== WRITE ==========
+    
+    def add(self, skill: str, resource_type: str, resource: Dict) -> bool:
+        """Append a resource to the log (visible to every worker on its next check)"""
+        entry = {"skill": skill, "resource_type": resource_type, "resource": resource}
+        
+        try:
+            with self._lock:
+                if self._client:
+                    self._client.table(self.TABLE).insert(dict(
+                        entry,
+                        catalog_version=self.version,
+                        created_at=datetime.now(timezone.utc).isoformat()
+                    )).execute()
+                else:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                
+                # Replay through the log (not a local insert) so ordering matches other workers
+                self.reload()
+            return True
+        except Exception as e:
+            print(f"[RAG] Resource catalog append failed: {e}")
+            return False
+    
+    def compact(self, path: Optional[str] = None) -> int:
+        """
+        Write snapshot + log as the next snapshot version (atomic replace).
+        Log entries already folded in are skipped through log_offset.
+        """
+        with self._lock:
+            self.reload()
+            version = self.version + 1
+            target = Path(path) if path else self.path
+            tmp = target.with_suffix(".tmp")
+            
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": version, "log_offset": self.log_position, "skills": self.data},
+                    f, indent=2, ensure_ascii=False
+                )
+                f.write("\n")
+            os.replace(tmp, target)
+            
+            print(f"[RAG] ✅ Wrote resource catalog v{version} (log offset {self.log_position})")
+            return version
+
+
+# Global instance
+resource_catalog = ResourceCatalog()
@@ -0,0 +1,224 @@
+"""
+Resource Index
+Retrieval over the curated learning-resource catalog: a BM25 inverted index
+over resource titles, descriptions, sources, platforms and skills, plus an
+optional embedding matrix searched by cosine similarity
+"""
+
+from typing import List, Dict, Optional, Callable, Tuple
+import math
+import numpy as np
+
+from services.job_index_service import tokenize
+from services.skill_matcher import ALIAS_LOOKUP
+
+
+RESOURCE_TYPES = ("byte", "course", "taiken")
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Matches on the skill or the title count more than on the description
+FIELD_WEIGHTS = (("skill", 2), ("title", 2), ("description", 1), ("source", 1), ("platform", 1))
+
+# Share of the final score taken from embeddings when they are available
+EMBEDDING_WEIGHT = 0.5
+
+
+def stem(token: str) -> str:
+    """Light plural folding so "APIs" matches "API" and "projects" matches "project" """
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def analyze(text: Optional[str]) -> List[str]:
+    return [stem(token) for token in tokenize(text)]
+
+
+class ResourceIndex:
+    """
+    BM25 (and optionally embedding) retrieval over catalog entries.
+    Built once from {skill: {type: [resource]}}; immutable afterwards, so a
+    rebuilt index simply replaces the old one.
+    """
+    
+    def __init__(self, catalog: Dict[str, Dict[str, List[Dict]]],
+                 embedder: Optional[Callable[[List[str], str], np.ndarray]] = None):
+        # (skill, type, resource) per document position
+        self.documents: List[Tuple[str, str, Dict]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        self.embedder = embedder
+        self.embeddings: Optional[np.ndarray] = None
+        self._query_vectors: Dict[str, np.ndarray] = {}
+        
+        texts = []
+        for skill, by_type in catalog.items():
+            for resource_type, resources in by_type.items():
+                for resource in resources:
+                    self._add(skill, resource_type, resource)
+                    texts.append(self._document_text(skill, resource))
+        
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        self.types = np.array([resource_type for _, resource_type, _ in self.documents])
+        
+        if embedder and texts:
+            try:
+                self.embeddings = self._normalize(np.asarray(embedder(texts, "retrieval_document"), dtype=np.float32))
+            except Exception as e:
+                print(f"[RAG] Resource embeddings unavailable, using BM25 only: {e}")
+                self.embeddings = None
+    
+    @staticmethod
+    def _document_text(skill: str, resource: Dict) -> str:
+        return " ".join(
+            str(resource.get(field) or "") for field in ("title", "description", "source", "platform")
+        ) + f" {skill}"
+    
+    def _add(self, skill: str, resource_type: str, resource: Dict):
+        pos = len(self.documents)
+        self.documents.append((skill, resource_type, resource))
+        
+        # Skill aliases make "k8s" or "ml" hit the skill field too
+        skill_text = " ".join([skill] + ALIAS_LOOKUP.get(skill.lower(), []))
+        fields = {"skill": skill_text}
+        fields.update({field: resource.get(field) for field in ("title", "description", "source", "platform")})
+        
+        counts: Dict[str, int] = {}
+        length = 0
+        for field, weight in FIELD_WEIGHTS:
+            for token in analyze(fields.get(field)):
+                counts[token] = counts.get(token, 0) + weight
+                length += weight
+        
+        for token, tf in counts.items():
+            self.postings.setdefault(token, []).append((pos, tf))
+        self.lengths.append(length)
+    
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1)
+    
+    # ========== QUERY ==========
+    
+    def bm25(self, query: str) -> Dict[int, float]:
+        """{document position: BM25 score} for documents sharing a query term"""
+        scores: Dict[int, float] = {}
+        total = len(self.documents)
+        
+        for token in set(analyze(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pos, tf in postings:
+                norm = K1 * (1 - B + B * self.lengths[pos] / self.avg_length)
+                scores[pos] = scores.get(pos, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        
+        return scores
+    
+    def _query_vector(self, query: str) -> np.ndarray:
+        # Per-type searches for one query share a single embedding call
+        vector = self._query_vectors.get(query)
+        if vector is None:
+            vector = self._normalize(np.asarray(self.embedder([query], "retrieval_query"), dtype=np.float32))[0]
+            if len(self._query_vectors) >= 1024:
+                self._query_vectors.clear()
+            self._query_vectors[query] = vector
+        return vector
+    
+    def _cosine_top(self, query: str, mask: np.ndarray, k: int) -> Dict[int, float]:
+        """{document position: cosine} for the k nearest documents within mask"""
+        vector = self._query_vector(query)
+        similarity = np.where(mask, self.embeddings @ vector, -np.inf)
+        
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return {}
+        top = np.argpartition(-similarity, k - 1)[:k]
+        return {int(pos): float(similarity[pos]) for pos in top}
+    
+    def containing(self, text: str) -> np.ndarray:
+        """Mask of documents that contain every term of text (none if text has no terms)"""
+        mask = np.zeros(len(self.documents), dtype=bool)
+        positions = None
+        for token in set(analyze(text)):
+            found = {pos for pos, _ in self.postings.get(token, ())}
+            positions = found if positions is None else positions & found
+        if positions:
+            mask[list(positions)] = True
+        return mask
+    
+    def search(self, query: str, resource_type: Optional[str] = None,
+               top_k: int = 5, skill: Optional[str] = None,
+               must_match: Optional[str] = None) -> List[Dict]:
+        """
+        Ranked resources for a free-text query
+        
+        Args:
+            query: Free text ("build APIs with Django", a module name, ...)
+            resource_type: Restrict to 'byte', 'course' or 'taiken'
+            top_k: Number of resources to return
+            skill: Restrict to one catalog skill
+            must_match: Restrict to documents containing every term of this text
+                        (e.g. an uncatalogued skill name)
+        
+        Returns:
+            Resource dicts (copies) with skill, type and score added, best first
+        """
+        
+        if not self.documents or top_k <= 0:
+            return []
+        
+        mask = np.ones(len(self.documents), dtype=bool)
+        if resource_type:
+            mask &= self.types == resource_type
+        if skill:
+            mask &= np.array([doc_skill == skill for doc_skill, _, _ in self.documents])
+        if must_match is not None:
+            mask &= self.containing(must_match)
+        
+        lexical = {pos: score for pos, score in self.bm25(query).items() if mask[pos]}
+        scores = lexical
+        
+        if self.embeddings is not None:
+            try:
+                semantic = self._cosine_top(query, mask, max(top_k * 4, 20))
+                top_lexical = max(lexical.values(), default=0.0) or 1.0
+                scores = {
+                    pos: (1 - EMBEDDING_WEIGHT) * lexical.get(pos, 0.0) / top_lexical
+                    + EMBEDDING_WEIGHT * max(semantic.get(pos, 0.0), 0.0)
+                    for pos in set(lexical) | set(semantic)
+                }
+            except Exception as e:
+                print(f"[RAG] Query embedding failed, using BM25 only: {e}")
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        
+        results = []
+        for pos, score in ranked:
+            if score <= 0:
+                continue
+            doc_skill, doc_type, resource = self.documents[pos]
+            results.append(dict(resource, skill=doc_skill, type=doc_type, score=round(score, 4)))
+        return results
+    
+    def search_by_type(self, query: str, top_k: int = 3,
+                       skill: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """Ranked resources for a query, separately for each resource type"""
+        return {
+            resource_type: self.search(query, resource_type, top_k, skill)
+            for resource_type in RESOURCE_TYPES
+        }
+
+
+def gemini_embedder(model: str) -> Callable[[List[str], str], np.ndarray]:
+    """Embedding function backed by the Gemini embeddings API"""
+    def embed(texts: List[str], task_type: str) -> np.ndarray:
+        import google.generativeai as genai
+        result = genai.embed_content(model=model, content=texts, task_type=task_type)
+        return np.asarray(result["embedding"], dtype=np.float32)
+    return embed
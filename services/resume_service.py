@@ -9,6 +9,7 @@ from supabase import create_client
 import google.generativeai as genai
 import json
 from config import get_settings
+from row_models import UserSkillRow
 
 settings = get_settings()
 genai.configure(api_key=settings.GEMINI_API_KEY)
@@ -85,8 +86,10 @@ class ResumeService:
     def _get_user_skills(self, user_id: str) -> List[Dict]:
         """Get user skills"""
         try:
-            result = self.client.table('user_skill_memory').select('*').eq('user_id', user_id).order('confidence_score', desc=True).execute()
-            return result.data or []
+            result = self.client.table('user_skill_memory').select(
+                UserSkillRow.COLUMNS
+            ).eq('user_id', user_id).order('confidence_score', desc=True).execute()
+            return [row.to_dict() for row in UserSkillRow.from_rows(result.data)]
         except:
             return []
     
@@ -96,7 +99,7 @@ class ResumeService:
         
         try:
             # Get completed modules
-            modules = self.client.table('ai_module_progress').select('*').eq(
+            modules = self.client.table('ai_module_progress').select('skill').eq(
                 'user_id', user_id
             ).eq('status', 'completed').execute()
             
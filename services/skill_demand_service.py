@@ -0,0 +1,203 @@
+"""
+Skill Demand Service
+Periodic job-market snapshot: Adzuna's total posting count for every skill in
+the taxonomy, per location, stored with its timestamp in skill_demand_snapshots
+and served from memory to the optimizer and recommendation paths
+"""
+
+from typing import List, Dict, Optional, Iterable
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+from config import get_settings
+from services.skill_matcher import skill_variants
+
+settings = get_settings()
+
+try:
+    from database import get_supabase, iter_keyset_rows
+except Exception as e:
+    print(f"[WARNING] Skill demand persistence unavailable: {e}")
+    get_supabase = None
+    iter_keyset_rows = None
+
+
+# Location key for the country-wide count (Adzuna search without "where")
+ALL_LOCATIONS = "all"
+
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """Comma-separated setting to a list of non-empty names"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+class SkillDemandSnapshot:
+    """
+    Latest skill demand snapshot, shared through the skill_demand_snapshots table.
+    Each worker keeps the newest snapshot in memory and re-reads the table when
+    its copy is older than SKILL_DEMAND_RELOAD_SECONDS, so a snapshot taken by
+    any worker is picked up everywhere.
+    """
+    
+    TABLE = "skill_demand_snapshots"
+    
+    def __init__(self):
+        # {location: {skill (lowercase): (skill, job_count)}}
+        self.counts: Dict[str, Dict[str, tuple]] = {}
+        self.snapshot_at: Optional[str] = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._client = None
+        
+        if get_supabase:
+            try:
+                self._client = get_supabase()
+            except Exception as e:
+                print(f"[WARNING] Skill demand persistence unavailable: {e}")
+    
+    @staticmethod
+    def taxonomy() -> List[str]:
+        """Skills tracked by the snapshot (SKILL_DEMAND_TAXONOMY)"""
+        return list(dict.fromkeys(parse_list(settings.SKILL_DEMAND_TAXONOMY)))
+    
+    @staticmethod
+    def locations() -> List[str]:
+        """Country-wide plus every SKILL_DEMAND_LOCATIONS city"""
+        return [ALL_LOCATIONS] + [
+            l for l in dict.fromkeys(parse_list(settings.SKILL_DEMAND_LOCATIONS))
+            if l.lower() != ALL_LOCATIONS
+        ]
+    
+    # ========== BUILD ==========
+    
+    def build(self, rows: Iterable[Dict], snapshot_at: Optional[str]):
+        """Replace the in-memory snapshot with (skill, location, job_count) rows"""
+        counts: Dict[str, Dict[str, tuple]] = {}
+        for row in rows:
+            location = (row.get("location") or ALL_LOCATIONS).lower()
+            counts.setdefault(location, {})[row["skill"].lower()] = (
+                row["skill"], int(row.get("job_count") or 0)
+            )
+        
+        with self._lock:
+            self.counts = counts
+            self.snapshot_at = snapshot_at
+            self.loaded_at = time.time()
+    
+    def load(self) -> Optional[str]:
+        """Load the newest snapshot from the table; returns its timestamp"""
+        if not self._client or not iter_keyset_rows:
+            self.loaded_at = time.time()
+            return self.snapshot_at
+        
+        try:
+            latest = self._client.table(self.TABLE).select(
+                'snapshot_at'
+            ).order('snapshot_at', desc=True).limit(1).execute()
+            
+            if latest.data:
+                snapshot_at = latest.data[0]['snapshot_at']
+                rows = iter_keyset_rows(
+                    self._client, self.TABLE, 'skill, location, job_count',
+                    filters={'snapshot_at': snapshot_at},
+                    order_column='skill', id_column='location', batch_size=1000
+                )
+                self.build(rows, snapshot_at)
+                print(f"[SKILL DEMAND] ✅ Loaded snapshot from {snapshot_at}")
+            else:
+                self.loaded_at = time.time()
+        except Exception as e:
+            print(f"[SKILL DEMAND] Load failed: {e}")
+            # Don't retry on every request while the table is unavailable
+            self.loaded_at = time.time()
+        
+        return self.snapshot_at
+    
+    def ensure_loaded(self):
+        """Reload when the in-memory copy is older than the reload interval"""
+        if time.time() - self.loaded_at > settings.SKILL_DEMAND_RELOAD_SECONDS:
+            self.load()
+    
+    # ========== SNAPSHOT ==========
+    
+    def store(self, counts: Dict[str, Dict[str, int]]) -> int:
+        """
+        Save one snapshot of {location: {skill: job_count}} under a single timestamp
+        and make it the in-memory snapshot; returns rows written
+        """
+        snapshot_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                "snapshot_at": snapshot_at,
+                "skill": skill,
+                "location": location,
+                "job_count": job_count
+            }
+            for location, skills in counts.items()
+            for skill, job_count in skills.items()
+        ]
+        if not rows:
+            return 0
+        
+        if self._client:
+            for start in range(0, len(rows), 500):
+                self._client.table(self.TABLE).insert(rows[start:start + 500]).execute()
+            
+            # History is kept for trends, but not forever
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=settings.SKILL_DEMAND_HISTORY_DAYS)).isoformat()
+            self._client.table(self.TABLE).delete().lt('snapshot_at', cutoff).execute()
+        
+        self.build(rows, snapshot_at)
+        return len(rows)
+    
+    def claim_run(self, interval_minutes: int) -> bool:
+        """Take the snapshot lease so only one worker snapshots per interval"""
+        if not self._client:
+            return True
+        
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(minutes=interval_minutes)).isoformat()
+        try:
+            claimed = self._client.table('skill_demand_state').update({
+                'last_run_at': now.isoformat()
+            }).eq('id', 1).lt('last_run_at', cutoff).execute()
+            return bool(claimed.data)
+        except Exception as e:
+            print(f"[SKILL DEMAND] Snapshot lease unavailable: {e}")
+            return False
+    
+    # ========== QUERY ==========
+    
+    def demand(self, location: Optional[str] = None,
+               skills: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        {skill: job_count} for a location (country-wide when None or unknown).
+        With skills, only those are returned, keyed by the caller's spelling.
+        """
+        self.ensure_loaded()
+        
+        with self._lock:
+            counts = self.counts.get((location or ALL_LOCATIONS).lower())
+            if counts is None:
+                counts = self.counts.get(ALL_LOCATIONS, {})
+        
+        if skills is None:
+            return {skill: job_count for skill, job_count in counts.values()}
+        
+        demand = {}
+        for skill in skills:
+            # "golang" and "Go" share one taxonomy entry
+            for variant in skill_variants(skill or ""):
+                if variant.lower() in counts:
+                    demand[skill] = counts[variant.lower()][1]
+                    break
+        return demand
+    
+    def top(self, location: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Most in-demand skills for a location, highest count first"""
+        ranked = sorted(self.demand(location).items(), key=lambda item: item[1], reverse=True)
+        return [{"skill": skill, "job_count": job_count} for skill, job_count in ranked[:limit]]
+    
+    def __len__(self) -> int:
+        return sum(len(skills) for skills in self.counts.values())
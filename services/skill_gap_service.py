@@ -6,6 +6,8 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import json
 
+from row_models import UserSkillRow
+
 try:
     from database import EnhancedSupabaseHelper
     db = EnhancedSupabaseHelper()
@@ -147,14 +149,9 @@ class SkillGapService:
             if not db:
                 return {}
             
-            skills = db.client.table('user_skill_memory').select(
-                'skill_name, confidence_score'
-            ).eq('user_id', user_id).execute()
+            skills = db.get_user_skill_rows(user_id, UserSkillRow.CONFIDENCE_COLUMNS)
             
-            return {
-                s['skill_name']: float(s.get('confidence_score', 0.0))
-                for s in (skills.data or [])
-            }
+            return {s.skill_name: s.confidence_score for s in skills}
             
         except Exception as e:
             print(f"[SKILL GAP] Current skills error: {e}")
@@ -333,16 +330,16 @@ class SkillGapService:
             confidence_delta = delta_map.get(evidence_type, 0.05)
             
             # Get or create skill memory
-            existing = db.client.table('user_skill_memory').select('*').eq(
-                'user_id', user_id
-            ).eq('skill_name', skill).execute()
+            existing = db.client.table('user_skill_memory').select(
+                'id, confidence_score, practice_count, evidence'
+            ).eq('user_id', user_id).eq('skill_name', skill).execute()
             
             if existing.data:
-                current = existing.data[0]
-                new_confidence = min(1.0, float(current.get('confidence_score', 0)) + confidence_delta)
+                current = UserSkillRow.from_row(existing.data[0])
+                new_confidence = min(1.0, current.confidence_score + confidence_delta)
                 
                 # Update evidence
-                evidence = current.get('evidence', {})
+                evidence = current.evidence
                 if not isinstance(evidence, dict):
                     evidence = {}
                 
@@ -353,10 +350,10 @@ class SkillGapService:
                 db.client.table('user_skill_memory').update({
                     'confidence_score': new_confidence,
                     'evidence': evidence,
-                    'practice_count': current.get('practice_count', 0) + 1,
+                    'practice_count': current.practice_count + 1,
                     'last_practiced_at': datetime.now().isoformat(),
                     'updated_at': datetime.now().isoformat()
-                }).eq('id', current['id']).execute()
+                }).eq('id', current.id).execute()
                 
                 print(f"[SKILL UPDATE] ✅ Updated {skill}: {new_confidence:.2f}")
             else:
@@ -0,0 +1,120 @@
+"""
+Skill Matcher
+Compiles a set of skills (plus their aliases) into one regex so a job text is
+scanned once, with skill-aware word boundaries that keep short names like
+"R", "C" and "Go" from matching inside other words, and case rules that keep
+skills named after everyday words ("React", "REST") from matching prose
+"""
+
+from typing import List, Dict, Iterable, Tuple
+from functools import lru_cache
+import re
+
+
+# Spellings treated as the same skill (lowercase; first entry is canonical)
+SKILL_ALIASES = [
+    ["javascript", "js", "ecmascript"],
+    ["typescript", "ts"],
+    ["node.js", "nodejs", "node"],
+    ["react", "react.js", "reactjs"],
+    ["vue", "vue.js", "vuejs"],
+    ["angular", "angularjs", "angular.js"],
+    ["go", "golang"],
+    ["c++", "cpp"],
+    ["c#", "csharp"],
+    ["postgresql", "postgres"],
+    ["kubernetes", "k8s"],
+    ["machine learning", "ml"],
+    ["artificial intelligence", "ai"],
+    ["natural language processing", "nlp"],
+    ["aws", "amazon web services"],
+    ["gcp", "google cloud", "google cloud platform"],
+    ["ci/cd", "cicd"],
+    ["rest apis", "rest api", "restful", "rest"],
+    ["ui/ux design", "ui/ux", "ux design"],
+]
+
+ALIAS_LOOKUP = {name: group for group in SKILL_ALIASES for name in group}
+
+# Names this short only match capitalized ("Go"/"GO" the language, never "go" the verb)
+SHORT_SKILL_LENGTH = 2
+
+# Skill names that are also everyday words only match in these spellings
+# ("React" the library, never "react to incidents"; "REST", never "the rest")
+WORD_SKILL_FORMS = {
+    "rest": ["REST"],
+    "node": ["Node", "NODE"],
+    "react": ["React", "REACT"],
+    "spring": ["Spring", "SPRING"],
+    "swift": ["Swift", "SWIFT"],
+    "rust": ["Rust", "RUST"],
+}
+
+# Skill names can contain + # . / so boundaries are stricter than \b
+LEFT_BOUNDARY = r"(?<![\w+#])"
+RIGHT_BOUNDARY = r"(?![\w+#]|\.\w)"
+
+
+def skill_variants(skill: str) -> List[str]:
+    """The skill plus all its known aliases"""
+    name = skill.strip()
+    return [name] + [alias for alias in ALIAS_LOOKUP.get(name.lower(), []) if alias != name.lower()]
+
+
+def _variant_pattern(variant: str) -> str:
+    if variant.lower() in WORD_SKILL_FORMS:
+        return "|".join(re.escape(form) for form in WORD_SKILL_FORMS[variant.lower()])
+    
+    if len(variant) <= SHORT_SKILL_LENGTH:
+        forms = {variant.upper(), variant.title()} | ({variant} if not variant.islower() else set())
+        return "|".join(re.escape(form) for form in sorted(forms))
+    
+    # Multi-word skills also match hyphenated / extra-spaced text
+    words = [re.escape(word) for word in variant.lower().split()]
+    return "(?i:" + r"[\s\-]+".join(words) + ")"
+
+
+class SkillMatcher:
+    """One compiled pattern over a fixed set of skills"""
+    
+    def __init__(self, skills: Iterable[str]):
+        self.skills: List[str] = []
+        groups = []
+        
+        for skill in dict.fromkeys(s for s in skills if s and s.strip()):
+            # Longest first so "machine learning" wins over "ml"-style prefixes
+            variants = sorted(set(skill_variants(skill)), key=len, reverse=True)
+            alternatives = "|".join(_variant_pattern(v) for v in variants)
+            groups.append(f"(?P<s{len(self.skills)}>{alternatives})")
+            self.skills.append(skill)
+        
+        self.pattern = (
+            re.compile(f"{LEFT_BOUNDARY}(?:{'|'.join(groups)}){RIGHT_BOUNDARY}")
+            if groups else None
+        )
+    
+    @classmethod
+    def for_skills(cls, skills: Iterable[str]) -> "SkillMatcher":
+        """Shared compiled matcher for a skill set"""
+        return _compile(tuple(sorted(dict.fromkeys(skills))))
+    
+    def find(self, text: str) -> Dict[str, List[int]]:
+        """{skill: [start offsets]} for every skill mentioned in text (single pass)"""
+        hits: Dict[str, List[int]] = {}
+        if not self.pattern or not text:
+            return hits
+        
+        for match in self.pattern.finditer(text):
+            skill = self.skills[int(match.lastgroup[1:])]
+            hits.setdefault(skill, []).append(match.start())
+        return hits
+    
+    def matched(self, text: str) -> List[str]:
+        """Skills mentioned in text, in the matcher's skill order"""
+        hits = self.find(text)
+        return [skill for skill in self.skills if skill in hits]
+
+
+@lru_cache(maxsize=256)
+def _compile(skills: Tuple[str, ...]) -> SkillMatcher:
+    return SkillMatcher(skills)